@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+"""
+Benchmarks every converter and schema validator, both on the files in testdata/inputs
+and on generated elections of increasing size.
+
+Run from the root directory:
+    ./scripts/benchmark.sh -o results.json
+
+Results are written as JSON so that they can be compared between releases.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from rcvformats.common import profiling
+from rcvformats.common.synthetic import SyntheticElection, to_dominion_multi_xml
+from rcvformats.conversions.automatic import AutomaticConverter
+from rcvformats.conversions.dominion_multi_converter import DominionMultiConverter
+from rcvformats.conversions.dominion_txt import DominionTxtConverter
+from rcvformats.conversions.dominion_xlsx import DominionXlsxConverter
+from rcvformats.conversions.electionbuddy import ElectionBuddyConverter
+from rcvformats.conversions.opavote import OpavoteConverter
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+from rcvformats.schemas import electionbuddy
+from rcvformats.schemas import opavote
+from rcvformats.schemas import universaltabulator
+from rcvformats.schemas.base import Schema
+
+TESTDATA = 'testdata/inputs'
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def _testdata_files(subdir, extension):
+    directory = os.path.join(TESTDATA, subdir)
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(extension):
+            yield os.path.join(directory, filename)
+
+
+def _converter_cases():
+    """ Yields (target name, callable, input filename) for every converter on testdata """
+    def convert_with(converter_type, **kwargs):
+        return lambda filename: converter_type(**kwargs).convert_to_ut(filename)
+
+    def explode(filename):
+        with open(filename, 'rb') as file_obj:
+            return DominionMultiConverter.explode_to_files(file_obj)
+
+    file_sets = [
+        (DominionXlsxConverter, _testdata_files('dominion_xlsx', '.xlsx')),
+        (DominionTxtConverter, [os.path.join(TESTDATA, 'dominion.txt')]),
+        (ElectionBuddyConverter, _testdata_files('electionbuddy', '.csv')),
+        (OpavoteConverter, _testdata_files('opavote10', '.json')),
+        (OpavoteConverter, _testdata_files('opavote11', '.json')),
+        (UTWithoutTransfersConverter, _testdata_files('ut-without-transfers', '.json')),
+        (AutomaticConverter, _testdata_files('universal-tabulator', '.json')),
+        (AutomaticConverter, _testdata_files('dominion_xlsx', '.xlsx')),
+        (AutomaticConverter, _testdata_files('electionbuddy', '.csv')),
+    ]
+    for converter_type, filenames in file_sets:
+        for filename in filenames:
+            yield converter_type.__name__, convert_with(converter_type), filename
+
+    multi_filename = os.path.join(TESTDATA, 'dominion-multi-converter.xml')
+    yield DominionMultiConverter.__name__, explode, multi_filename
+
+
+def _schema_cases():
+    """ Yields (target name, callable, input filename) for every schema on testdata """
+    def validate_with(schema_type):
+        return lambda filename: schema_type().validate(filename)
+
+    file_sets = [
+        (universaltabulator.SchemaV0, _testdata_files('universal-tabulator', '.json')),
+        (opavote.SchemaV1_0, _testdata_files('opavote10', '.json')),
+        (opavote.SchemaV1_1, _testdata_files('opavote11', '.json')),
+        (electionbuddy.SchemaV0, _testdata_files('electionbuddy', '.csv')),
+    ]
+    for schema_type, filenames in file_sets:
+        for filename in filenames:
+            yield _target_name(schema_type), validate_with(schema_type), filename
+
+
+# The Dominion XLSX converter gives up after 500 rows or 500 rounds
+MAX_XLSX_SIZE = 400
+
+# Which converter (or schema) reads each format written by SyntheticElection.write_files
+SCALED_TARGETS = [
+    ('ut-without-transfers', UTWithoutTransfersConverter),
+    ('ut', AutomaticConverter),
+    ('ut', universaltabulator.SchemaV0),
+    ('opavote10', OpavoteConverter),
+    ('opavote10', opavote.SchemaV1_0),
+    ('opavote11', OpavoteConverter),
+    ('opavote11', opavote.SchemaV1_1),
+    ('electionbuddy', ElectionBuddyConverter),
+    ('electionbuddy', electionbuddy.SchemaV0),
+    ('dominion-txt', DominionTxtConverter),
+    ('dominion-xlsx', DominionXlsxConverter),
+    ('dominion-xlsx-v5-17', DominionXlsxConverter),
+    ('dominion-xlsx', AutomaticConverter),
+]
+
+
+def _target_name(target_type):
+    if issubclass(target_type, Schema):
+        return f'{target_type.__module__.rsplit(".", 1)[-1]}.{target_type.__name__}'
+    return target_type.__name__
+
+
+def _run_with(target_type):
+    """ A function that validates or converts a filename with a new target_type """
+    if issubclass(target_type, Schema):
+        return lambda filename: target_type().validate(filename)
+    return lambda filename: target_type().convert_to_ut(filename)
+
+
+def _scaled_cases(sizes, directory):
+    """ Yields (target name, callable, input filename, size) on generated elections """
+    def explode(filename):
+        with open(filename, 'rb') as file_obj:
+            return DominionMultiConverter.explode_to_files(file_obj)
+
+    for size in sizes:
+        election = SyntheticElection(seed=size, num_candidates=size)
+        size_directory = os.path.join(directory, str(size))
+        os.mkdir(size_directory)
+
+        formats = {format_name for format_name, _ in SCALED_TARGETS}
+        if size > MAX_XLSX_SIZE:
+            formats = {f for f in formats if not f.startswith('dominion-xlsx')}
+        filenames = election.write_files(size_directory, sorted(formats))
+
+        for format_name, target_type in SCALED_TARGETS:
+            if format_name not in filenames:
+                continue
+            yield _target_name(target_type), _run_with(target_type), filenames[format_name], size
+
+        # One multi-contest report holding `size` contests of 10 candidates each
+        multi_filename = os.path.join(size_directory, 'dominion-multi.xml')
+        contests = [SyntheticElection(seed=i, num_candidates=10) for i in range(size)]
+        with open(multi_filename, 'wb') as file_obj:
+            file_obj.write(to_dominion_multi_xml(contests))
+        yield DominionMultiConverter.__name__, explode, multi_filename, size
+
+
+def _run_case(target, func, filename, size, repeat):
+    input_bytes = os.path.getsize(filename)
+    _, measurement = profiling.measure(func, filename, repeat=repeat, input_bytes=input_bytes)
+    row = {
+        'target': target,
+        'input': os.path.basename(filename) if size is not None else filename,
+        'size': size,
+    }
+    row.update(measurement.as_dict())
+    print(f"{target:32} {row['input']:55} {measurement.seconds * 1000:10.2f}ms "
+          f"{measurement.peak_bytes / 1024:10.0f}KiB", file=sys.stderr)
+    return row
+
+
+def run(sizes, repeat):
+    """ Runs every benchmark, returning a JSON-serializable report """
+    rows = []
+    for target, func, filename in list(_converter_cases()) + list(_schema_cases()):
+        rows.append(_run_case(target, func, filename, None, repeat))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for target, func, filename, size in _scaled_cases(sizes, directory):
+            rows.append(_run_case(target, func, filename, size, repeat))
+
+    return {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': rows
+    }
+
+
+def main():
+    """ Entrypoint """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', dest='output_filename',
+                        help='Where to write the JSON report. Defaults to stdout.')
+    parser.add_argument('-s', '--sizes', dest='sizes', type=int, nargs='+',
+                        default=DEFAULT_SIZES,
+                        help='Number of candidates (and so, rounds) in each generated election')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3,
+                        help='Number of timed runs per case; the fastest is reported')
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat)
+    if args.output_filename:
+        with open(args.output_filename, 'w', encoding='utf-8') as file_obj:
+            json.dump(report, file_obj, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,14 +5,16 @@ A command-line interface to some of the python functionality
 """
 
 import argparse
-import json
+import os
 import sys
 
 from enum import Enum
 
-from rcvformats.schemas import electionbuddy
-from rcvformats.schemas import universaltabulator
-from rcvformats.schemas import opavote
+from rcvformats.common import compression
+from rcvformats.common import serialization
+from rcvformats.schemas import batch as batch_validation
+from rcvformats.conversions import archive
+from rcvformats.conversions import batch
 from rcvformats.conversions.automatic import AutomaticConverter
 from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
 
@@ -28,23 +30,63 @@ class FormatEnum(Enum):
         return str(self.value)
 
 
-def convert(input_filename, output_filename):
-    """ Automatic converter from input_filename to output_filename """
+def convert(input_filename, output_filename, **json_options):
+    """
+    Automatic converter from input_filename to output_filename
+
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    """
     standardized_format = AutomaticConverter().convert_to_ut(input_filename)
-    with open(output_filename, 'w', encoding='utf-8') as file_obj:
-        json.dump(standardized_format, file_obj)
+    with compression.open_for_writing(output_filename) as file_obj:
+        serialization.dump(standardized_format, file_obj, **json_options)
+
+
+def convert_zip(input_filename, output_directory, max_workers, **json_options):
+    """
+    Converts every member of a zip archive into output_directory, with a manifest
+
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    """
+    manifest = archive.write_outputs(
+        archive.convert_zip(input_filename, max_workers), output_directory, **json_options)
+    num_errors = sum('error' in entry for entry in manifest)
+    print(f"Converted {len(manifest) - num_errors} contests, with {num_errors} errors. "
+          f"See {os.path.join(output_directory, archive.MANIFEST_FILENAME)}")
+
+
+def convert_batch(input_paths, output_directory, journal_filename, max_workers, retry_failed,
+                  **json_options):
+    """
+    Converts every file given, or in the directories given, into output_directory,
+    resuming from where any earlier run with the same journal stopped
+
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    """
+    outcomes = batch.convert_batch(_walk(input_paths), output_directory, journal_filename,
+                                   max_workers, retry_failed, **json_options)
+    counts = {outcome: list(outcomes.values()).count(outcome)
+              for outcome in (batch.CONVERTED, batch.SKIPPED, batch.FAILED, batch.BUSY)}
+    print(f"Converted {counts[batch.CONVERTED]} files, skipped {counts[batch.SKIPPED]} "
+          f"unchanged since converted, with {counts[batch.FAILED]} errors, and "
+          f"{counts[batch.BUSY]} left to other workers. "
+          f"See {journal_filename or os.path.join(output_directory, batch.JOURNAL_FILENAME)}")
+
+
+def _walk(input_paths):
+    """ Each file, and each file within each directory, in order """
+    for path in input_paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories.sort()
+            for filename in sorted(filenames):
+                yield os.path.join(directory, filename)
 
 
 def validate(input_filename, schema):
     """ validates input_filename with schema """
-    if schema == FormatEnum.UT:
-        schema = universaltabulator.SchemaV0()
-    elif schema == FormatEnum.EB:
-        schema = electionbuddy.SchemaV0()
-    elif schema == FormatEnum.OV10:
-        schema = opavote.SchemaV1_0()
-    elif schema == FormatEnum.OV11:
-        schema = opavote.SchemaV1_1()
+    schema = batch_validation.SCHEMAS[schema.value]()
 
     is_valid = schema.validate(input_filename)
     if is_valid:
@@ -53,13 +95,40 @@ def validate(input_filename, schema):
         print("Schema is not valid. Errors: ", schema.last_error())
 
 
-def add_transfers(input_filename, output_filename, allow_guessing):
-    """ Adds tally transfers if they don't exist. Overwrites them if they do. """
+def validate_batch(input_paths, schema, max_workers, report_filename, **json_options):
+    """
+    Validates every file given, or in the directories given, writing a JSON report of
+    each to report_filename, or to stdout if None
+
+    :param schema: A FormatEnum, or None to detect each file's schema
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    :return: The report
+    """
+    report = batch_validation.validate_batch(
+        _walk(input_paths), None if schema is None else schema.value, max_workers)
+    if report_filename is None:
+        serialization.dump(report, sys.stdout, **json_options)
+        print()
+    else:
+        with compression.open_for_writing(report_filename) as file_obj:
+            serialization.dump(report, file_obj, **json_options)
+    summary = report['summary']
+    print(f"{summary['valid']} of {summary['total']} files are valid, "
+          f"{summary['invalid']} are not.", file=sys.stderr)
+    return report
+
+
+def add_transfers(input_filename, output_filename, allow_guessing, **json_options):
+    """
+    Adds tally transfers if they don't exist. Overwrites them if they do.
+
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    """
     # Adding transfers, internally, is just another conversion
     converter = UTWithoutTransfersConverter(allow_guessing=allow_guessing)
     with_transfers = converter.convert_to_ut(input_filename)
-    with open(output_filename, 'w', encoding='utf-8') as file_obj:
-        json.dump(with_transfers, file_obj)
+    with compression.open_for_writing(output_filename) as file_obj:
+        serialization.dump(with_transfers, file_obj, **json_options)
 
 
 def _add_input_arg(parser):
@@ -67,7 +136,7 @@ def _add_input_arg(parser):
         '-i',
         '--input',
         dest='input_filename',
-        help='File to convert',
+        help='File to convert. May be gzip, bz2 or xz compressed.',
         required=True)
 
 
@@ -76,27 +145,118 @@ def _add_output_arg(parser):
         '-o',
         '--output',
         dest='output_filename',
-        help='Where to place the JSON file on success',
+        help='Where to place the JSON file on success. '
+             'Ending it in .gz, .bz2 or .xz compresses it.',
         required=True)
 
 
-def main():
-    """ Main function: cli entrypoint, using argparse """
-    parser = argparse.ArgumentParser()
+def _add_json_args(parser):
+    parser.add_argument(
+        '--compact',
+        dest='compact',
+        action='store_true',
+        help='Write JSON without spaces',
+        required=False)
+    parser.add_argument(
+        '--encoder',
+        dest='encoder',
+        choices=[serialization.STDLIB, serialization.ORJSON],
+        default=serialization.STDLIB,
+        help='orjson is faster, but needs --compact, and writes non-ASCII characters '
+             'unescaped. Falls back to json, the standard library and the default, '
+             'if orjson is not installed.',
+        required=False)
+    parser.add_argument(
+        '--float-precision',
+        dest='float_precision',
+        type=int,
+        help='Round transfers to this many decimal places',
+        required=False)
+
+
+def _json_options(args):
+    return {'compact': args.compact, 'float_precision': args.float_precision,
+            'encoder': args.encoder}
 
-    subparsers = parser.add_subparsers(
-        dest='subparser',
-        help='Tooling for RCV Formats. See more at https://rcvformats.readthedocs.io/en/latest/')
 
-    conv_parser = subparsers.add_parser(
+def _add_convert_parser(subparsers):
+    parser = subparsers.add_parser(
         'convert', help='Converts from whatever format you have to the Universal Tabulator format.')
-    _add_input_arg(conv_parser)
-    _add_output_arg(conv_parser)
+    _add_input_arg(parser)
+    _add_output_arg(parser)
+    _add_json_args(parser)
+
+
+def _add_convert_zip_parser(subparsers):
+    parser = subparsers.add_parser(
+        'convert-zip', help='Converts every results file in a zip archive, without extracting it')
+    parser.add_argument(
+        '-i',
+        '--input',
+        dest='input_filename',
+        help='Zip archive to convert',
+        required=True)
+    parser.add_argument(
+        '-o',
+        '--output',
+        dest='output_directory',
+        help='Directory to place a JSON file per contest, and manifest.json, in',
+        required=True)
+    parser.add_argument(
+        '-w',
+        '--workers',
+        dest='max_workers',
+        type=int,
+        help='Number of worker processes. If not given, converts one file at a time.',
+        required=False)
+    _add_json_args(parser)
+
+
+def _add_convert_batch_parser(subparsers):
+    parser = subparsers.add_parser(
+        'convert-batch',
+        help='Converts many files, resuming from where an earlier run stopped')
+    parser.add_argument(
+        '-i',
+        '--input',
+        dest='input_paths',
+        nargs='+',
+        help='Files to convert, or directories of them',
+        required=True)
+    parser.add_argument(
+        '-o',
+        '--output',
+        dest='output_directory',
+        help='Directory to place a JSON file per input in',
+        required=True)
+    parser.add_argument(
+        '-j',
+        '--journal',
+        dest='journal_filename',
+        help='The journal of what was converted. Defaults to journal.sqlite3 in the '
+             'output directory. Workers sharing a journal split the files between them.',
+        required=False)
+    parser.add_argument(
+        '-w',
+        '--workers',
+        dest='max_workers',
+        type=int,
+        help='Number of worker processes. If not given, converts one file at a time.',
+        required=False)
+    parser.add_argument(
+        '--retry-failed',
+        dest='retry_failed',
+        action='store_true',
+        help='Retry files which failed to convert before, even if unchanged since',
+        required=False)
+    _add_json_args(parser)
+
 
-    validate_parser = subparsers.add_parser(
+def _add_validate_parser(subparsers):
+    parser = subparsers.add_parser(
         'validate', help='Validates the file with one of the three accepted formats')
-    _add_input_arg(validate_parser)
-    validate_parser.add_argument(
+    _add_input_arg(parser)
+    parser.add_argument(
         '-s',
         '--schema',
         dest='schema',
@@ -106,11 +266,50 @@ def main():
              'eb (ElectionBuddy), or ov (OpaVote)',
         required=True)
 
-    xfer_parser = subparsers.add_parser(
+
+def _add_validate_batch_parser(subparsers):
+    parser = subparsers.add_parser(
+        'validate-batch',
+        help='Validates many files at once, writing a JSON report of each')
+    parser.add_argument(
+        '-i',
+        '--input',
+        dest='input_paths',
+        nargs='+',
+        help='Files to validate, or directories of them',
+        required=True)
+    parser.add_argument(
+        '-s',
+        '--schema',
+        dest='schema',
+        type=FormatEnum,
+        choices=list(FormatEnum),
+        help='Schema to validate every file against. If not given, each file is '
+             'validated against the schema it looks like.',
+        required=False)
+    parser.add_argument(
+        '-o',
+        '--output',
+        dest='report_filename',
+        help='Where to write the report. If not given, it is printed.',
+        required=False)
+    parser.add_argument(
+        '-w',
+        '--workers',
+        dest='max_workers',
+        type=int,
+        help='Number of worker processes. If not given, validates one file at a time.',
+        required=False)
+    _add_json_args(parser)
+
+
+def _add_transfer_parser(subparsers):
+    parser = subparsers.add_parser(
         'transfer', help='Adds "transfers" to the tallyResults of an otherwise-valid UI format')
-    _add_input_arg(xfer_parser)
-    _add_output_arg(xfer_parser)
-    xfer_parser.add_argument(
+    _add_input_arg(parser)
+    _add_output_arg(parser)
+    _add_json_args(parser)
+    parser.add_argument(
         '-g',
         '--allow-guessing',
         dest='allow_guessing',
@@ -119,14 +318,42 @@ def main():
              'If not, will leave transfers blank for all batch elimination rounds.',
         required=False)
 
+
+def main():
+    """ Main function: cli entrypoint, using argparse """
+    parser = argparse.ArgumentParser()
+
+    subparsers = parser.add_subparsers(
+        dest='subparser',
+        help='Tooling for RCV Formats. See more at https://rcvformats.readthedocs.io/en/latest/')
+
+    _add_convert_parser(subparsers)
+    _add_convert_zip_parser(subparsers)
+    _add_convert_batch_parser(subparsers)
+    _add_validate_parser(subparsers)
+    _add_validate_batch_parser(subparsers)
+    _add_transfer_parser(subparsers)
+
     args = parser.parse_args()
     if args.subparser is None:
         print(parser.print_help())
         sys.exit(-1)
 
     if args.subparser == 'convert':
-        convert(args.input_filename, args.output_filename)
+        convert(args.input_filename, args.output_filename, **_json_options(args))
+    if args.subparser == 'convert-zip':
+        convert_zip(args.input_filename, args.output_directory, args.max_workers,
+                    **_json_options(args))
+    if args.subparser == 'convert-batch':
+        convert_batch(args.input_paths, args.output_directory, args.journal_filename,
+                      args.max_workers, args.retry_failed, **_json_options(args))
     if args.subparser == 'validate':
         validate(args.input_filename, args.schema)
+    if args.subparser == 'validate-batch':
+        report = validate_batch(args.input_paths, args.schema, args.max_workers,
+                                args.report_filename, **_json_options(args))
+        if report['summary']['invalid']:
+            sys.exit(1)
     if args.subparser == 'transfer':
-        add_transfers(args.input_filename, args.output_filename, args.allow_guessing)
+        add_transfers(args.input_filename, args.output_filename, args.allow_guessing,
+                      **_json_options(args))
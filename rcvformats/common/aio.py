@@ -0,0 +1,131 @@
+"""
+Helpers for running conversions and validations from asyncio code.
+
+Files are read on a thread so the event loop is never blocked on disk, and the parsing
+itself runs in an executor. Pass executor=PROCESS to run each call in its own process,
+which is the only way to truly stop a runaway parse: a process is killed when its call
+is cancelled or times out, whereas a thread can only be abandoned to run to completion.
+"""
+
+import asyncio
+import io
+import multiprocessing
+
+from rcvformats.common import utils
+
+# Pass as the executor to run each call in its own, killable process
+PROCESS = 'process'
+
+# How often to check whether a process has finished
+_POLL_SECONDS = 0.01
+
+
+async def read_input(data):
+    """
+    Reads a filename or file object without blocking the event loop.
+
+    :param data: A filename, file object, or JSON data
+    :return: A BytesIO or StringIO with the file contents, or data itself if it is\
+             neither a filename nor a file object
+    """
+    if utils.is_file_obj(data):
+        contents = await asyncio.to_thread(data.read)
+    elif utils.is_filename(data):
+        contents = await asyncio.to_thread(_read_file, data)
+    else:
+        return data
+
+    if isinstance(contents, str):
+        return io.StringIO(contents)
+    return io.BytesIO(contents)
+
+
+def _read_file(filename):
+    with open(filename, 'rb') as file_object:
+        return file_object.read()
+
+
+async def run(func, *args, executor=None, timeout=None):
+    """
+    Runs func(*args) without blocking the event loop.
+
+    :param func: The function to run. With PROCESS, it and its arguments must be picklable.
+    :param executor: None for the event loop's default thread pool, any
+                     :class:`concurrent.futures.Executor`, or PROCESS.
+    :param timeout: Seconds before raising :class:`asyncio.TimeoutError`, or None to wait
+                    forever
+    :return: The return value of func
+    """
+    if executor == PROCESS:
+        awaitable = _run_in_own_process(func, args)
+    else:
+        awaitable = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    return await asyncio.wait_for(awaitable, timeout)
+
+
+async def _run_in_own_process(func, args):
+    """ Runs func in a new process, which is killed if this is cancelled """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_and_send, args=(sender, func, args),
+                                      daemon=True)
+    process.start()
+    sender.close()
+    try:
+        while not receiver.poll():
+            if not process.is_alive() and not receiver.poll():
+                raise RuntimeError(f"Process exited with code {process.exitcode}")
+            await asyncio.sleep(_POLL_SECONDS)
+        succeeded, result = receiver.recv()
+    except EOFError as error:
+        raise RuntimeError(f"Process exited with code {process.exitcode}") from error
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+
+    if not succeeded:
+        raise result
+    return result
+
+
+def _run_and_send(sender, func, args):
+    """ Runs in the child process: sends back (True, result) or (False, exception) """
+    try:
+        result = (True, func(*args))
+    except Exception as exception:  # pylint: disable=broad-except
+        result = (False, exception)
+
+    try:
+        sender.send(result)
+    except Exception as exception:  # pylint: disable=broad-except
+        sender.send((False, RuntimeError(f"Could not send the result back: {exception}")))
+    sender.close()
+
+
+async def convert_many(  # pylint: disable=too-many-arguments
+        converter, inputs, max_concurrency=4, validate=True, executor=None, timeout=None):
+    """
+    Converts many inputs concurrently, running at most max_concurrency at once.
+
+    :param converter: Any :class:`~rcvformats.conversions.base.Converter`
+    :param inputs: Filenames, file objects, or JSON data
+    :param max_concurrency: The most conversions to run at once
+    :param validate: Whether to validate each result, as\
+                     :func:`~rcvformats.conversions.base.Converter.convert_to_ut_and_validate`
+    :param executor: See :func:`run`
+    :param timeout: Seconds allowed for each conversion, see :func:`run`
+    :return: A list with the Universal Tabulator data, or the exception raised, for each\
+             input in order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    if validate:
+        convert = converter.convert_to_ut_and_validate_async
+    else:
+        convert = converter.convert_to_ut_async
+
+    async def convert_one(data):
+        async with semaphore:
+            return await convert(data, executor=executor, timeout=timeout)
+
+    return await asyncio.gather(*map(convert_one, inputs), return_exceptions=True)
@@ -0,0 +1,182 @@
+"""
+Ballot-level ranked-choice data, held as a compact matrix of integers.
+
+Each candidate is given an integer index, in the order they first appear. A ballot is a
+row of candidate indices, one per rank, with :data:`NO_RANKING` where a rank was left
+blank. Identical ballots are stored once, with a weight of how many were cast, so a
+county's worth of ballots usually takes a few thousand rows rather than millions.
+
+Requires numpy (pip install rcvformats[numpy]).
+"""
+
+import csv
+import io
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Marks a rank left blank
+NO_RANKING = -1
+
+# Headers of the optional CSV column holding how many times each ballot was cast
+WEIGHT_HEADERS = ('count', 'weight')
+
+
+def is_available():
+    """ Whether numpy is installed, and so whether this module can be used """
+    return np is not None
+
+
+class RankedBallots:
+    """
+    A ballots x ranks matrix of candidate indices, and the weight of each ballot
+    """
+
+    def __init__(self, candidates, ranks, weights=None):
+        """
+        :param candidates: The name of each candidate
+        :param ranks: A ballots x ranks integer matrix of candidate indices, with\
+                      :data:`NO_RANKING` for blank ranks
+        :param weights: How many times each ballot was cast, or None if once each.\
+                        May be fractional.
+        """
+        if np is None:
+            raise ImportError("Ballot data requires numpy: pip install rcvformats[numpy]")
+        self.candidates = list(candidates)
+        self.ranks = np.asarray(ranks, dtype=np.int32)
+        if self.ranks.ndim != 2:
+            # With no ballots, there is no row to tell how many ranks there are
+            self.ranks = self.ranks.reshape(len(self.ranks), -1 if self.ranks.size else 0)
+        self.weights = np.ones(len(self.ranks), dtype=np.int64) if weights is None \
+            else np.asarray(weights)
+        if self.weights.shape != (len(self.ranks),):
+            raise ValueError("There must be one weight per ballot")
+        if self.ranks.size and (self.ranks.min() < NO_RANKING or
+                                self.ranks.max() >= len(self.candidates)):
+            raise ValueError("Ballots may only rank the given candidates")
+
+    @classmethod
+    def from_rankings(cls, rankings, weights=None, candidates=None):
+        """
+        :param rankings: An iterable of ballots, each a list of candidate names from first\
+                         choice to last. None or '' marks a blank rank.
+        :param weights: How many times each ballot was cast, or None if once each
+        :param candidates: Every candidate's name, e.g. to include candidates with no\
+                           votes. Otherwise, every name ranked on any ballot.
+        """
+        index_of = _CandidateIndex(candidates or [])
+        rows = [[index_of[name or ''] for name in ranking] for ranking in rankings]
+        return cls(index_of.candidates(), _pad(rows, NO_RANKING), weights)
+
+    @classmethod
+    def from_csv(cls, file_object):
+        """
+        Reads a CSV file with a header row, then one row per ballot. Each column is a rank,
+        from first choice to last, holding the name of the candidate ranked there, or
+        nothing. An optional column headed "Count" or "Weight" holds how many times each
+        ballot was cast.
+
+        :param file_object: A binary file object, in UTF-8
+        """
+        # Don't use a context manager: closing the wrapper would close file_object
+        decoded = io.TextIOWrapper(file_object, encoding='utf-8-sig', newline='')
+        reader = csv.reader(decoded)
+        header = [cell.strip().lower() for cell in next(reader, [])]
+        if not header:
+            decoded.detach()
+            raise ValueError("The CSV file is empty: it must at least have a header row")
+
+        weight_columns = [i for i, cell in enumerate(header) if cell in WEIGHT_HEADERS]
+        weight_column = weight_columns[0] if weight_columns else None
+        rank_columns = [i for i in range(len(header)) if i not in weight_columns]
+
+        index_of = _CandidateIndex()
+        rows = []
+        weights = []
+        for row in reader:
+            if len(row) < len(header):
+                row += [''] * (len(header) - len(row))
+            rows.append([index_of[row[i].strip()] for i in rank_columns])
+            if weight_column is not None:
+                weights.append(row[weight_column].strip() or '1')
+        decoded.detach()
+
+        if weight_column is not None:
+            is_fractional = any('.' in weight for weight in weights)
+            weights = np.array(weights, dtype=float if is_fractional else np.int64)
+        else:
+            weights = None
+        ranks = np.array(rows, dtype=np.int32).reshape(len(rows), len(rank_columns))
+        return cls(index_of.candidates(), ranks, weights)
+
+    def ensure_countable(self):
+        """
+        :raises ValueError: If there are no ballots, or no candidates ranked on any of them
+        """
+        if not len(self.ranks):  # pylint: disable=use-implicit-booleaness-not-len
+            raise ValueError("There are no ballots to count")
+        if not self.candidates:
+            raise ValueError("There are no candidates: every ballot is blank")
+
+    @property
+    def num_ballots(self):
+        """ The total weight of every ballot """
+        return self.weights.sum()
+
+    def compressed(self):
+        """
+        :return: Equivalent :class:`RankedBallots`, with each distinct ballot stored once
+                 and weighted by how many times it appears
+        """
+        if not len(self.ranks):  # pylint: disable=use-implicit-booleaness-not-len
+            return self
+        keys = _row_keys(self.ranks, len(self.candidates))
+        if keys is None:
+            unique_ranks, inverse = np.unique(self.ranks, axis=0, return_inverse=True)
+        else:
+            _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            unique_ranks = self.ranks[first_index]
+        weights = np.bincount(inverse.ravel(), weights=self.weights, minlength=len(unique_ranks))
+        if self.weights.dtype.kind in 'iu':
+            weights = weights.round().astype(np.int64)
+        return RankedBallots(self.candidates, unique_ranks, weights)
+
+
+def _row_keys(ranks, num_candidates):
+    """
+    :return: A single integer per row, equal only for equal rows, which is much faster to
+             sort than the rows themselves. None if the rows are too long to fit in 64 bits.
+    """
+    base = num_candidates + 1
+    if ranks.shape[1] * np.log2(base) >= 63:
+        return None
+    keys = np.zeros(len(ranks), dtype=np.int64)
+    for column in ranks.T:
+        keys = keys * base + (column.astype(np.int64) - NO_RANKING)
+    return keys
+
+
+def _pad(rows, fill, width=None):
+    """ Pads each row with fill, so all are as long as the longest, or width if given """
+    if width is None:
+        width = max(map(len, rows), default=0)
+    return [row + [fill] * (width - len(row)) for row in rows]
+
+
+class _CandidateIndex(dict):
+    """ Gives each new name the next index, in the order they are first looked up """
+
+    def __init__(self, candidates=()):
+        super().__init__({'': NO_RANKING})
+        for name in candidates:
+            self[name]  # pylint: disable=pointless-statement
+
+    def __missing__(self, name):
+        index = self[name] = len(self) - 1
+        return index
+
+    def candidates(self):
+        """ Every name, in the order of its index """
+        return [name for name in self if name != '']
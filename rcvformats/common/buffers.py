@@ -0,0 +1,97 @@
+"""
+Reads in-memory buffers, such as uploads, as if they were files
+"""
+
+import io
+import mmap
+
+# Types of buffer accepted by converters and schemas, in place of a file
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def is_buffer(data):
+    """ Is the given argument an in-memory buffer of bytes? """
+    return isinstance(data, BUFFER_TYPES)
+
+
+def open_buffer(data):
+    """
+    :param data: bytes, bytearray, memoryview or mmap
+    :return: A binary file object reading data, without copying it up-front
+    """
+    if isinstance(data, bytes):
+        # BytesIO shares memory with bytes until it is written to
+        return io.BytesIO(data)
+    return BufferReader(data)
+
+
+class BufferReader(io.BufferedIOBase):
+    """
+    A read-only binary file over any buffer. Unlike BytesIO, it does not copy the buffer:
+    each read only copies the bytes it returns, so parsers which read a little at a time,
+    like zipfile (used by openpyxl), never hold a second copy of the whole buffer.
+    The buffer must not be resized while it is being read.
+    """
+
+    # How far readline looks ahead for a newline at first, doubling each time it needs more
+    _READLINE_CHUNK = 256
+
+    def __init__(self, data):
+        """ :param data: Any object supporting the buffer protocol """
+        super().__init__()
+        self._view = memoryview(data).cast('B')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        start = min(self._position, len(self._view))
+        end = len(self._view) if size is None or size < 0 else min(start + size, len(self._view))
+        self._position = end
+        return self._view[start:end].tobytes()
+
+    def read1(self, size=-1):
+        return self.read(size)
+
+    def readinto(self, buffer):
+        data = self.read(len(memoryview(buffer).cast('B')))
+        memoryview(buffer).cast('B')[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        stop = len(self._view)
+        if size is not None and size >= 0:
+            stop = min(stop, self._position + size)
+
+        end = self._position
+        chunk_size = self._READLINE_CHUNK
+        while end < stop:
+            chunk_end = min(end + chunk_size, stop)
+            newline = self._view[end:chunk_end].tobytes().find(b'\n')
+            if newline >= 0:
+                end += newline + 1
+                break
+            end = chunk_end
+            chunk_size *= 2
+        return self.read(max(end - self._position, 0))
+
+    def close(self):
+        self._view.release()
+        super().close()
@@ -0,0 +1,165 @@
+"""
+Stores many Universal Tabulator contests in a single bundle file, for random access.
+
+A bundle starts with a fixed-size header pointing to its index, a JSON list of each
+contest's id with the byte offset and length of its JSON. :class:`BundleReader`
+memory-maps the file, so looking up a contest reads and decodes only that contest,
+however many the bundle holds.
+
+:class:`BundleWriter` writes each contest as soon as it is added, and the index when
+it is closed. Appending to an existing bundle writes after everything already in it,
+then points the header to a new index, so the bundle stays readable if appending
+is interrupted.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from rcvformats.common import serialization
+
+# The first bytes of every bundle
+MAGIC = b'RCVBNDL1'
+
+# The magic bytes, then the offset and length of the index
+_HEADER = struct.Struct('<8sQQ')
+
+
+class BundleWriter:
+    """
+    Writes contests to a bundle. Use it as a context manager, or call :meth:`close`:
+    the bundle cannot be read until it is closed.
+    """
+
+    def __init__(self, filename, append=False, **json_options):
+        """
+        :param filename: The bundle to write
+        :param append: If True, add to the contests already in the bundle, if it exists.\
+                       Otherwise, the bundle is overwritten.
+        :param json_options: Passed to :func:`rcvformats.common.serialization.dumps`.\
+                             Contests are compact unless compact=False is given.
+        """
+        self.json_options = {'compact': True, **json_options}
+        if append and os.path.exists(filename):
+            self.index = _read_index(filename)
+            self.file_object = open(filename, 'r+b')  # pylint: disable=consider-using-with
+            self.file_object.seek(0, os.SEEK_END)
+        else:
+            self.index = {}
+            self.file_object = open(filename, 'wb')  # pylint: disable=consider-using-with
+            self.file_object.write(_HEADER.pack(MAGIC, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def add(self, contest_id, data):
+        """
+        Writes a contest to the bundle
+
+        :param contest_id: A string unique within the bundle, e.g. the contest name
+        :param data: The contest's Universal Tabulator data
+        """
+        if contest_id in self.index:
+            raise ValueError(f"The bundle already has a contest {contest_id!r}")
+        encoded = serialization.dumps(data, **self.json_options).encode('utf-8')
+        self.index[contest_id] = (self.file_object.tell(), len(encoded))
+        self.file_object.write(encoded)
+
+    def add_many(self, contests):
+        """
+        :param contests: An iterable of (contest_id, data) pairs, or a dict of them
+        """
+        if isinstance(contests, dict):
+            contests = contests.items()
+        for contest_id, data in contests:
+            self.add(contest_id, data)
+
+    def close(self):
+        """ Writes the index and closes the bundle """
+        if self.file_object.closed:
+            return
+        index_offset = self.file_object.tell()
+        encoded_index = json.dumps(
+            [[contest_id, offset, length] for contest_id, (offset, length)
+             in self.index.items()], separators=(',', ':')).encode('utf-8')
+        self.file_object.write(encoded_index)
+        self.file_object.flush()
+
+        # Only now that the new index is complete does the header point to it
+        self.file_object.seek(0)
+        self.file_object.write(_HEADER.pack(MAGIC, index_offset, len(encoded_index)))
+        self.file_object.close()
+
+
+class BundleReader:
+    """
+    Reads contests from a bundle. Acts as a read-only mapping of contest id to
+    Universal Tabulator data, in the order the contests were added.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as file_object:
+            self._mmap = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = _parse_index(self._mmap)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def close(self):
+        """ Unmaps the bundle """
+        self._mmap.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __contains__(self, contest_id):
+        return contest_id in self.index
+
+    def __getitem__(self, contest_id):
+        return json.loads(self.read_bytes(contest_id))
+
+    def read_bytes(self, contest_id):
+        """ :return: The contest's JSON, undecoded, e.g. to serve it as is """
+        offset, length = self.index[contest_id]
+        return self._mmap[offset:offset + length]
+
+    def items(self):
+        """ Decodes each contest in turn, as (contest_id, data) pairs """
+        return ((contest_id, self[contest_id]) for contest_id in self.index)
+
+
+def _read_index(filename):
+    with open(filename, 'rb') as file_object:
+        header = file_object.read(_HEADER.size)
+        index_offset, index_length = _parse_header(header)
+        file_object.seek(index_offset)
+        return _decode_index(file_object.read(index_length))
+
+
+def _parse_index(data):
+    index_offset, index_length = _parse_header(data[:_HEADER.size])
+    return _decode_index(data[index_offset:index_offset + index_length])
+
+
+def _parse_header(header):
+    if len(header) < _HEADER.size or not header.startswith(MAGIC):
+        raise ValueError("Not a bundle file")
+    _, index_offset, index_length = _HEADER.unpack(header)
+    if index_offset == 0:
+        raise ValueError("The bundle was never closed, so has no index")
+    return index_offset, index_length
+
+
+def _decode_index(encoded_index):
+    return {contest_id: (offset, length)
+            for contest_id, offset, length in json.loads(encoded_index)}
@@ -0,0 +1,269 @@
+"""
+A columnar form of Universal Tabulator results, for analytics across many contests.
+
+Instead of nested dicts, a contest is a handful of flat arrays: the candidate names, a
+rounds x candidates matrix of votes, the round each candidate was elected or eliminated,
+and every transfer as a (round, from, to, votes) row. It can be saved as an uncompressed
+.npz file, which :func:`load_npz` memory-maps rather than reads, or as CSV files.
+
+Requires numpy (pip install rcvformats[numpy]).
+"""
+
+import csv
+import json
+import os
+import zipfile
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Filenames written by :meth:`ColumnarElection.save_csv`
+CANDIDATES_CSV = 'candidates.csv'
+VOTES_CSV = 'votes.csv'
+TRANSFERS_CSV = 'transfers.csv'
+CONFIG_JSON = 'config.json'
+
+# The arrays saved in each .npz file
+_ARRAY_NAMES = ('candidates', 'votes', 'elected_round', 'eliminated_round',
+                'transfer_round', 'transfer_from', 'transfer_to', 'transfer_votes')
+
+
+def is_available():
+    """ Whether numpy is installed, and so whether this module can be used """
+    return np is not None
+
+
+class ColumnarElection:  # pylint: disable=too-many-instance-attributes
+    """
+    The results of one contest as arrays. Candidates are referred to by their index in
+    :attr:`candidates`, in the order they first appear, and rounds by their round number.
+    """
+
+    def __init__(self, config, arrays):
+        """
+        :param config: The Universal Tabulator 'config' dict
+        :param arrays: A dict with an array for each of:
+
+            * candidates: the name of each candidate
+            * votes: a rounds x candidates matrix of votes, NaN if a candidate is not in\
+                     that round's tally
+            * elected_round, eliminated_round: for each candidate, the round number they\
+                     were elected or eliminated on, or 0 if they never were
+            * transfer_round, transfer_from, transfer_to, transfer_votes: one row per\
+                     transfer, with its round number, the candidate index it is from\
+                     and to, and the number of votes
+        """
+        if np is None:
+            raise ImportError("Columnar data requires numpy: pip install rcvformats[numpy]")
+        self.config = config
+        self.candidates = arrays['candidates']
+        self.votes = arrays['votes']
+        self.elected_round = arrays['elected_round']
+        self.eliminated_round = arrays['eliminated_round']
+        self.transfer_round = arrays['transfer_round']
+        self.transfer_from = arrays['transfer_from']
+        self.transfer_to = arrays['transfer_to']
+        self.transfer_votes = arrays['transfer_votes']
+
+    @classmethod
+    def from_ut_dict(cls, data):
+        """
+        :param data: Universal Tabulator data, as parsed JSON
+        :return: The equivalent :class:`ColumnarElection`
+        """
+        index_of = {}
+        results = data['results']
+        tally_rows, elected, eliminated, transfers = _read_rounds(
+            results, lambda name: index_of.setdefault(name, len(index_of)))
+
+        votes = np.full((len(results), len(index_of)), np.nan)
+        for round_i, (columns, tally) in enumerate(tally_rows):
+            votes[round_i, columns] = np.asarray(tally, dtype=float)
+
+        transfer_columns = list(zip(*transfers)) or [(), (), (), ()]
+        return cls(data['config'], {
+            'candidates': np.array(list(index_of), dtype=str),
+            'votes': votes,
+            'elected_round': _rounds_per_candidate(elected, len(index_of)),
+            'eliminated_round': _rounds_per_candidate(eliminated, len(index_of)),
+            'transfer_round': np.array(transfer_columns[0], dtype=np.int32),
+            'transfer_from': np.array(transfer_columns[1], dtype=np.int32),
+            'transfer_to': np.array(transfer_columns[2], dtype=np.int32),
+            'transfer_votes': np.array(transfer_columns[3], dtype=float),
+        })
+
+    @property
+    def num_rounds(self):
+        """ The number of rounds """
+        return self.votes.shape[0]
+
+    def transfer_matrix(self, round_number):
+        """
+        :return: A candidates x candidates matrix of the votes transferred on the given round,
+                 from the row's candidate to the column's
+        """
+        matrix = np.zeros((len(self.candidates), len(self.candidates)))
+        rows = self.transfer_round == round_number
+        np.add.at(matrix, (self.transfer_from[rows], self.transfer_to[rows]),
+                  self.transfer_votes[rows])
+        return matrix
+
+    def save_npz(self, file):
+        """
+        Saves to an uncompressed .npz file, which :func:`load_npz` can memory-map
+
+        :param file: A filename or binary file object
+        """
+        arrays = {name: getattr(self, name) for name in _ARRAY_NAMES}
+        np.savez(file, config=np.array(json.dumps(self.config)), **arrays)
+
+    def save_csv(self, directory):
+        """
+        Saves as CSV files in directory, which is created if it does not exist:
+        candidates.csv, with each candidate's index, name and elected and eliminated round;
+        votes.csv, with a row per round and a column per candidate; transfers.csv, with
+        a row per transfer; and config.json.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, CONFIG_JSON), 'w', encoding='utf-8') as file_obj:
+            json.dump(self.config, file_obj)
+
+        _write_csv(os.path.join(directory, CANDIDATES_CSV),
+                   ['index', 'name', 'elected_round', 'eliminated_round'],
+                   zip(range(len(self.candidates)), self.candidates.tolist(),
+                       self.elected_round.tolist(), self.eliminated_round.tolist()))
+        _write_csv(os.path.join(directory, VOTES_CSV),
+                   ['round'] + self.candidates.tolist(),
+                   ([round_i + 1] + ['' if np.isnan(v) else v for v in row]
+                    for round_i, row in enumerate(self.votes.tolist())))
+        _write_csv(os.path.join(directory, TRANSFERS_CSV),
+                   ['round', 'from', 'to', 'votes'],
+                   zip(self.transfer_round.tolist(), self.transfer_from.tolist(),
+                       self.transfer_to.tolist(), self.transfer_votes.tolist()))
+
+
+def _read_rounds(results, index):
+    """
+    :param index: Returns the index of a candidate's name
+    :return: A tuple of (the candidate indices and votes in each tally, the round each\
+             candidate index was elected on, and eliminated on, and each transfer)
+    """
+    tally_rows = []
+    elected = {}
+    eliminated = {}
+    transfers = []
+    for round_data in results:
+        round_number = round_data['round']
+        tally_rows.append(([index(name) for name in round_data['tally']],
+                           list(round_data['tally'].values())))
+        for tally_result in round_data['tallyResults']:
+            if 'elected' in tally_result:
+                from_index = index(tally_result['elected'])
+                elected[from_index] = round_number
+            else:
+                from_index = index(tally_result['eliminated'])
+                eliminated[from_index] = round_number
+            for name, votes in tally_result.get('transfers', {}).items():
+                transfers.append((round_number, from_index, index(name), votes))
+    return tally_rows, elected, eliminated, transfers
+
+
+def _rounds_per_candidate(round_by_index, num_candidates):
+    rounds = np.zeros(num_candidates, dtype=np.int32)
+    rounds[list(round_by_index)] = list(round_by_index.values())
+    return rounds
+
+
+def _write_csv(filename, header, rows):
+    with open(filename, 'w', encoding='utf-8', newline='') as file_obj:
+        writer = csv.writer(file_obj)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def load_npz(filename, mmap=True):
+    """
+    Loads a file saved by :meth:`ColumnarElection.save_npz`.
+
+    :param filename: The .npz filename
+    :param mmap: If True, each array is memory-mapped from the file rather than read,
+                 so only the parts used are ever loaded
+    :return: The :class:`ColumnarElection`
+    """
+    if np is None:
+        raise ImportError("Columnar data requires numpy: pip install rcvformats[numpy]")
+    if not mmap:
+        with np.load(filename) as npz:
+            arrays = {name: npz[name] for name in _ARRAY_NAMES}
+            return ColumnarElection(json.loads(str(npz['config'])), arrays)
+
+    arrays = {}
+    with zipfile.ZipFile(filename) as zip_file, open(filename, 'rb') as file_obj:
+        for info in zip_file.infolist():
+            name = info.filename[:-len('.npy')]
+            arrays[name] = _memory_map_member(filename, file_obj, info)
+    config = json.loads(str(arrays.pop('config')))
+    return ColumnarElection(config, arrays)
+
+
+def _memory_map_member(filename, file_obj, info):
+    """ Memory-maps one uncompressed .npy member of a .npz file """
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{info.filename} is compressed, so cannot be memory-mapped")
+
+    # The member's data follows its local header, whose name and extra fields
+    # may differ in length from those in the central directory
+    file_obj.seek(info.header_offset + 26)
+    name_length, extra_length = np.frombuffer(file_obj.read(4), dtype='<u2')
+    file_obj.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+
+    version = np.lib.format.read_magic(file_obj)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file_obj)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file_obj)
+    else:
+        raise ValueError(f"{info.filename} uses unsupported .npy version {version}")
+    if dtype.hasobject:
+        raise ValueError(f"{info.filename} holds python objects, so cannot be memory-mapped")
+    if not shape or 0 in shape:
+        # np.memmap cannot map empty arrays, and scalars are tiny, so just read them
+        count = int(np.prod(shape))
+        return np.fromfile(file_obj, dtype=dtype, count=count).reshape(shape)
+    return np.memmap(filename, dtype=dtype, mode='r', offset=file_obj.tell(), shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def load_csv(directory):
+    """
+    Loads the files saved by :meth:`ColumnarElection.save_csv`.
+
+    :return: The :class:`ColumnarElection`
+    """
+    if np is None:
+        raise ImportError("Columnar data requires numpy: pip install rcvformats[numpy]")
+    with open(os.path.join(directory, CONFIG_JSON), 'r', encoding='utf-8') as file_obj:
+        config = json.load(file_obj)
+
+    candidates = _read_csv(os.path.join(directory, CANDIDATES_CSV))
+    votes = _read_csv(os.path.join(directory, VOTES_CSV))
+    transfers = _read_csv(os.path.join(directory, TRANSFERS_CSV))
+    return ColumnarElection(config, {
+        'candidates': np.array([row[1] for row in candidates], dtype=str),
+        'votes': np.array([[float(v) if v else np.nan for v in row[1:]] for row in votes],
+                          dtype=float).reshape(len(votes), len(candidates)),
+        'elected_round': np.array([int(row[2]) for row in candidates], dtype=np.int32),
+        'eliminated_round': np.array([int(row[3]) for row in candidates], dtype=np.int32),
+        'transfer_round': np.array([int(row[0]) for row in transfers], dtype=np.int32),
+        'transfer_from': np.array([int(row[1]) for row in transfers], dtype=np.int32),
+        'transfer_to': np.array([int(row[2]) for row in transfers], dtype=np.int32),
+        'transfer_votes': np.array([float(row[3]) for row in transfers], dtype=float),
+    })
+
+
+def _read_csv(filename):
+    """ :return: Every row but the header """
+    with open(filename, 'r', encoding='utf-8', newline='') as file_obj:
+        return list(csv.reader(file_obj))[1:]
@@ -0,0 +1,93 @@
+"""
+Transparently reads and writes gzip, bz2 and xz compressed files.
+
+Compressed input is recognized by its magic bytes rather than its filename, so it works
+for file objects and buffers too. Compressed output is chosen by the filename's extension.
+Input is decompressed as the parser reads it, without a decompressed copy on disk,
+and output is compressed as it is written.
+"""
+
+import bz2
+import contextlib
+import gzip
+import lzma
+
+GZIP = 'gzip'
+BZ2 = 'bz2'
+XZ = 'xz'
+
+# The first bytes of each type of compressed file
+_MAGIC_BYTES = {
+    GZIP: b'\x1f\x8b',
+    BZ2: b'BZh',
+    XZ: b'\xfd7zXZ\x00',
+}
+_MOST_MAGIC_BYTES = max(map(len, _MAGIC_BYTES.values()))
+
+_EXTENSIONS = {
+    '.gz': GZIP,
+    '.bz2': BZ2,
+    '.xz': XZ,
+}
+
+# Opens a filename or file object with each compression
+_OPENERS = {
+    GZIP: gzip.open,
+    BZ2: bz2.open,
+    XZ: lzma.open,
+}
+
+
+def sniff(file_object):
+    """
+    Peeks at the first bytes of the file, leaving its position unchanged.
+
+    :param file_object: A seekable file object
+    :return: GZIP, BZ2, XZ, or None if it is not compressed
+    """
+    position = file_object.tell()
+    head = file_object.read(_MOST_MAGIC_BYTES)
+    file_object.seek(position)
+    if not isinstance(head, bytes):
+        return None
+    for compression, magic in _MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+@contextlib.contextmanager
+def decompressed(file_object):
+    """
+    :param file_object: A seekable file object, which may or may not be compressed
+    :return: A context manager giving a file object of the decompressed contents,\
+             or file_object itself if it is not compressed. file_object is not closed.
+    """
+    compression = sniff(file_object)
+    if compression is None:
+        yield file_object
+        return
+
+    with _OPENERS[compression](file_object, 'rb') as decompressed_file:
+        yield decompressed_file
+
+
+def compression_for_filename(filename):
+    """ :return: GZIP, BZ2, XZ, or None, based on the filename's extension """
+    for extension, compression in _EXTENSIONS.items():
+        if str(filename).lower().endswith(extension):
+            return compression
+    return None
+
+
+def open_for_writing(filename):
+    """
+    Opens a text file for writing, compressed if the filename ends in .gz, .bz2 or .xz
+
+    :param filename: The file to write to
+    :return: A text file object, to be closed by the caller
+    """
+    compression = compression_for_filename(filename)
+    if compression is None:
+        return open(filename, 'w', encoding='utf-8')  # pylint: disable=consider-using-with
+    return _OPENERS[compression](filename, 'wt', encoding='utf-8')
@@ -0,0 +1,162 @@
+"""
+Reads a JSON document from a file a chunk at a time, rather than all at once.
+
+json.load reads the whole file into memory before parsing any of it, so at its peak it
+holds both the text and the parsed data. Here, each element of the document's top-level
+arrays, such as each of the "rounds" of an OpaVote report or the "results" of a Universal
+Tabulator file, is decoded as soon as it has been read, and its text then dropped. Only
+the chunk being parsed is held as text, so very long reports are read with little more
+memory than their parsed data. An item hook can shrink each element as it is decoded,
+e.g. to drop the text of each round that a converter has no use for.
+"""
+
+import codecs
+import json
+import re
+
+# How many bytes are read from the file at once
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters which may continue a number, so cannot end a chunk after a complete one
+_NUMBER_CHARACTERS = frozenset('0123456789.eE+-')
+
+
+def load(file_object, item_hooks=None, chunk_size=CHUNK_SIZE):
+    """
+    Like json.load, but the file is read a chunk at a time.
+
+    :param file_object: A binary file object, in UTF-8, UTF-16 or UTF-32, or a file object\
+                        opened in text mode
+    :param item_hooks: A dict of top-level keys, e.g. 'rounds', to a function called on\
+                       each element of that key's array as soon as it is decoded. The\
+                       array holds whatever the function returns instead.
+    :param chunk_size: How many bytes, or characters, to read at once
+    :return: The decoded document
+    :raises json.JSONDecodeError: If the file is not valid JSON
+    :raises UnicodeDecodeError: If the file is not valid text
+    """
+    reader = _ChunkReader(file_object, chunk_size)
+    if reader.peek() == '{':
+        data = dict(_iter_object_items(reader, item_hooks or {}))
+    else:
+        data = reader.value()
+    if reader.peek() != '':
+        raise reader.error("Extra data")
+    return data
+
+
+def _iter_object_items(reader, item_hooks):
+    """ Yields each (key, value) of the object, decoding each array element by element """
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.expect('}')
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise reader.error("Expecting property name enclosed in double quotes")
+        reader.expect(':')
+        if reader.peek() == '[':
+            yield key, _read_array(reader, item_hooks.get(key))
+        else:
+            yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def _read_array(reader, item_hook):
+    """ Decodes an array one element at a time, calling item_hook on each if given """
+    reader.expect('[')
+    items = []
+    if reader.peek() == ']':
+        reader.expect(']')
+        return items
+    while True:
+        item = reader.value()
+        items.append(item if item_hook is None else item_hook(item))
+        if reader.expect(',]') == ']':
+            return items
+
+
+class _ChunkReader:
+    """ Text decoded from a file, read a chunk at a time as it is parsed """
+
+    def __init__(self, file_object, chunk_size):
+        self.file_object = file_object
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.position = 0
+        self.is_at_end = False
+
+        # Like json.load, every equal key shares one string, e.g. each candidate's name
+        # in every round's tally. raw_decode alone would only share them within an element.
+        keys = {}
+        self.decoder = json.JSONDecoder(object_pairs_hook=lambda pairs: {
+            keys.setdefault(key, key): value for key, value in pairs})
+
+        head = file_object.read(chunk_size)
+        if isinstance(head, str):
+            # Opened in text mode, so already decoded
+            self.text_decoder = None
+            self.text = head
+        else:
+            self.text_decoder = codecs.getincrementaldecoder(json.detect_encoding(head))()
+            self.text = self.text_decoder.decode(head)
+
+    def _read_more(self):
+        """
+        Reads another chunk, dropping the text already parsed. The chunk is at least as
+        long as the text left, so that retrying to decode a long value takes linear time.
+
+        :return: False if there was nothing more to read
+        """
+        if self.is_at_end:
+            return False
+        self.text = self.text[self.position:]
+        self.position = 0
+        chunk = self.file_object.read(max(self.chunk_size, len(self.text)))
+        self.is_at_end = not chunk
+        if self.text_decoder is None:
+            self.text += chunk
+        else:
+            self.text += self.text_decoder.decode(chunk, final=self.is_at_end)
+        return True
+
+    def peek(self):
+        """ :return: The next character which is not whitespace, or '' at the end """
+        while True:
+            self.position = _WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self._read_more():
+                return ''
+
+    def expect(self, characters):
+        """ Consumes the next character, which must be one of characters """
+        character = self.peek()
+        if character == '' or character not in characters:
+            raise self.error(f"Expecting one of {characters!r}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """ Decodes the next value, reading as many chunks as it spans """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.text, self.position)
+                # A number is only known to be complete once followed by something else
+                if self.is_at_end or \
+                        (end < len(self.text) and self.text[end] not in _NUMBER_CHARACTERS):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.is_at_end:
+                    raise
+            self._read_more()
+
+    def error(self, message):
+        """ :return: A JSONDecodeError for the current position """
+        return json.JSONDecodeError(message, self.text, self.position)
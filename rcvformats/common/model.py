@@ -0,0 +1,210 @@
+"""
+A compact, in-memory representation of Universal Tabulator data.
+
+Each candidate name is stored once, and everywhere else a candidate is referred to by its
+integer id: its index in :attr:`Election.candidate_names`. Tallies and transfers are held
+as parallel arrays of ids and votes rather than as dicts keyed by name, which takes a
+fraction of the memory and far fewer objects for the garbage collector to track.
+"""
+
+import array
+import collections.abc
+import json
+import sys
+
+
+def compact_votes(votes):
+    """
+    Packs vote counts into an array, if they are all ints or all floats,
+    so that they are held without a python object for each count.
+
+    :param votes: An iterable of vote counts
+    :return: An array, or a list if the counts are of mixed or other types
+    """
+    votes = list(votes)
+    types = set(map(type, votes))
+    try:
+        if types == {int}:
+            return array.array('q', votes)
+        if types == {float}:
+            return array.array('d', votes)
+    except OverflowError:
+        pass
+    return votes
+
+
+class TallyResult:  # pylint: disable=too-few-public-methods
+    """ One candidate being elected or eliminated, and where their votes went """
+    __slots__ = ('is_elected', 'candidate_id', 'transfer_ids', 'transfer_votes')
+
+    def __init__(self, is_elected, candidate_id, transfer_ids=None, transfer_votes=None):
+        """
+        :param is_elected: True if elected, False if eliminated
+        :param candidate_id: Id of the elected or eliminated candidate
+        :param transfer_ids: Ids of each candidate receiving votes, or None if there\
+                             are no transfers listed
+        :param transfer_votes: The votes received by each candidate in transfer_ids
+        """
+        self.is_elected = is_elected
+        self.candidate_id = candidate_id
+        self.transfer_ids = transfer_ids
+        self.transfer_votes = transfer_votes
+
+    def to_ut_dict(self, names):
+        """ :param names: :attr:`Election.candidate_names` """
+        tally_result = {('elected' if self.is_elected else 'eliminated'): names[self.candidate_id]}
+        if self.transfer_ids is not None:
+            tally_result['transfers'] = dict(zip(map(names.__getitem__, self.transfer_ids),
+                                                 self.transfer_votes))
+        return tally_result
+
+
+class Round:
+    """ The tally of a single round, and what happened on it """
+    __slots__ = ('number', 'candidate_ids', 'votes', 'tally_results')
+
+    def __init__(self, number, candidate_ids=None, votes=None, tally_results=None):
+        """
+        :param number: Round number, starting at 1
+        :param candidate_ids: Ids of each candidate in the tally, in order
+        :param votes: The votes of each candidate in candidate_ids: a list, or an array\
+                      from :func:`compact_votes`. Ints stay ints and floats stay floats.
+        :param tally_results: a list of :class:`TallyResult`
+        """
+        self.number = number
+        self.candidate_ids = array.array('I') if candidate_ids is None else candidate_ids
+        self.votes = [] if votes is None else votes
+        self.tally_results = [] if tally_results is None else tally_results
+
+    def add_votes(self, candidate_id, votes):
+        """ Adds a candidate to the tally """
+        self.candidate_ids.append(candidate_id)
+        self.votes.append(votes)
+
+    def elected_ids(self):
+        """ Ids of each candidate elected this round """
+        return [r.candidate_id for r in self.tally_results if r.is_elected]
+
+    def eliminated_ids(self):
+        """ Ids of each candidate eliminated this round """
+        return [r.candidate_id for r in self.tally_results if not r.is_elected]
+
+    def to_ut_dict(self, names):
+        """ :param names: :attr:`Election.candidate_names` """
+        return {
+            'round': self.number,
+            'tally': dict(zip(map(names.__getitem__, self.candidate_ids), self.votes)),
+            'tallyResults': [r.to_ut_dict(names) for r in self.tally_results]
+        }
+
+
+class RoundsView(collections.abc.Sequence):
+    """
+    The rounds of an :class:`Election` as a read-only sequence of Universal Tabulator
+    dicts, each built only when it is looked at. Code written for parsed JSON, such as
+    the schema's checks, can then run on the model without converting all of it at once.
+    """
+    __slots__ = ('_election',)
+
+    def __init__(self, election):
+        self._election = election
+
+    def __len__(self):
+        return len(self._election.rounds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._election.rounds[index].to_ut_dict(self._election.candidate_names)
+
+
+class Election:
+    """ The config and rounds of a single contest """
+    __slots__ = ('config', 'candidate_names', '_ids_by_name', 'rounds')
+
+    def __init__(self, config=None):
+        """
+        :param config: The Universal Tabulator 'config' dict
+        """
+        self.config = {} if config is None else config
+        self.candidate_names = []
+        self._ids_by_name = {}
+        self.rounds = []
+
+    def candidate_id(self, name):
+        """
+        :return: The id of the named candidate, adding them if they are new.
+                 Names are interned, so each is only held in memory once.
+        """
+        candidate_id = self._ids_by_name.get(name)
+        if candidate_id is None:
+            candidate_id = len(self.candidate_names)
+            name = sys.intern(name)
+            self.candidate_names.append(name)
+            self._ids_by_name[name] = candidate_id
+        return candidate_id
+
+    def add_round(self):
+        """ Adds and returns the next round """
+        new_round = Round(len(self.rounds) + 1)
+        self.rounds.append(new_round)
+        return new_round
+
+    @classmethod
+    def from_ut_dict(cls, data):
+        """
+        :param data: Universal Tabulator data, as parsed JSON
+        :return: An equivalent :class:`Election`
+        """
+        election = cls(data['config'])
+        candidate_id = election.candidate_id
+        for round_data in data['results']:
+            tally = round_data['tally']
+            tally_results = []
+            for tally_result in round_data['tallyResults']:
+                is_elected = 'elected' in tally_result
+                name = tally_result['elected'] if is_elected else tally_result['eliminated']
+                transfer_ids = transfer_votes = None
+                if 'transfers' in tally_result:
+                    transfers = tally_result['transfers']
+                    transfer_ids = array.array('I', map(candidate_id, transfers))
+                    transfer_votes = compact_votes(transfers.values())
+                tally_results.append(TallyResult(
+                    is_elected, candidate_id(name), transfer_ids, transfer_votes))
+            election.rounds.append(Round(
+                round_data['round'],
+                array.array('I', map(candidate_id, tally)),
+                compact_votes(tally.values()),
+                tally_results))
+        return election
+
+    def to_ut_dict(self):
+        """ :return: The Universal Tabulator representation of this election """
+        return {
+            'config': self.config,
+            'results': [r.to_ut_dict(self.candidate_names) for r in self.rounds]
+        }
+
+    def ut_view(self):
+        """
+        :return: The Universal Tabulator data, with its 'results' a :class:`RoundsView`,\
+                 so that each round's dicts only exist while that round is looked at
+        """
+        return {'config': self.config, 'results': RoundsView(self)}
+
+    def write_json(self, file_object):
+        """
+        Writes the same text as json.dump(self.to_ut_dict(), file_object), but one round at
+        a time, so the dicts for the whole election are never all in memory at once.
+
+        :param file_object: A text file object
+        """
+        names = self.candidate_names
+        file_object.write('{"config": ')
+        file_object.write(json.dumps(self.config))
+        file_object.write(', "results": [')
+        for round_i, round_data in enumerate(self.rounds):
+            if round_i:
+                file_object.write(', ')
+            file_object.write(json.dumps(round_data.to_ut_dict(names)))
+        file_object.write(']}')
@@ -0,0 +1,101 @@
+"""
+Helpers for measuring the time and memory cost of conversions and validations
+"""
+
+import time
+import tracemalloc
+
+
+class Measurement:  # pylint: disable=too-few-public-methods
+    """
+    The cost of running a single operation: wall-clock time, peak memory,
+    and the size of the input it ran on, from which throughput is derived.
+    """
+
+    def __init__(self, seconds, peak_bytes, input_bytes=None, num_rounds=None):
+        # Fastest wall-clock time of all timed runs
+        self.seconds = seconds
+
+        # Peak memory allocated by python while running, as reported by tracemalloc
+        self.peak_bytes = peak_bytes
+
+        # Size of the input, if known
+        self.input_bytes = input_bytes
+
+        # Number of rounds in the output, if known
+        self.num_rounds = num_rounds
+
+    def as_dict(self):
+        """ A JSON-serializable representation of this measurement """
+        return {
+            'seconds': self.seconds,
+            'peak_bytes': self.peak_bytes,
+            'input_bytes': self.input_bytes,
+            'num_rounds': self.num_rounds,
+            'bytes_per_second': self._per_second(self.input_bytes),
+            'rounds_per_second': self._per_second(self.num_rounds),
+        }
+
+    def _per_second(self, amount):
+        if amount is None or self.seconds <= 0:
+            return None
+        return amount / self.seconds
+
+
+def peak_memory_of(func, *args, **kwargs):
+    """
+    Runs func once under tracemalloc.
+
+    :return: a tuple of (the return value of func, peak bytes allocated while running it)
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return result, peak - baseline
+
+
+def measure(func, *args, repeat=3, input_bytes=None, **kwargs):
+    """
+    Times func, keeping the fastest of several runs, then runs it one more time
+    under tracemalloc to find its peak memory. Tracing is kept out of the timed
+    runs because it slows python down considerably.
+
+    :param func: The function to measure
+    :param repeat: How many timed runs to make
+    :param input_bytes: The size of the input, used to report throughput
+    :return: a tuple of (the return value of func, :class:`Measurement`)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    result, peak = peak_memory_of(func, *args, **kwargs)
+
+    num_rounds = None
+    if isinstance(result, dict) and isinstance(result.get('results'), list):
+        num_rounds = len(result['results'])
+
+    return result, Measurement(best, peak, input_bytes, num_rounds)
+
+
+def peak_memory_of_conversion(converter, data):
+    """
+    Measures how much memory a conversion needs, which is useful for sizing worker limits.
+
+    :param converter: Any :class:`~rcvformats.conversions.base.Converter`
+    :param data: Anything the converter accepts: a filename, file object, or JSON data
+    :return: the peak number of bytes python allocated during the conversion
+    """
+    _, peak = peak_memory_of(converter.convert_to_ut, data)
+    return peak
@@ -0,0 +1,164 @@
+"""
+Writes Universal Tabulator data as JSON.
+
+By default, the output is exactly what json.dump would write. With compact=True, there is
+no whitespace between items. Passing encoder=ORJSON encodes with orjson, which is several
+times faster, but writes non-ASCII characters as they are rather than escaped, and NaN and
+infinity as null, so it is only used when asked for. If orjson is asked for but is not
+installed, the standard library is used instead, with a warning.
+
+Large documents are streamed: each item of a top-level list, such as each round of the
+"results", is encoded and written on its own, with writes batched into large chunks.
+"""
+
+import io
+import json
+import warnings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Encoders
+STDLIB = 'json'
+ORJSON = 'orjson'
+
+# Size of the chunks written to the file
+_WRITE_CHUNK_SIZE = 1 << 16
+
+
+def is_orjson_available():
+    """ Is the faster, optional orjson encoder installed? """
+    return orjson is not None
+
+
+def dumps(data, compact=False, float_precision=None, encoder=None):
+    """
+    :param data: JSON-serializable data
+    :param compact: Leave out the spaces after commas and colons
+    :param float_precision: If set, round each float transfer value to this many decimal\
+                            places. Tallies, thresholds and other numbers are left as they are.
+    :param encoder: STDLIB, the default, or ORJSON, which needs compact. Falls back to\
+                    STDLIB, with a RuntimeWarning, if orjson is not installed.
+    :return: The JSON text
+    """
+    file_object = io.StringIO()
+    dump(data, file_object, compact, float_precision, encoder)
+    return file_object.getvalue()
+
+
+def dump(data, file_object, compact=False, float_precision=None, encoder=None):
+    """
+    Streams data to a text or binary file object. See :func:`dumps` for the options.
+    """
+    encode = _make_encoder(compact, _choose_encoder(compact, encoder))
+    if float_precision is not None:
+        encode = _rounding_transfers(encode, float_precision)
+    item_separator, key_separator = (',', ':') if compact else (', ', ': ')
+
+    with _ChunkedWriter(file_object) as write:
+        if not isinstance(data, dict):
+            write(encode(data))
+            return
+
+        # Encode one level down, so a long list is never encoded all at once
+        write('{')
+        for key_i, (key, value) in enumerate(data.items()):
+            if key_i:
+                write(item_separator)
+            write(json.dumps(str(key)) + key_separator)
+            if not isinstance(value, list):
+                write(encode(value))
+                continue
+            write('[')
+            for item_i, item in enumerate(value):
+                if item_i:
+                    write(item_separator)
+                write(encode(item))
+            write(']')
+        write('}')
+
+
+def _choose_encoder(compact, encoder):
+    if encoder is None or encoder == STDLIB:
+        return STDLIB
+    if encoder == ORJSON:
+        if not compact:
+            raise ValueError("orjson can only write compact JSON")
+        if not is_orjson_available():
+            warnings.warn("orjson is not installed, so the standard library encoder is used",
+                          RuntimeWarning, stacklevel=3)
+            return STDLIB
+    else:
+        raise ValueError(f"Unknown JSON encoder: {encoder}. Must be '{STDLIB}' or '{ORJSON}'.")
+    return encoder
+
+
+def _make_encoder(compact, encoder):
+    """ :return: A function encoding data to a JSON string """
+    if encoder == ORJSON:
+        return lambda data: orjson.dumps(data).decode('utf-8')  # pylint: disable=no-member
+    if compact:
+        return json.JSONEncoder(separators=(',', ':')).encode
+    return json.JSONEncoder().encode
+
+
+def _rounding_transfers(encode, float_precision):
+    """ Wraps encode to first round every float in the values of each 'transfers' dict """
+    def round_transfers(data):
+        if isinstance(data, dict):
+            return {key: round_floats(value) if key == 'transfers' else round_transfers(value)
+                    for key, value in data.items()}
+        if isinstance(data, (list, tuple)):
+            return [round_transfers(value) for value in data]
+        return data
+
+    def round_floats(data):
+        if isinstance(data, float):
+            return round(data, float_precision)
+        if isinstance(data, dict):
+            return {key: round_floats(value) for key, value in data.items()}
+        return data
+
+    return lambda data: encode(round_transfers(data))
+
+
+class _ChunkedWriter:
+    """ Collects strings, and writes them to the file in large chunks """
+
+    def __init__(self, file_object):
+        self.file_object = file_object
+        self.is_binary = _is_binary(file_object)
+        self.pending = []
+        self.pending_size = 0
+
+    def __enter__(self):
+        return self.write
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.flush()
+
+    def write(self, text):
+        """ Queues text to be written """
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= _WRITE_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """ Writes everything queued """
+        chunk = ''.join(self.pending)
+        self.file_object.write(chunk.encode('utf-8') if self.is_binary else chunk)
+        self.pending = []
+        self.pending_size = 0
+
+
+def _is_binary(file_object):
+    """ Does the file object take bytes rather than str? """
+    if isinstance(file_object, io.TextIOBase):
+        return False
+    if isinstance(file_object, (io.BufferedIOBase, io.RawIOBase)):
+        return True
+    return 'b' in getattr(file_object, 'mode', '')
@@ -0,0 +1,293 @@
+"""
+Stores converted contests in a SQLite database, so that questions across thousands of
+contests, such as "which contests did this candidate run in", are answered with an
+indexed query rather than by reading every file.
+
+Each part of the Universal Tabulator format gets its own table, and every tally, list
+of tally results and transfer keeps its original order, so :meth:`ContestStore.load`
+returns exactly the data added.
+Only the standard library's sqlite3 is needed.
+"""
+
+import itertools
+import json
+import sqlite3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contests (
+    id INTEGER PRIMARY KEY,
+    contest TEXT NOT NULL,
+    date TEXT,
+    jurisdiction TEXT,
+    office TEXT,
+    -- JSON-encoded, as it may be a number or a string
+    threshold TEXT,
+    num_rounds INTEGER NOT NULL,
+    -- Where the contest came from, e.g. its filename
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    contest_id INTEGER NOT NULL REFERENCES contests(id) ON DELETE CASCADE,
+    round INTEGER NOT NULL,
+    PRIMARY KEY (contest_id, round)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tallies (
+    contest_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL REFERENCES candidates(id),
+    -- Untyped, so ints, floats and strings are returned as they were stored
+    votes,
+    PRIMARY KEY (contest_id, round, position),
+    FOREIGN KEY (contest_id, round) REFERENCES rounds(contest_id, round) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tally_results (
+    contest_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL REFERENCES candidates(id),
+    is_elected INTEGER NOT NULL,
+    has_transfers INTEGER NOT NULL,
+    PRIMARY KEY (contest_id, round, position),
+    FOREIGN KEY (contest_id, round) REFERENCES rounds(contest_id, round) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS transfers (
+    contest_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    result_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL REFERENCES candidates(id),
+    votes,
+    PRIMARY KEY (contest_id, round, result_position, position),
+    FOREIGN KEY (contest_id, round, result_position)
+        REFERENCES tally_results(contest_id, round, position) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contests_by_contest ON contests(contest);
+CREATE INDEX IF NOT EXISTS contests_by_date ON contests(date);
+CREATE INDEX IF NOT EXISTS contests_by_jurisdiction ON contests(jurisdiction);
+CREATE INDEX IF NOT EXISTS tallies_by_candidate ON tallies(candidate_id, contest_id);
+CREATE INDEX IF NOT EXISTS tally_results_by_candidate ON tally_results(candidate_id, contest_id);
+"""
+
+# Config keys with their own column, in the order they are restored
+_CONFIG_COLUMNS = ('contest', 'date', 'jurisdiction', 'office', 'threshold')
+
+
+class ContestStore:
+    """
+    A SQLite database of contests. Use it as a context manager, or call :meth:`close`.
+    :attr:`connection` is available for queries beyond those provided here.
+    """
+
+    def __init__(self, filename=':memory:'):
+        """
+        :param filename: The database file, created if it does not exist
+        """
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(_SCHEMA)
+        self._candidate_ids = dict(
+            (name, candidate_id) for candidate_id, name in
+            self.connection.execute('SELECT id, name FROM candidates'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def close(self):
+        """ Closes the database """
+        self.connection.close()
+
+    def add(self, data, source=None):
+        """
+        Adds a single contest. See :meth:`add_many` to add many at once, much faster.
+
+        :param data: Universal Tabulator data, e.g. from\
+                     :func:`~rcvformats.conversions.base.Converter.convert_to_ut_and_validate`
+        :param source: Optional description of where it came from, e.g. its filename
+        :return: The id of the new contest
+        """
+        return self.add_many([data], [source])[0]
+
+    def add_many(self, contests, sources=None):
+        """
+        Adds many contests in a single transaction: either all are added, or none are.
+
+        :param contests: An iterable of Universal Tabulator data
+        :param sources: An optional iterable of where each contest came from
+        :return: A list of the id of each new contest
+        """
+        sources = itertools.repeat(None) if sources is None else sources
+        rows = _Rows()
+        contest_ids = []
+        # Candidates added in a transaction which is rolled back no longer exist
+        candidate_ids = dict(self._candidate_ids)
+        try:
+            with self.connection:
+                for data, source in zip(contests, sources):
+                    contest_id = self._insert_contest(
+                        data['config'], len(data['results']), source)
+                    self._collect_rows(rows, contest_id, data['results'])
+                    contest_ids.append(contest_id)
+                rows.insert_into(self.connection)
+        except BaseException:
+            self._candidate_ids = candidate_ids
+            raise
+        return contest_ids
+
+    def add_converted(self, converter, filenames):
+        """
+        Converts and validates each file, then adds them all in a single transaction.
+
+        :param converter: A :class:`~rcvformats.conversions.base.Converter`
+        :param filenames: The files to convert, each recorded as its contest's source
+        :return: A list of the id of each new contest
+        """
+        filenames = list(filenames)
+        contests = [converter.convert_to_ut_and_validate(filename) for filename in filenames]
+        return self.add_many(contests, [str(filename) for filename in filenames])
+
+    def _insert_contest(self, config, num_rounds, source):
+        extra_keys = set(config) - set(_CONFIG_COLUMNS)
+        if extra_keys:
+            raise ValueError(f"Unknown config keys: {sorted(extra_keys)}")
+        threshold = json.dumps(config['threshold']) if 'threshold' in config else None
+        cursor = self.connection.execute(
+            'INSERT INTO contests (contest, date, jurisdiction, office, threshold, num_rounds,'
+            ' source) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (config['contest'], config.get('date'), config.get('jurisdiction'),
+             config.get('office'), threshold, num_rounds, source))
+        return cursor.lastrowid
+
+    def _candidate_id(self, name):
+        """ The id of the named candidate, adding them if they are new """
+        candidate_id = self._candidate_ids.get(name)
+        if candidate_id is None:
+            candidate_id = self.connection.execute(
+                'INSERT INTO candidates (name) VALUES (?)', (name,)).lastrowid
+            self._candidate_ids[name] = candidate_id
+        return candidate_id
+
+    def _collect_rows(self, rows, contest_id, results):
+        candidate_id = self._candidate_id
+        for round_data in results:
+            round_number = round_data['round']
+            rows.rounds.append((contest_id, round_number))
+            rows.tallies.extend(
+                (contest_id, round_number, position, candidate_id(name), votes)
+                for position, (name, votes) in enumerate(round_data['tally'].items()))
+            for result_position, tally_result in enumerate(round_data['tallyResults']):
+                is_elected = 'elected' in tally_result
+                name = tally_result['elected'] if is_elected else tally_result['eliminated']
+                rows.tally_results.append((
+                    contest_id, round_number, result_position, candidate_id(name),
+                    is_elected, 'transfers' in tally_result))
+                rows.transfers.extend(
+                    (contest_id, round_number, result_position, position, candidate_id(to_name),
+                     votes) for position, (to_name, votes) in
+                    enumerate(tally_result.get('transfers', {}).items()))
+
+    def load(self, contest_id):
+        """
+        :param contest_id: As returned by :meth:`add`
+        :return: The Universal Tabulator data of the contest
+        :raises KeyError: If there is no such contest
+        """
+        contest_row = self.connection.execute(
+            'SELECT contest, date, jurisdiction, office, threshold FROM contests WHERE id = ?',
+            (contest_id,)).fetchone()
+        if contest_row is None:
+            raise KeyError(contest_id)
+        config = {key: value for key, value in zip(_CONFIG_COLUMNS, contest_row)
+                  if value is not None}
+        if 'threshold' in config:
+            config['threshold'] = json.loads(config['threshold'])
+
+        results = [{'round': round_number, 'tally': {}, 'tallyResults': []}
+                   for round_number, in self.connection.execute(
+                       'SELECT round FROM rounds WHERE contest_id = ? ORDER BY round',
+                       (contest_id,))]
+        rounds_by_number = {round_data['round']: round_data for round_data in results}
+
+        for round_number, name, votes in self.connection.execute(
+                'SELECT round, name, votes FROM tallies JOIN candidates ON candidate_id = id'
+                ' WHERE contest_id = ? ORDER BY round, position', (contest_id,)):
+            rounds_by_number[round_number]['tally'][name] = votes
+
+        tally_results = {}
+        for round_number, position, name, is_elected, has_transfers in self.connection.execute(
+                'SELECT round, position, name, is_elected, has_transfers FROM tally_results'
+                ' JOIN candidates ON candidate_id = id'
+                ' WHERE contest_id = ? ORDER BY round, position', (contest_id,)):
+            tally_result = {('elected' if is_elected else 'eliminated'): name}
+            if has_transfers:
+                tally_result['transfers'] = {}
+            rounds_by_number[round_number]['tallyResults'].append(tally_result)
+            tally_results[(round_number, position)] = tally_result
+
+        for round_number, result_position, name, votes in self.connection.execute(
+                'SELECT round, result_position, name, votes FROM transfers'
+                ' JOIN candidates ON candidate_id = id'
+                ' WHERE contest_id = ? ORDER BY round, result_position, position',
+                (contest_id,)):
+            tally_results[(round_number, result_position)]['transfers'][name] = votes
+
+        return {'config': config, 'results': results}
+
+    def remove(self, contest_id):
+        """ Removes the contest and all of its rounds """
+        with self.connection:
+            self.connection.execute('DELETE FROM contests WHERE id = ?', (contest_id,))
+
+    def contests_with_candidate(self, name):
+        """ :return: The ids of every contest where the named candidate received votes """
+        return [contest_id for contest_id, in self.connection.execute(
+            'SELECT DISTINCT contest_id FROM tallies JOIN candidates ON candidate_id = id'
+            ' WHERE name = ? ORDER BY contest_id', (name,))]
+
+    def find_contests(self, contest=None, date=None, jurisdiction=None, min_rounds=None):
+        """
+        :param contest: Only contests with exactly this name
+        :param date: Only contests on this date, as YYYY-MM-DD
+        :param jurisdiction: Only contests in this jurisdiction
+        :param min_rounds: Only contests with at least this many rounds
+        :return: The ids of every contest matching all of the given filters
+        """
+        conditions = []
+        parameters = []
+        for column, value in (('contest', contest), ('date', date),
+                              ('jurisdiction', jurisdiction)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                parameters.append(value)
+        if min_rounds is not None:
+            conditions.append('num_rounds >= ?')
+            parameters.append(min_rounds)
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return [contest_id for contest_id, in self.connection.execute(
+            f'SELECT id FROM contests{where} ORDER BY id', parameters)]
+
+
+class _Rows:  # pylint: disable=too-few-public-methods
+    """ Rows collected for each table, to be inserted all at once """
+
+    def __init__(self):
+        self.rounds = []
+        self.tallies = []
+        self.tally_results = []
+        self.transfers = []
+
+    def insert_into(self, connection):
+        """ Inserts every row, parents before children """
+        connection.executemany('INSERT INTO rounds VALUES (?, ?)', self.rounds)
+        connection.executemany('INSERT INTO tallies VALUES (?, ?, ?, ?, ?)', self.tallies)
+        connection.executemany(
+            'INSERT INTO tally_results VALUES (?, ?, ?, ?, ?, ?)', self.tally_results)
+        connection.executemany('INSERT INTO transfers VALUES (?, ?, ?, ?, ?, ?)', self.transfers)
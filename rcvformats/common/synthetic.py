@@ -0,0 +1,571 @@
+"""
+Generates synthetic elections in every supported input format.
+
+Useful for benchmarking and load-testing on inputs much larger than those in testdata/inputs.
+Each election is generated once from a seed, then written out in whichever formats are needed,
+so every format describes exactly the same rounds.
+"""
+
+import datetime
+import io
+import json
+import math
+import os
+import random
+import xml.etree.ElementTree as ET
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, PatternFill
+
+# Matches the pseudo-candidate the Dominion XLSX converter adds for non-transferable ballots
+INACTIVE_BALLOTS = 'Inactive Ballots'
+
+# Namespace used by the Dominion multi-contest XML report
+DOMINION_XML_NAMESPACE = 'ElectionSummaryReportRPT'
+
+# Votes from a transferring candidate are split among at most this many continuing candidates,
+# which keeps the size of each round linear in the number of candidates
+MAX_TRANSFER_RECIPIENTS = 8
+
+_FIRST_NAMES = [
+    'Ada', 'Alma', 'Amir', 'Bea', 'Carlos', 'Chen', 'Dana', 'Dmitri', 'Eli', 'Esther',
+    'Fatima', 'Grace', 'Hana', 'Ivan', 'Jamal', 'Joan', 'Kai', 'Lena', 'Luis', 'Mae',
+    'Mina', 'Nia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tariq', 'Uma', 'Wes'
+]
+_LAST_NAMES = [
+    'Abara', 'Bell', 'Castillo', 'Dubois', 'Eriksen', 'Flores', 'Garza', 'Haddad', 'Ito',
+    'Jensen', 'Kowalski', 'Lee', 'Mbeki', 'Nakamura', 'Okafor', 'Patel', 'Quispe', 'Reyes',
+    'Silva', 'Tanaka', 'Ueda', 'Vargas', 'Wong', 'Xu', 'Yilmaz', 'Zhou'
+]
+
+_ELIMINATED_COLOR = 'FFFFABAB'
+_ELECTED_COLOR = 'FF89CC89'
+
+
+class SyntheticElection:  # pylint: disable=too-many-instance-attributes
+    """
+    A randomly-generated but internally-consistent election, which can be written
+    in every format rcvformats reads.
+
+    In each round, the threshold is (active votes) // (num_seats + 1), and any candidate
+    with more votes than that is elected. If nobody is elected, the last-place candidate
+    (or candidates, for batch eliminations) is eliminated. Elected candidates transfer their
+    surplus in the following round. Transferred votes go to a handful of continuing candidates,
+    and a fraction of them are exhausted.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, seed=0, num_candidates=10, num_seats=1, num_rounds=None,
+                 batch_eliminations=False, surpluses=True, title=None, date='2022-11-08'):
+        """
+        :param seed: Seed for the random number generator. The same seed and parameters
+                     always generate the same election.
+        :param num_candidates: Number of candidates on the first round
+        :param num_seats: Number of candidates to elect
+        :param num_rounds: If set, candidates are batch-eliminated so that the election
+                           finishes in roughly this many rounds. It cannot lengthen an election.
+        :param batch_eliminations: Randomly eliminate up to three candidates at once
+        :param surpluses: Transfer the surplus votes of elected candidates. If False, elected
+                          candidates keep their votes.
+        :param title: The name of the contest
+        :param date: The date of the contest, as YYYY-MM-DD
+        """
+        if num_seats < 1 or num_candidates < num_seats:
+            raise ValueError("Need at least one seat, and at least as many candidates as seats")
+
+        self.seed = seed
+        self.num_seats = num_seats
+        self.num_rounds = num_rounds
+        self.batch_eliminations = batch_eliminations
+        self.surpluses = surpluses
+        self.title = title or f'Synthetic Contest {seed}'
+        self.date = date
+        self.jurisdiction = 'Synthetic County'
+
+        rng = random.Random(seed)
+        self.candidates = self._generate_names(rng, num_candidates)
+        self.rounds = []
+        self._generate_rounds(rng)
+
+    @classmethod
+    def _generate_names(cls, rng, num_candidates):
+        """ Unique names, with no commas or quotes so they are safe in every format """
+        names = []
+        used = set()
+        while len(names) < num_candidates:
+            name = f'{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}'
+            if name in used:
+                name = f'{name} {len(names) + 1}'
+            used.add(name)
+            names.append(name)
+        return names
+
+    def _generate_rounds(self, rng):  # pylint: disable=too-many-locals
+        """
+        Fills in self.rounds. Each round is a dict with its tally, threshold, the number of
+        inactive ballots so far, who was eliminated and elected, and the transfers out of
+        each of those candidates to the next round.
+        """
+        # Long-tailed first round: a few strong candidates, many weak ones
+        tally = {name: int(rng.lognormvariate(7, 1.2)) + 1 for name in self.candidates}
+        elected = []
+        inactive = 0
+        while True:
+            threshold = sum(tally.values()) // (self.num_seats + 1)
+            unelected = [name for name in tally if name not in elected]
+            remaining_seats = self.num_seats - len(elected)
+            if len(unelected) <= remaining_seats:
+                newly_elected = unelected
+            else:
+                newly_elected = [name for name in unelected if tally[name] > threshold]
+
+            this_round = {
+                'tally': dict(tally),
+                'threshold': threshold,
+                'inactive': inactive,
+                'eliminated': [],
+                'elected': newly_elected,
+                'transfers': {},
+                'exhausted': {}
+            }
+            self.rounds.append(this_round)
+
+            elected.extend(newly_elected)
+            if len(elected) >= self.num_seats:
+                return
+
+            unelected = [name for name in unelected if name not in newly_elected]
+            surpluses = {}
+            if self.surpluses:
+                surpluses = {name: tally[name] - threshold - 1 for name in newly_elected
+                             if tally[name] > threshold + 1}
+
+            if surpluses:
+                for name, surplus in surpluses.items():
+                    tally[name] -= surplus
+                    inactive += self._transfer(rng, this_round, name, surplus, unelected, tally)
+                continue
+
+            num_to_eliminate = self._num_to_eliminate(
+                rng, len(unelected) - (self.num_seats - len(elected)))
+            by_fewest_votes = sorted(unelected, key=lambda name: tally[name])
+            losers = set(by_fewest_votes[:num_to_eliminate])
+            this_round['eliminated'] = [name for name in unelected if name in losers]
+            continuing = [name for name in unelected if name not in losers]
+            for name in this_round['eliminated']:
+                votes = tally.pop(name)
+                inactive += self._transfer(rng, this_round, name, votes, continuing, tally)
+
+    def _num_to_eliminate(self, rng, max_num):
+        """ How many candidates to eliminate this round, leaving enough to fill every seat """
+        num = 1
+        if self.num_rounds is not None:
+            rounds_left = max(self.num_rounds - len(self.rounds) - 1, 1)
+            num = math.ceil(max_num / rounds_left)
+        if self.batch_eliminations:
+            num = max(num, rng.randint(1, 3))
+        return max(1, min(num, max_num))
+
+    @classmethod
+    def _transfer(cls, rng, this_round, from_name, votes, recipients, tally):
+        """
+        Moves votes from from_name to a few of the recipients, recording the transfer.
+        :return: the number of votes exhausted
+        """
+        exhausted = int(votes * rng.uniform(0, 0.15)) if recipients else votes
+        chosen = rng.sample(recipients, min(len(recipients), MAX_TRANSFER_RECIPIENTS))
+        weights = [rng.random() for _ in chosen]
+        to_give = votes - exhausted
+        shares = {name: int(to_give * w / sum(weights)) for name, w in zip(chosen, weights)}
+        if chosen:
+            shares[chosen[0]] += to_give - sum(shares.values())
+
+        transfers = {}
+        for name in recipients:
+            if shares.get(name):
+                transfers[name] = shares[name]
+                tally[name] += shares[name]
+        this_round['transfers'][from_name] = transfers
+        this_round['exhausted'][from_name] = exhausted
+        return exhausted
+
+    @property
+    def winners(self):
+        """ Names of every elected candidate, in the order they were elected """
+        return [name for this_round in self.rounds for name in this_round['elected']]
+
+    def _transfers_out_of(self, this_round, name, inactive_ballots):
+        transfers = dict(this_round['transfers'].get(name, {}))
+        exhausted = this_round['exhausted'].get(name, 0)
+        if inactive_ballots and exhausted:
+            transfers[INACTIVE_BALLOTS] = exhausted
+        return transfers
+
+    def to_ut(self, with_transfers=True, inactive_ballots=False):
+        """
+        :param with_transfers: Include the true transfers in each tallyResult
+        :param inactive_ballots: Include exhausted ballots as an "Inactive Ballots" candidate,
+                                 as the Dominion XLSX converter does
+        :return: The election in the Universal Tabulator format
+        """
+        results = []
+        for round_i, this_round in enumerate(self.rounds):
+            tally = dict(this_round['tally'])
+            if inactive_ballots:
+                tally[INACTIVE_BALLOTS] = this_round['inactive']
+
+            tally_results = []
+            for name in this_round['eliminated']:
+                tally_result = {'eliminated': name}
+                if with_transfers:
+                    tally_result['transfers'] = self._transfers_out_of(
+                        this_round, name, inactive_ballots)
+                tally_results.append(tally_result)
+            for name in this_round['elected']:
+                tally_result = {'elected': name}
+                transfers = self._transfers_out_of(this_round, name, inactive_ballots)
+                if with_transfers and transfers:
+                    tally_result['transfers'] = transfers
+                tally_results.append(tally_result)
+
+            results.append({'round': round_i + 1, 'tally': tally, 'tallyResults': tally_results})
+
+        config = {
+            'contest': self.title,
+            'date': self.date,
+            'jurisdiction': self.jurisdiction,
+            'office': self.title,
+            'threshold': self.rounds[-1]['threshold']
+        }
+        return {'config': config, 'results': results}
+
+    def to_opavote(self, version='1.1'):
+        """
+        :param version: '1.0' or '1.1'. Version 1.0 has no per-round threshold or surplus,
+                        and labels surplus transfers as eliminations.
+        :return: The election in the OpaVote JSON format
+        """
+        if version not in ('1.0', '1.1'):
+            raise ValueError(f"Unknown OpaVote version {version}")
+
+        index_of = {name: i for i, name in enumerate(self.candidates)}
+        losers = []
+        winners = []
+        rounds = []
+        for round_i, this_round in enumerate(self.rounds):
+            winners += [index_of[name] for name in this_round['elected']]
+            opavote_round = {
+                'n': round_i + 1,
+                'count': [this_round['tally'].get(name, 0) for name in self.candidates],
+                'winners': list(winners),
+                'losers': list(losers),
+                'continuing': [index_of[name] for name in this_round['tally']
+                               if index_of[name] not in winners],
+                'exhausted': this_round['inactive'],
+                'action': self._opavote_action(round_i, version, index_of)
+            }
+            opavote_round['msg'] = opavote_round['action']['desc']
+            if version == '1.1':
+                opavote_round['thresh'] = this_round['threshold']
+                opavote_round['surplus'] = sum(
+                    sum(this_round['transfers'][name].values()) + this_round['exhausted'][name]
+                    for name in this_round['elected'] if name in this_round['transfers'])
+            rounds.append(opavote_round)
+
+            # OpaVote lists losers on the round after they are eliminated
+            losers += [index_of[name] for name in this_round['eliminated']]
+
+        num_votes = sum(self.rounds[0]['tally'].values())
+        prec = 0 if version == '1.1' else '0'
+        return {
+            'version': '1.0',
+            'title': self.title,
+            'method': 'Instant Runoff Voting' if self.num_seats == 1 else 'Scottish STV',
+            'n_seats': self.num_seats,
+            'n_votes': num_votes,
+            'n_valid_votes': num_votes,
+            'precision': 0,
+            'candidates': list(self.candidates),
+            'winners': [index_of[name] for name in self.winners],
+            'withdrawn': [],
+            'tie_breaks': [],
+            'options': [['prec', prec], ['batchElimination', 'Zero']],
+            'rounds': rounds
+        }
+
+    def _opavote_action(self, round_i, version, index_of):
+        """ Describes how the votes got to round_i """
+        if round_i == 0:
+            return {'type': 'first', 'desc': 'Count of first choices. '}
+
+        previous_round = self.rounds[round_i - 1]
+        if previous_round['eliminated']:
+            names = previous_round['eliminated']
+            return {'type': 'eliminate',
+                    'candidates': [index_of[name] for name in names],
+                    'desc': f"Count after eliminating {', '.join(names)}. "}
+
+        names = previous_round['elected']
+        return {'type': 'surplus' if version == '1.1' else 'eliminate',
+                'candidates': [index_of[name] for name in names],
+                'desc': f"Count after transferring surplus votes from {', '.join(names)}. "}
+
+    def _electionbuddy_threshold(self, this_round):
+        """
+        ElectionBuddy elects anyone above the threshold, so when the last candidates are
+        elected only to fill the remaining seats, report a threshold just below them.
+        """
+        threshold = this_round['threshold']
+        if this_round['elected']:
+            threshold = min([threshold] + [this_round['tally'][name] - 1
+                                           for name in this_round['elected']])
+        return threshold
+
+    def to_electionbuddy_csv(self):
+        """ :return: The election in the ElectionBuddy CSV format, as a string """
+        lines = [self.title, '', self.title, '*' * 20, '']
+        for round_i, this_round in enumerate(self.rounds):
+            tally = this_round['tally']
+            total = sum(tally.values())
+            lines += [f'Round {round_i + 1}', 'Candidate,Votes,Percentage']
+            lines += [f'{name},{votes},{100 * votes / total:.1f}%'
+                      for name, votes in tally.items()]
+            lines += ['',
+                      f'Votes tallied: {total}',
+                      f'Abstentions: {this_round["inactive"]}',
+                      f'Threshold: {self._electionbuddy_threshold(this_round)}',
+                      '']
+        return '\n'.join(lines) + '\n'
+
+    def to_dominion_txt(self):  # pylint: disable=too-many-locals
+        """
+        Dominion's TXT format only describes single-winner elections.
+
+        :return: The election in the Dominion TXT format, as UTF-16 bytes
+        """
+        if self.num_seats != 1:
+            raise ValueError("The Dominion TXT format only supports single-winner elections")
+
+        num_columns = 25
+
+        def row(*cells):
+            return '\t'.join(list(cells) + [''] * (num_columns - len(cells)))
+
+        def row_at(column, *cells):
+            """ A row with the jurisdiction first, then cells starting at column """
+            return row(self.jurisdiction, *([''] * (column - 1)), *cells)
+
+        def quoted(name):
+            return f'"{name}"'
+
+        date = datetime.date.fromisoformat(self.date)
+        lines = [
+            row('Textbox11', 'Textbox3', 'Textbox2', 'Textbox9'),
+            row('RCV Detailed Report', 'General Election', self.jurisdiction,
+                f"{date.day}-{date.strftime('%b')}-{date.strftime('%y')}"),
+            row(),
+            row('Textbox24', 'Textbox21', 'Textbox53', 'state'),
+            row(self.title, 'Unofficial results', 'Number of positions to elect is 1.',
+                'All Positions Filled'),
+            row(),
+            row('Textbox36', 'Textbox41', 'winnersByThreshold'),
+            row('IRV', 'TRUE', 'FALSE'),
+            row(),
+            row('Textbox35', 'Textbox86', 'choiceName2', 'votes'),
+        ]
+        for round_i, this_round in enumerate(self.rounds):
+            tally = this_round['tally']
+            total = sum(tally.values())
+            round_label = f'Round {round_i + 1}'
+            for name in self.candidates:
+                votes = tally.get(name, 0)
+                lines.append(row(self.jurisdiction, round_label, quoted(name), f'"{votes:,}"',
+                                 f'{100 * votes / total:.2f}%', '0', f'"{total:,}"'))
+            lines.append(row(self.jurisdiction, round_label, 'Exhausted',
+                             str(this_round['inactive'])))
+
+            for name in this_round['eliminated']:
+                lines.append(row_at(17, quoted(
+                    f'{name} is eliminated because the candidate had the least amount of votes.')))
+            for name in this_round['elected']:
+                lines.append(row_at(17, quoted(
+                    f'{name} is elected because the candidate reached the threshold.')))
+
+            for name in this_round['eliminated']:
+                votes = tally[name]
+                header = [quoted(f'Elimination transfer for candidate {name}.'),
+                          f'{votes} ballots have been transferred in the following manner:',
+                          quoted(name)]
+                destinations = list(this_round['transfers'][name].items())
+                destinations += [(name, votes), ('Exhausted', this_round['exhausted'][name])]
+                for to_name, num in destinations:
+                    to_cell = to_name if to_name == 'Exhausted' else quoted(to_name)
+                    lines.append(row_at(18, *header, to_cell, str(num), '1', str(num)))
+
+        text = '\ufeff' + '\r\n'.join(lines) + '\r\n'
+        return text.encode('utf-16-le')
+
+    def to_dominion_xlsx(self, v5_17=False):
+        """
+        :param v5_17: Use the layout of Dominion v5.17 and later, with the round-by-round
+                      table on a second sheet. Older versions have a single sheet.
+        :return: The election in the Dominion XLSX format, as bytes
+        """
+        workbook = Workbook()
+        config_sheet = workbook.active
+        config_sheet.title = 'Sheet1' if v5_17 else 'RcvShortReport'
+        center = Alignment(horizontal='center')
+
+        if v5_17:
+            config_sheet['A1'] = 'Page: 1 / 2'
+            config_sheet['A4'] = f'Final RCV Short Report\n{self.jurisdiction}'
+            config_sheet['A4'].alignment = center
+            header_rows = 5
+            config_sheet['A9'] = 'Tabulation time:'
+        else:
+            config_sheet['A1'] = 'Page: 1 / 1'
+            for row, value in ((3, 'RCV Short Report'), (5, 'General Election'),
+                               (7, self.jurisdiction),
+                               (9, datetime.datetime.fromisoformat(self.date))):
+                config_sheet.cell(row, 1, value).alignment = center
+            header_rows = 12
+
+        config_sheet.cell(header_rows, 1, self.title)
+        config_sheet.cell(header_rows + 1, 1, 'Unofficial results')
+        config_sheet.cell(header_rows + 2, 1,
+                          f'Number of positions to elect is {self.num_seats}.')
+
+        if v5_17:
+            table_sheet = workbook.create_sheet('Sheet2')
+            table_sheet['A1'] = 'Page: 2 / 2'
+            round_label_row = 5
+        else:
+            table_sheet = config_sheet
+            round_label_row = header_rows + 20
+        self._write_dominion_xlsx_table(table_sheet, round_label_row)
+
+        output = io.BytesIO()
+        workbook.save(output)
+        return output.getvalue()
+
+    def _write_dominion_xlsx_table(self, sheet, round_label_row):  # pylint: disable=too-many-locals
+        """ Writes the round-by-round table, starting at round_label_row """
+        first_candidate_row = round_label_row + 2
+        center = Alignment(horizontal='center')
+        eliminated_fill = PatternFill(fill_type='solid', fgColor=_ELIMINATED_COLOR,
+                                      bgColor=_ELIMINATED_COLOR)
+        elected_fill = PatternFill(fill_type='solid', fgColor=_ELECTED_COLOR,
+                                   bgColor=_ELECTED_COLOR)
+
+        sheet.cell(round_label_row - 2, 1, self.jurisdiction)
+        sheet.cell(round_label_row, 1, 'Candidate').alignment = center
+        summary_row = first_candidate_row + len(self.candidates)
+        summary_labels = ['Continuing Ballots Total', 'Blanks', 'Exhausted', 'Overvotes',
+                          'Non Transferable Total', 'Threshold']
+        for offset, label in enumerate(summary_labels):
+            sheet.cell(summary_row + offset, 1, label)
+        for offset, name in enumerate(self.candidates):
+            sheet.cell(first_candidate_row + offset, 1, name)
+
+        # Each round takes three columns: votes, percentage and transfer
+        for round_i, this_round in enumerate(self.rounds):
+            col = 3 + 3 * round_i
+            sheet.cell(round_label_row, col, f'Round {round_i + 1}').alignment = center
+            sheet.merge_cells(start_row=round_label_row, start_column=col,
+                              end_row=round_label_row, end_column=col + 2)
+            for offset, label in enumerate(('Votes', 'Percentage', 'Transfer')):
+                sheet.cell(round_label_row + 1, col + offset, label).alignment = center
+
+            tally = this_round['tally']
+            total = sum(tally.values())
+            next_tally = self.rounds[round_i + 1]['tally'] if round_i + 1 < len(self.rounds) \
+                else tally
+            for offset, name in enumerate(self.candidates):
+                votes = tally.get(name, 0)
+                cells = [sheet.cell(first_candidate_row + offset, col, votes),
+                         sheet.cell(first_candidate_row + offset, col + 1, votes / total),
+                         sheet.cell(first_candidate_row + offset, col + 2,
+                                    next_tally.get(name, 0) - votes)]
+                fill = None
+                if name in this_round['eliminated']:
+                    fill = eliminated_fill
+                elif name in this_round['elected']:
+                    fill = elected_fill
+                for cell in cells if fill else []:
+                    cell.fill = fill
+
+            inactive = this_round['inactive']
+            values = [total, 0, inactive, 0, inactive, this_round['threshold']]
+            for offset, value in enumerate(values):
+                sheet.cell(summary_row + offset, col, value)
+
+    def write_files(self, directory, formats=None):
+        """
+        Writes this election into directory, one file per format.
+
+        :param formats: Names of the formats to write. Defaults to all of them:
+                        ut, ut-without-transfers, opavote10, opavote11, electionbuddy,
+                        dominion-xlsx, dominion-xlsx-v5-17, and, for single-winner elections
+                        only, dominion-txt.
+        :return: a dict mapping each format name to the filename it was written to
+        """
+        writers = {
+            'ut': ('.json', lambda: json.dumps(self.to_ut())),
+            'ut-without-transfers': ('.json', lambda: json.dumps(self.to_ut(False))),
+            'opavote10': ('.json', lambda: json.dumps(self.to_opavote('1.0'))),
+            'opavote11': ('.json', lambda: json.dumps(self.to_opavote('1.1'))),
+            'electionbuddy': ('.csv', self.to_electionbuddy_csv),
+            'dominion-xlsx': ('.xlsx', self.to_dominion_xlsx),
+            'dominion-xlsx-v5-17': ('.xlsx', lambda: self.to_dominion_xlsx(v5_17=True)),
+            'dominion-txt': ('.txt', self.to_dominion_txt),
+        }
+        if formats is None:
+            formats = [name for name in writers if name != 'dominion-txt' or self.num_seats == 1]
+
+        filenames = {}
+        for format_name in formats:
+            extension, writer = writers[format_name]
+            content = writer()
+            filename = os.path.join(directory, format_name + extension)
+            mode = 'wb' if isinstance(content, bytes) else 'w'
+            encoding = None if isinstance(content, bytes) else 'utf-8'
+            with open(filename, mode, encoding=encoding) as file_obj:
+                file_obj.write(content)
+            filenames[format_name] = filename
+        return filenames
+
+
+def to_dominion_multi_xml(elections):
+    """
+    Writes the first round of each election into one Dominion multi-contest XML report,
+    as read by :class:`~rcvformats.conversions.dominion_multi_converter.DominionMultiConverter`.
+    The report date is taken from the first election.
+
+    :param elections: a list of :class:`SyntheticElection`
+    :return: the XML report, as UTF-8 bytes
+    """
+    def element(parent, tag, **attributes):
+        return ET.SubElement(parent, f'{{{DOMINION_XML_NAMESPACE}}}{tag}', attributes)
+
+    root = ET.Element(f'{{{DOMINION_XML_NAMESPACE}}}Report', {'Name': DOMINION_XML_NAMESPACE})
+    element(element(root, 'Title'), 'Report', Name='Title',
+            Textbox9=f'{elections[0].date}T00:00:00')
+
+    parent = root
+    for tag in ('tabBatchIdList', 'TabBatchGroup_Collection', 'TabBatchGroup',
+                'ElectionSummarySubReport', 'Report', 'contestList',
+                'ContestIdGroup_Collection'):
+        parent = element(parent, tag)
+
+    for election in elections:
+        contest = element(parent, 'ContestIdGroup', contestId=election.title)
+        candidate_results = element(
+            element(element(element(contest, 'CandidateResults'), 'Report'), 'Tablix1'),
+            'chGroup_Collection')
+        for name, votes in election.rounds[0]['tally'].items():
+            candidate = element(element(candidate_results, 'chGroup'), 'candidateNameTextBox4',
+                                candidateNameTextBox4=name)
+            element(candidate, 'Textbox13', vot8=str(votes))
+
+    ET.register_namespace('', DOMINION_XML_NAMESPACE)
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True)
@@ -0,0 +1,148 @@
+"""
+Converts every results file in a zip archive, reading each member straight from the
+archive rather than extracting it to disk first.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import re
+import zipfile
+
+from rcvformats.common import buffers
+from rcvformats.common import compression
+from rcvformats.common import serialization
+from rcvformats.conversions import pool
+from rcvformats.conversions.automatic import AutomaticConverter
+from rcvformats.conversions.dominion_multi_converter import DominionMultiConverter
+
+# Name of the manifest written alongside the converted files
+MANIFEST_FILENAME = 'manifest.json'
+
+# How many members are read and queued per worker at once, so only a few members'
+# contents are held in memory however large the archive is
+MEMBERS_QUEUED_PER_WORKER = 2
+
+
+def is_ignored_member(member_name):
+    """ Directories and the resource forks macOS adds to archives are not results """
+    return member_name.endswith('/') or member_name.startswith('__MACOSX/') or \
+        os.path.basename(member_name).startswith('.')
+
+
+def convert_zip(zip_file, max_workers=None):
+    """
+    Converts every member of the archive. Multi-contest Dominion XML files are converted
+    with :class:`~rcvformats.conversions.dominion_multi_converter.DominionMultiConverter`,
+    and everything else with
+    :class:`~rcvformats.conversions.automatic.AutomaticConverter`.
+
+    :param zip_file: A filename, file object, or :class:`zipfile.ZipFile`
+    :param max_workers: If set, convert this many members at once, each in a worker\
+                        process. Otherwise, members are converted one after the other.
+    :return: The manifest: a list with one dict per contest converted, holding the\
+             'member' it came from, its 'contest' name and its Universal Tabulator\
+             'data', and one dict per member which failed, holding the 'member' and\
+             its 'error'. The list is in the order of the archive.
+    """
+    if not isinstance(zip_file, zipfile.ZipFile):
+        with zipfile.ZipFile(zip_file) as opened_zip_file:
+            return convert_zip(opened_zip_file, max_workers)
+
+    members = [name for name in zip_file.namelist() if not is_ignored_member(name)]
+    if max_workers is None:
+        results = [convert_member(name, zip_file.read(name)) for name in members]
+    else:
+        results = _convert_members_in_workers(zip_file, members, max_workers)
+    return [entry for entries in results for entry in entries]
+
+
+def _convert_members_in_workers(zip_file, members, max_workers):
+    """
+    Yields the results of :func:`convert_member` in archive order, reading each member
+    only when a slot in the queue frees up rather than reading them all up front
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = deque()
+        for name in members:
+            if len(futures) >= max_workers * MEMBERS_QUEUED_PER_WORKER:
+                yield futures.popleft().result()
+            futures.append(executor.submit(convert_member, name, zip_file.read(name)))
+        while futures:
+            yield futures.popleft().result()
+
+
+def convert_member(member_name, contents):
+    """
+    Converts the contents of a single member of an archive.
+
+    :return: A list of manifest entries, as described in :func:`convert_zip`
+    """
+    try:
+        if _is_xml(contents):
+            per_contest = _convert_multi_contest_xml(contents)
+            return [{'member': member_name, 'contest': contest, 'data': data}
+                    for contest, data in per_contest.items()]
+        data = pool.shared(AutomaticConverter).convert_to_ut(contents)
+        return [{'member': member_name, 'contest': data['config']['contest'], 'data': data}]
+    except Exception as error:  # pylint: disable=broad-except
+        return [{'member': member_name, 'error': f"{type(error).__name__}: {error}"}]
+
+
+def _is_xml(contents):
+    """ Sniffs the first bytes of the (possibly compressed) member for an XML document """
+    with buffers.open_buffer(contents) as file_object:
+        with compression.decompressed(file_object) as decompressed_file:
+            head = decompressed_file.read(64)
+    return head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<')
+
+
+def _convert_multi_contest_xml(contents):
+    with buffers.open_buffer(contents) as file_object:
+        with compression.decompressed(file_object) as decompressed_file:
+            return DominionMultiConverter.convert_to_ut_per_contest(decompressed_file)
+
+
+def write_outputs(manifest, output_directory, **json_options):
+    """
+    Writes each converted contest to its own JSON file in output_directory, along with a
+    manifest.json listing the 'member', 'contest' and 'output' filename of each contest,
+    and the 'member' and 'error' of each failure.
+
+    :param manifest: As returned by :func:`convert_zip`
+    :param output_directory: Created if it does not exist
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    :return: The manifest as written to manifest.json
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    written_manifest = []
+    used_filenames = {MANIFEST_FILENAME}
+    for entry in manifest:
+        if 'error' in entry:
+            written_manifest.append(entry)
+            continue
+
+        filename = _unique_filename(entry['member'], entry['contest'], used_filenames)
+        with open(os.path.join(output_directory, filename), 'w', encoding='utf-8') as file_obj:
+            serialization.dump(entry['data'], file_obj, **json_options)
+        written_manifest.append(
+            {'member': entry['member'], 'contest': entry['contest'], 'output': filename})
+
+    with open(os.path.join(output_directory, MANIFEST_FILENAME), 'w',
+              encoding='utf-8') as file_obj:
+        json.dump(written_manifest, file_obj, indent=2)
+    return written_manifest
+
+
+def _unique_filename(member_name, contest, used_filenames):
+    """ A filesystem-safe filename, named after the member and contest, not yet used """
+    member_stem = os.path.splitext(os.path.basename(member_name))[0]
+    stem = re.sub(r'[^\w.-]+', '_', f"{member_stem}-{contest}").strip('._') or 'contest'
+    filename = stem + '.json'
+    suffix = 1
+    while filename in used_filenames:
+        suffix += 1
+        filename = f"{stem}-{suffix}.json"
+    used_filenames.add(filename)
+    return filename
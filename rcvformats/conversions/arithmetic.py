@@ -0,0 +1,191 @@
+"""
+Numeric backends used when guessing at transfers.
+
+The float backend is the default. The fixed-point backend keeps every tally as an
+integer number of 10^-precision votes, so deltas and transfers are exact, transfers add up
+to exactly what each candidate gained, and the output is the same on every run.
+"""
+
+import decimal
+
+FLOAT = 'float'
+FIXED = 'fixed'
+
+
+def create(numeric, precision, ut_rounds):
+    """
+    :param numeric: FLOAT or FIXED
+    :param precision: Number of decimal places used by FIXED. If None, it is the most
+                      decimal places of any tally in ut_rounds.
+    :param ut_rounds: Universal Tabulator 'results' structure
+    :return: A :class:`FloatArithmetic` or :class:`FixedPointArithmetic`
+    """
+    return create_for_counts(
+        numeric, precision, [round_data['tally'].values() for round_data in ut_rounds])
+
+
+def create_for_counts(numeric, precision, counts_per_round):
+    """
+    Like :func:`create`, for formats which list each round's votes without names
+
+    :param counts_per_round: For each round, the votes of each candidate
+    """
+    if numeric == FLOAT:
+        return FloatArithmetic()
+    if numeric == FIXED:
+        if precision is None:
+            precision = _most_decimal_places(counts_per_round)
+            if precision is None:
+                return FixedPointArithmetic(0, already_integers=True)
+        return FixedPointArithmetic(precision)
+    raise ValueError(f"Unknown numeric backend: {numeric}. Must be '{FLOAT}' or '{FIXED}'.")
+
+
+def is_all_integers(counts):
+    """ Fast check, without a python loop, for the common case of whole-vote tallies """
+    return set(map(type, counts)) <= {int}
+
+
+def _most_decimal_places(counts_per_round):
+    """ :return: the most decimal places of any count, or None if every count is an int """
+    most = None
+    for counts in counts_per_round:
+        if is_all_integers(counts):
+            continue
+        most = most or 0
+        for votes in counts:
+            if votes is not None:
+                most = max(most, decimal_places(votes))
+    return most
+
+
+def decimal_places(votes):
+    """ How many decimal places are needed to represent the number or string exactly """
+    if isinstance(votes, int) or (isinstance(votes, float) and votes.is_integer()):
+        return 0
+    text = str(votes)
+    if 'e' not in text and 'E' not in text:
+        _, _, after_point = text.partition('.')
+        return len(after_point)
+    return max(0, -decimal.Decimal(text).as_tuple().exponent)
+
+
+class FloatArithmetic:
+    """
+    Divides with floats, and accepts weights that are within 1e-8 of adding up to 1
+    """
+    is_exact = False
+
+    @classmethod
+    def weight(cls, votes_lost, votes_subtracted):
+        """ :return: The fraction of all votes lost this round which this candidate lost """
+        return votes_lost / votes_subtracted
+
+    @classmethod
+    def weights_add_up(cls, weights, votes_subtracted):  # pylint: disable=unused-argument
+        """ Do the weights sum to 1, allowing for floating point error? """
+        return abs(sum(weights) - 1.0) <= 1e-8
+
+    def parse_tallies(self, ut_rounds):
+        """ Floats can be used as-is """
+
+    def restore_tallies(self, ut_rounds):
+        """ Floats can be used as-is """
+
+
+class FixedPointArithmetic:
+    """
+    Holds each tally as an integer: the number of votes multiplied by 10^precision.
+    Weights are never divided, so they must add up exactly, and when a gain is split between
+    several transferring candidates, each part is rounded to 10^-precision votes such that
+    the parts still add up exactly.
+    """
+    is_exact = True
+
+    def __init__(self, precision=0, already_integers=False):
+        """
+        :param precision: Number of decimal places. Tallies with more decimal places
+                          than this cannot be parsed.
+        :param already_integers: Set if every tally is already an int and precision is 0,
+                                 so there is nothing to parse.
+        """
+        self.precision = precision
+        self.scale = 10 ** precision
+        self.already_integers = already_integers
+
+    def parse(self, votes):
+        """ Converts a tally value, which may be a string, to an integer at this precision """
+        if isinstance(votes, int):
+            return votes * self.scale
+        if isinstance(votes, str) and self.precision == 0 and votes.isdigit():
+            return int(votes)
+
+        # Parse floats from their shortest representation, which is how they were written
+        scaled = decimal.Decimal(str(votes)).scaleb(self.precision)
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"Tally {votes} has more than {self.precision} decimal places")
+        return int(scaled)
+
+    def to_json(self, votes):
+        """ Converts an integer at this precision back to a number of votes """
+        if self.precision == 0:
+            return votes
+        return votes / self.scale
+
+    @classmethod
+    def weight(cls, votes_lost, votes_subtracted):  # pylint: disable=unused-argument
+        """
+        :return: The weight of a candidate who lost votes_lost this round. To stay exact,
+                 this is not divided: weights are out of votes_subtracted, not out of 1.
+        """
+        return votes_lost
+
+    @classmethod
+    def weights_add_up(cls, weights, votes_subtracted):
+        """ Do the weights sum to exactly all votes lost this round? """
+        return sum(weights) == votes_subtracted
+
+    def split(self, votes, weights, votes_subtracted):
+        """
+        Splits an integer number of votes in proportion to the weights, with the largest
+        remainder method, so the parts add up to exactly votes.
+
+        :param votes: The integer number of votes to split
+        :param weights: A list of integer weights, one per part, from :func:`weight`
+        :param votes_subtracted: The sum of the weights
+        :return: A list of the number of votes in each part, converted with :func:`to_json`
+        """
+        products = [votes * weight for weight in weights]
+        parts = [product // votes_subtracted for product in products]
+
+        # Ties go to whoever is listed first
+        leftover = votes - sum(parts)
+        if leftover:
+            by_largest_remainder = sorted(range(len(weights)), reverse=True,
+                                          key=lambda i: products[i] % votes_subtracted)
+            for i in by_largest_remainder[:leftover]:
+                parts[i] += 1
+
+        if self.precision == 0:
+            return parts
+        return [self.to_json(part) for part in parts]
+
+    def parse_tallies(self, ut_rounds):
+        """ Converts every tally in-place with :func:`parse` """
+        if self.already_integers:
+            return
+        for round_data in ut_rounds:
+            tally = round_data['tally']
+            if self.precision == 0 and is_all_integers(tally.values()):
+                continue
+            for name, votes in tally.items():
+                tally[name] = self.parse(votes)
+
+    def restore_tallies(self, ut_rounds):
+        """ Converts every tally in-place with :func:`to_json` """
+        if self.precision == 0:
+            return
+        for round_data in ut_rounds:
+            tally = round_data['tally']
+            for name, votes in tally.items():
+                tally[name] = self.to_json(votes)
@@ -4,13 +4,10 @@ If you know the file format, you should not use this - it will
 loop through all schemas which will be needlessly slow.
 """
 
-import json
-
+from rcvformats.common import jsonstream
 from rcvformats.conversions.base import CouldNotConvertException
-from rcvformats.conversions.dominion_txt import DominionTxtConverter
-from rcvformats.conversions.dominion_xlsx import DominionXlsxConverter
-from rcvformats.conversions.electionbuddy import ElectionBuddyConverter
-from rcvformats.conversions.opavote import OpavoteConverter
+from rcvformats.conversions import pool
+from rcvformats.conversions import registry as registry_module
 from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
 from rcvformats.conversions.base import Converter
 
@@ -18,39 +15,53 @@ from rcvformats.conversions.base import Converter
 class AutomaticConverter(Converter):
     """ Interface for converters """
 
-    def __init__(self):
-        # In order of likelihood of a hit - just my guess.
-        # As this list grows, we should really consider doing something intelligent.
-        self.converters = [
-            DominionXlsxConverter,
-            ElectionBuddyConverter,
-            OpavoteConverter,
-            DominionTxtConverter
-        ]
-
+    def __init__(self, registry=None):
+        """
+        :param registry: The :class:`~rcvformats.conversions.registry.Registry` of converters\
+                         to try. Defaults to the built-in converters and those of installed\
+                         packages.
+        """
+        self._registry = registry
         super().__init__()
 
+    @property
+    def registry(self):
+        """ The :class:`~rcvformats.conversions.registry.Registry` of converters to try """
+        return self._registry or registry_module.default_registry()
+
     def _convert_file_object_to_ut(self, file_object):
+        head = file_object.read(registry_module.SNIFF_BYTES)
+        file_object.seek(0)
+        if isinstance(head, str):
+            # Opened in text mode: sniff the text as it would read in binary mode
+            head = head.encode('utf-8')
+
         # If it matches the schema already, load and return the data
-        if self.ut_schema.validate(file_object):
+        if registry_module.looks_like_json(head) and self.ut_schema.validate(file_object):
             file_object.seek(0)
-            return json.load(file_object)
+            return jsonstream.load(file_object)
 
-        # Otherwise, try each converter - skipping schemas for speed
+        # Otherwise, try each converter whose format the file might be in, most likely first
         additional_errors = []
-        for converterType in self.converters:
+        for entry in self.registry.probe_order(head):
             file_object.seek(0)
             try:
-                data = converterType().convert_to_ut(file_object)
-                converter = UTWithoutTransfersConverter(allow_guessing=False)
-                return converter.fill_in_tally_data(data)
+                data = pool.shared(entry.load()).convert_to_ut(file_object)
             except CouldNotConvertException as exception:
-                additional_errors.append(converterType.__name__ + ":" + str(exception))
+                additional_errors.append(entry.load().__name__ + ":" + str(exception))
                 continue
 
+            self.registry.record_hit(entry.name)
+            converter = pool.shared(UTWithoutTransfersConverter, allow_guessing=False)
+            return converter.fill_in_tally_data(data)
+
         # If it failed, accumulate all errors from schemas
+        if not additional_errors:
+            additional_errors.append("No converter recognized the start of the file.")
+        ut_error = self.ut_schema.last_error() if registry_module.looks_like_json(head) \
+            else "it is not JSON"
         error_message = "When trying to parse as the Universal Tabulator schema, " +\
-            f"received error: \"{str(self.ut_schema.last_error())}\". " +\
+            f"received error: \"{str(ut_error)}\". " +\
             "Further, it did not match any other known format. Additional errors: \n\n" +\
             '\n\n'.join(additional_errors)
         raise CouldNotConvertException(error_message)
@@ -5,7 +5,14 @@ Interface and exceptions for all converters
 import abc
 import math
 
+from rcvformats.common import aio
+from rcvformats.common import buffers
+from rcvformats.common import columnar
+from rcvformats.common import compression
+from rcvformats.common import model
 from rcvformats.common import utils
+from rcvformats.conversions import arithmetic
+from rcvformats.conversions import round_matrix
 from rcvformats.schemas import universaltabulator
 
 
@@ -24,11 +31,16 @@ class CouldNotOpenFileException(Exception):
 
 
 class Converter(abc.ABC):
-    """ Interface for converters """
+    """
+    Interface for converters.
+
+    Converters hold only the options they were created with: everything about a single
+    conversion lives in local variables, or in a context object passed between methods.
+    A converter may therefore be shared between threads, e.g. via :mod:`~.pool`.
+    """
 
-    def __init__(self):
-        """ Initializes common data """
-        self.ut_schema = universaltabulator.SchemaV0()
+    # Shared by every converter. Schemas keep their last error per-thread.
+    ut_schema = universaltabulator.SchemaV0()
 
     def convert_to_ut_and_validate(self, filename_or_fileobj):
         """
@@ -51,35 +63,129 @@ class Converter(abc.ABC):
         """
         Parses the file and returns the parsed data
 
-        :param data: A File object, filename, or json data. Not all converters support JSON.
+        :param data: A File object, filename, in-memory buffer (bytes, bytearray, memoryview\
+                     or mmap) of the file contents, or json data.\
+                     Files and buffers may be gzip, bz2 or xz compressed.\
+                     Not all converters support JSON.
         :return: The Universal Tabulator representation of this data.\
                  Call :func:`~convert_to_ut_and_validate` to guarantee that \
                  it matches the Universal Tabulator schema.
         :raises CouldNotConvertException: If the conversion could not complete
         :raises CouldNotOpenFileException: If the file couldn't be opened
         """
+        return self._raising_could_not_convert(self.convert_to_ut_without_exceptions, data)
+
+    @classmethod
+    def _raising_could_not_convert(cls, convert, data):
+        """ :return: convert(data), raising any unexpected error as a CouldNotConvertException """
         try:
-            return self.convert_to_ut_without_exceptions(data)
-        except CouldNotConvertException as known_error:
+            return convert(data)
+        except (CouldNotConvertException, CouldNotOpenFileException) as known_error:
             raise known_error
         except Exception as unknown_error:
             raise CouldNotConvertException(str(unknown_error)) from unknown_error
 
-        raise CouldNotOpenFileException(f"Could not open {data}")
+    async def convert_to_ut_async(self, data, executor=None, timeout=None):
+        """
+        Like :func:`~convert_to_ut`, without blocking the event loop: files are read on a
+        thread, and the conversion runs in the executor.
+
+        :param data: A File object, filename, or json data
+        :param executor: See :func:`rcvformats.common.aio.run`. Use\
+                         :data:`rcvformats.common.aio.PROCESS` for conversions which\
+                         must stop when cancelled or timed out.
+        :param timeout: Seconds before raising :class:`asyncio.TimeoutError`
+        :raises CouldNotConvertException: If the conversion could not complete
+        """
+        data = await aio.read_input(data)
+        return await aio.run(self.convert_to_ut, data, executor=executor, timeout=timeout)
+
+    async def convert_to_ut_and_validate_async(self, data, executor=None, timeout=None):
+        """
+        Like :func:`~convert_to_ut_and_validate`, without blocking the event loop.
+        See :func:`~convert_to_ut_async`.
+        """
+        data = await aio.read_input(data)
+        return await aio.run(self.convert_to_ut_and_validate, data,
+                             executor=executor, timeout=timeout)
+
+    def convert_to_model(self, data):
+        """
+        Like :func:`~convert_to_ut`, but returns the data as a compact
+        :class:`~rcvformats.common.model.Election`, which can be kept in memory
+        and validated or serialized much more cheaply than the nested dicts.
+        The OpaVote converter fills the model straight from its count matrix when numpy
+        is installed. Other converters still build the dicts, then convert them to the
+        model and drop them, so their peak memory while converting is no lower than
+        :func:`~convert_to_ut`'s.
+
+        :param data: A File object, filename, or json data. Not all converters support JSON.
+        :return: The :class:`~rcvformats.common.model.Election`
+        :raises CouldNotConvertException: If the conversion could not complete
+        """
+        return self._raising_could_not_convert(self._convert_to_model_without_exceptions, data)
+
+    def convert_to_columnar(self, data):
+        """
+        Like :func:`~convert_to_ut`, but returns the data as a
+        :class:`~rcvformats.common.columnar.ColumnarElection`: flat arrays of votes per
+        round and candidate, and of transfers, for analytics. Requires numpy.
+
+        :param data: A File object, filename, or json data. Not all converters support JSON.
+        :return: The :class:`~rcvformats.common.columnar.ColumnarElection`
+        :raises CouldNotConvertException: If the conversion could not complete
+        """
+        return columnar.ColumnarElection.from_ut_dict(self.convert_to_ut(data))
 
     def convert_to_ut_without_exceptions(self, data):
         """
         See :func:`~convert_to_ut`. This is the workhorse, without exceptions.
         To debug. call this in :func:`~convert_to_ut_and_validate`
         """
+        return self._open_and_convert(
+            data, self._convert_json_to_ut, self._convert_file_object_to_ut)
+
+    def _convert_to_model_without_exceptions(self, data):
+        """ See :func:`~convert_to_model` """
+        return self._open_and_convert(
+            data, self._convert_json_to_model, self._convert_file_object_to_model)
+
+    @classmethod
+    def _open_and_convert(cls, data, convert_json, convert_file_object):
+        """
+        Converts JSON data with convert_json, and anything else with convert_file_object,
+        once it is opened and decompressed
+        """
         if isinstance(data, dict):
-            return self._convert_json_to_ut(data)
+            return convert_json(data)
+        if buffers.is_buffer(data):
+            with buffers.open_buffer(data) as file_object:
+                return cls._convert_possibly_compressed_file_object(
+                    file_object, convert_file_object)
         if utils.is_file_obj(data):
-            return self._convert_file_object_to_ut(data)
+            return cls._convert_possibly_compressed_file_object(data, convert_file_object)
         if utils.is_filename(data):
             with open(data, 'rb') as file_object:
-                return self._convert_file_object_to_ut(file_object)
-        return None
+                return cls._convert_possibly_compressed_file_object(
+                    file_object, convert_file_object)
+        raise CouldNotOpenFileException(f"Could not open {data}")
+
+    @classmethod
+    def _convert_possibly_compressed_file_object(cls, file_object, convert_file_object):
+        """ Decompresses gzip, bz2 or xz files as they are read """
+        with compression.decompressed(file_object) as decompressed_file:
+            return convert_file_object(decompressed_file)
+
+    def _convert_json_to_model(self, json_data):
+        """ Like :func:`~_convert_json_to_ut`, but returns the model """
+        return model.Election.from_ut_dict(self._convert_json_to_ut(json_data))
+
+    def _convert_file_object_to_model(self, file_object):
+        """
+        Like :func:`~_convert_file_object_to_ut`, but returns the model. Converters which
+        can fill the model without building the dicts first override this.
+        """
+        return model.Election.from_ut_dict(self._convert_file_object_to_ut(file_object))
 
     def _convert_json_to_ut(self, json_data):
         """
@@ -127,16 +233,39 @@ class GenericGuessAtTransferConverter(Converter):
     candidates are transferring their votes.
     """
 
+    def __init__(self, numeric=arithmetic.FLOAT, precision=None):
+        """
+        :param numeric: 'float' to guess at transfers with floating point arithmetic, or
+                        'fixed' to keep tallies and transfers exact, as integers at a fixed
+                        number of decimal places.
+        :param precision: Number of decimal places used by 'fixed'. If None, it is the most
+                          decimal places of any tally in the data.
+        """
+        if numeric not in (arithmetic.FLOAT, arithmetic.FIXED):
+            raise ValueError(f"Unknown numeric backend: {numeric}")
+        self.numeric = numeric
+        self.precision = precision
+        super().__init__()
+
+    def _arithmetic_for(self, ut_rounds):
+        """ :return: The numeric backend for this data, from :func:`arithmetic.create` """
+        return arithmetic.create(self.numeric, self.precision, ut_rounds)
+
     @classmethod
-    def _weights_for_each_transfer(cls, eliminated_names, elected_names, vote_delta):
+    def _weights_for_each_transfer(cls, eliminated_names, elected_names, vote_delta,
+                                   backend=None):
         """
         :param eliminated_names: the names of each eliminated candidate
         :param elected_names: the names of each elected candidate
         :param vote_delta: a dict mapping candidate name to vote difference
                            between this round and the next round
+        :param backend: the numeric backend, which computes and checks the weights.
+                        Uses floats if None.
         :return: a dict mapping a transferring candidate's name to the weight they contributed
                 to the overall transfer. In most cases, there will only be one candidate in
                 transferring_candidates and the weight will be a simple 1.0.
+                With an exact backend, weights are instead integers out of the total votes
+                lost, so no precision is lost in dividing.
         """
         # Names of both eliminated and elected candidates (elected may or may not have surpluses)
         transferring_candidates = eliminated_names + elected_names
@@ -144,14 +273,16 @@ class GenericGuessAtTransferConverter(Converter):
         # How many votes are being transferred?
         votes_subtracted = -sum(d for d in vote_delta.values() if d < 0)
 
+        backend = backend or arithmetic.FloatArithmetic
         weights = {
-            name: -vote_delta[name] / votes_subtracted if votes_subtracted != 0 else 1
+            name: backend.weight(-vote_delta[name], votes_subtracted)
+            if votes_subtracted != 0 else 1
             for name in transferring_candidates
         }
 
         # Sanity check 1: weights must add up to 1
         if votes_subtracted != 0:
-            if abs(sum(weights.values()) - 1.0) > 1e-8:
+            if not backend.weights_add_up(weights.values(), votes_subtracted):
                 votes_gained = sum(vote_delta.values())
                 message = "Weights do not line up. This data is invalid. "\
                           f"In the round where {eliminated_names} were eliminated and "\
@@ -182,19 +313,11 @@ class GenericGuessAtTransferConverter(Converter):
                  between this round and the next. Includes positive numbers (gained votes) and
                  negative numbers (lost votes via elimination or surplus transfer)
         """
-        # Check who is no longer around next round
-        eliminated_names = [name for name in tally_this_round if name not in tally_next_round]
-
-        # Same as tally_next_round but includes 0 for eliminated candidates
-        numvotes_next_round = {
-            name: tally_next_round[name] if name not in eliminated_names else 0
-            for name in tally_this_round
-        }
-
-        # Compute the difference for each candidate in this round
+        # Compute the difference for each candidate in this round,
+        # counting anyone who is no longer around next round as having 0 votes
         return {
-            to_name: numvotes_next_round[to_name] - tally_this_round[to_name]
-            for to_name in tally_this_round
+            to_name: tally_next_round.get(to_name, 0) - votes
+            for to_name, votes in tally_this_round.items()
         }
 
     @classmethod
@@ -216,12 +339,13 @@ class GenericGuessAtTransferConverter(Converter):
         return cls._compute_vote_deltas_from_tally(tally_this_round, tally_next_round)
 
     @classmethod
-    def guess_at_tally_results(
+    def guess_at_tally_results(  # pylint: disable=too-many-arguments,too-many-locals
             cls,
             eliminated_names,
             elected_names,
             vote_delta,
-            allow_guessing=True):
+            allow_guessing=True,
+            backend=None):
         """
         Computes the tallyResult, the difference between this round and the next
         See the description of @_compute_tally_results to understand why, in the case of
@@ -232,36 +356,111 @@ class GenericGuessAtTransferConverter(Converter):
         :param vote_delta: a dict mapping candidate name to vote difference \
                            between this round and the next round.
         :param allow_guessing: Allow guessing of transfer data during batch elimination
+        :param backend: the numeric backend from :func:`~_arithmetic_for`. Uses floats if None.
         :return: The contents of the tallyResults dict
         """
-        weights = cls._weights_for_each_transfer(eliminated_names, elected_names, vote_delta)
+        weights = cls._weights_for_each_transfer(
+            eliminated_names, elected_names, vote_delta, backend)
+
+        # weights has an entry for every eliminated or elected candidate
+        names_to_transfer_to = [name for name in vote_delta.keys() if
+                                name not in weights and vote_delta[name] != 0]
+        exact_transfers = None
+        if backend is not None and backend.is_exact:
+            exact_transfers = cls._split_transfers_exactly(
+                weights, names_to_transfer_to, vote_delta, backend)
 
-        # Loop over each eliminated or elected candidate and generate the transfers to
+        # Loop over each eliminated or elected candidate and list the transfers to
         # continuing candidates
         tally_results = []
         transfer_methods = {
             'eliminated': eliminated_names,
             'elected': elected_names
         }
-        names_to_transfer_to = [name for name in vote_delta.keys() if
-                                name not in eliminated_names and
-                                name not in elected_names]
         for method, names in transfer_methods.items():
             for from_name in names:
                 tally_result = {}
                 tally_result[method] = from_name
                 is_batch_elimination_round = len(names) > 1
-                if not is_batch_elimination_round or allow_guessing:
+                if is_batch_elimination_round and not allow_guessing:
+                    transfers = {}
+                elif exact_transfers is not None:
+                    transfers = exact_transfers[from_name]
+                else:
                     transfers = {
                         to_name: vote_delta[to_name] * weights[from_name]
                         for to_name in names_to_transfer_to
-                        if vote_delta[to_name] != 0
                     }
-                else:
-                    transfers = {}
                 if transfers or method == 'eliminated':
                     # only add transfers on winners if they have actually been transferred
                     tally_result['transfers'] = transfers
 
                 tally_results.append(tally_result)
         return tally_results
+
+    @classmethod
+    def _split_transfers_exactly(cls, weights, names_to_transfer_to, vote_delta, backend):
+        """
+        Splits each continuing candidate's gain between the transferring candidates, such that
+        the transfers to each continuing candidate add up to exactly what they gained.
+
+        :return: a dict mapping each transferring candidate's name to its transfers
+        """
+        if len(weights) == 1:
+            # The fast path: a single candidate transfers exactly what everyone else gained
+            from_name, = weights
+            return {from_name: {to_name: backend.to_json(vote_delta[to_name])
+                                for to_name in names_to_transfer_to}}
+
+        transfers_from = {from_name: {} for from_name in weights}
+        weight_list = list(weights.values())
+        votes_subtracted = sum(weight_list)
+        for to_name in names_to_transfer_to:
+            parts = backend.split(vote_delta[to_name], weight_list, votes_subtracted)
+            for from_name, part in zip(weights, parts):
+                transfers_from[from_name][to_name] = part
+        return transfers_from
+
+    @classmethod
+    def guess_at_tally_results_for_all_rounds(  # pylint: disable=too-many-arguments
+            cls,
+            ut_rounds_tally_only,
+            eliminated_names_per_round,
+            elected_names_per_round,
+            allow_guessing=True,
+            backend=None):
+        """
+        Equivalent to calling :func:`~compute_vote_deltas_for_round` and
+        :func:`~guess_at_tally_results` on each round, but if numpy is installed, computes
+        every round at once with a :class:`~rcvformats.conversions.round_matrix.RoundMatrix`.
+
+        :param ut_rounds_tally_only: Incomplete Universal Tabulator 'results' structure, \
+                                     containing only 'tally' but not 'tallyResults'. \
+                                     The tallies must be numbers, not strings.
+        :param eliminated_names_per_round: for each round, the names of each eliminated candidate
+        :param elected_names_per_round: for each round, the names of each elected candidate
+        :param allow_guessing: Allow guessing of transfer data during batch elimination
+        :param backend: the numeric backend from :func:`~_arithmetic_for`. Uses floats if None.
+        :return: a list with the contents of each round's tallyResults
+        """
+        matrix = None
+        if round_matrix.is_available():
+            try:
+                matrix = round_matrix.RoundMatrix(ut_rounds_tally_only, backend)
+            except OverflowError:
+                # Too many votes to stay exact in int64: use python's unbounded ints
+                pass
+        if matrix is not None:
+            return matrix.tally_results(
+                eliminated_names_per_round, elected_names_per_round, allow_guessing)
+
+        all_tally_results = []
+        for round_i, _ in enumerate(ut_rounds_tally_only):
+            vote_delta = cls.compute_vote_deltas_for_round(ut_rounds_tally_only, round_i)
+            all_tally_results.append(cls.guess_at_tally_results(
+                eliminated_names_per_round[round_i],
+                elected_names_per_round[round_i],
+                vote_delta,
+                allow_guessing,
+                backend))
+        return all_tally_results
@@ -0,0 +1,370 @@
+"""
+Converts many files with :class:`~rcvformats.conversions.automatic.AutomaticConverter`,
+keeping a journal of each so that a long batch can be stopped and resumed.
+
+The journal is a SQLite database recording each input's status, a hash of its contents,
+its output file and any error. Rerunning a batch skips every input already converted
+whose contents have not changed since, so only the rest are converted. Any number of
+worker processes on the same machine may work through the same batch: each input is
+claimed in the journal before it is converted, so no two workers convert it at once.
+A worker which is stopped releases its claims, and those of a worker which died are
+taken over as soon as its process is gone. Only the standard library's sqlite3 is needed.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import hashlib
+from multiprocessing import util as multiprocessing_util
+import os
+import re
+import socket
+import sqlite3
+import tempfile
+import time
+
+from rcvformats.common import compression
+from rcvformats.common import serialization
+from rcvformats.conversions import pool
+from rcvformats.conversions.automatic import AutomaticConverter
+
+# Name of the journal written alongside the converted files, unless another is given
+JOURNAL_FILENAME = 'journal.sqlite3'
+
+# Seconds an input stays claimed by a worker, after which its worker is assumed to have
+# died, and another worker may convert it
+DEFAULT_STALE_AFTER = 60 * 60
+
+# The status of an input in the journal
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# What converting an input did, as returned by :func:`convert_input`
+CONVERTED = 'converted'
+SKIPPED = 'skipped'
+BUSY = 'busy'
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+# The journal a worker process of :func:`convert_batch` opens once and uses for every input
+_WORKER_JOURNAL = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    input TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    content_hash TEXT,
+    -- The file's size and modification time when it was hashed, to skip rehashing it
+    size INTEGER,
+    mtime_ns INTEGER,
+    output TEXT,
+    error TEXT,
+    worker TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inputs_by_status ON inputs(status);
+"""
+
+
+class BatchJournal:
+    """
+    The journal of a batch. Each process must open its own: a journal cannot be shared
+    between processes or threads, but its file can.
+    """
+
+    def __init__(self, filename, stale_after=DEFAULT_STALE_AFTER):
+        """
+        :param filename: The SQLite database to keep the journal in, created if needed
+        :param stale_after: Seconds after which another worker's claim is ignored
+        """
+        self.filename = filename
+        self.stale_after = stale_after
+        # Transactions are begun explicitly, so that claims lock the database when asked
+        self.connection = sqlite3.connect(filename, timeout=60, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        # Lets workers read the journal while another writes to it
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def close(self):
+        """ Closes the database """
+        self.connection.close()
+
+    def get(self, input_filename):
+        """ :return: The input's journal entry as a dict, or None if it has none """
+        row = self.connection.execute(
+            "SELECT * FROM inputs WHERE input = ?", (input_filename,)).fetchone()
+        return None if row is None else dict(row)
+
+    def entries(self, status=None):
+        """ :return: Every journal entry, or only those with the given status """
+        if status is None:
+            rows = self.connection.execute("SELECT * FROM inputs ORDER BY input")
+        else:
+            rows = self.connection.execute(
+                "SELECT * FROM inputs WHERE status = ? ORDER BY input", (status,))
+        return [dict(row) for row in rows]
+
+    def claim(self, input_filename, worker):
+        """
+        Marks the input as being converted by worker, unless another worker has claimed
+        it within the last :attr:`stale_after` seconds.
+
+        :return: Whether it was claimed, and the input's journal entry before the claim
+        """
+        with self._write_transaction():
+            previous = self.get(input_filename)
+            if previous is not None and previous['status'] == RUNNING and \
+                    previous['worker'] != worker and not self._is_stale(previous):
+                return False, previous
+            self.connection.execute(
+                "INSERT INTO inputs (input, status, worker, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(input) DO UPDATE SET "
+                "status = excluded.status, worker = excluded.worker, updated = excluded.updated",
+                (input_filename, RUNNING, worker, time.time()))
+        return True, previous
+
+    def _is_stale(self, entry):
+        """
+        Whether a claim has outlived its worker: it is older than :attr:`stale_after`, or
+        its worker was a process on this machine which no longer exists
+        """
+        if time.time() - entry['updated'] >= self.stale_after:
+            return True
+        hostname, _, pid = entry['worker'].rpartition(':')
+        return hostname == socket.gethostname() and pid.isdigit() and \
+            not _process_exists(int(pid))
+
+    def release(self, input_filename, worker, previous):
+        """
+        Gives up a claim without converting the input, e.g. when stopped, so that another
+        worker may convert it at once
+
+        :param previous: The input's journal entry before it was claimed, as returned by\
+                         :meth:`claim`, which it is reset to
+        """
+        with self._write_transaction():
+            if previous is None:
+                self.connection.execute(
+                    "DELETE FROM inputs WHERE input = ? AND worker = ?", (input_filename, worker))
+            else:
+                self.connection.execute(
+                    "UPDATE inputs SET status = ?, worker = ?, updated = ? "
+                    "WHERE input = ? AND worker = ?",
+                    (previous['status'], previous['worker'], previous['updated'],
+                     input_filename, worker))
+
+    def record(  # pylint: disable=too-many-arguments
+            self, input_filename, status, fingerprint, output=None, error=None):
+        """
+        Records how converting a claimed input ended
+
+        :param status: :data:`DONE` or :data:`FAILED`
+        :param fingerprint: The (content_hash, size, mtime_ns) of the input converted
+        """
+        content_hash, size, mtime_ns = fingerprint
+        with self._write_transaction():
+            self.connection.execute(
+                "UPDATE inputs SET status = ?, content_hash = ?, size = ?, mtime_ns = ?, "
+                "output = ?, error = ?, updated = ? WHERE input = ?",
+                (status, content_hash, size, mtime_ns, output, error, time.time(),
+                 input_filename))
+
+    @contextlib.contextmanager
+    def _write_transaction(self):
+        """ Takes the database's write lock at once, so reads within see no other writer """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+
+def convert_batch(input_filenames, output_directory, journal_filename=None,
+                  max_workers=None, retry_failed=False, **json_options):
+    """
+    Converts each input to a JSON file in output_directory, skipping those already
+    converted by an earlier run with the same journal.
+
+    :param input_filenames: The files to convert
+    :param output_directory: Created if it does not exist
+    :param journal_filename: Defaults to :data:`JOURNAL_FILENAME` in output_directory
+    :param max_workers: If set, convert this many inputs at once, each in a worker\
+                        process. Otherwise, inputs are converted one after the other.
+    :param retry_failed: Convert inputs which failed before, even if unchanged since
+    :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+    :return: A dict of each input to what converting it did: :data:`CONVERTED`,\
+             :data:`FAILED`, :data:`SKIPPED` if it was converted (or failed) before and\
+             is unchanged, or :data:`BUSY` if another worker is converting it.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    if journal_filename is None:
+        journal_filename = os.path.join(output_directory, JOURNAL_FILENAME)
+    input_filenames = list(input_filenames)
+
+    if max_workers is None:
+        with BatchJournal(journal_filename) as journal:
+            outcomes = [convert_input(journal, name, output_directory, retry_failed,
+                                      **json_options)
+                        for name in input_filenames]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_open_worker_journal,
+                                 initargs=(journal_filename,)) as executor:
+            futures = [executor.submit(_convert_input_in_worker, name, output_directory,
+                                       retry_failed, json_options)
+                       for name in input_filenames]
+            outcomes = [future.result() for future in futures]
+    return dict(zip(input_filenames, outcomes))
+
+
+def _open_worker_journal(journal_filename):
+    """ Opens the journal once per worker process, rather than once per input """
+    global _WORKER_JOURNAL  # pylint: disable=global-statement
+    _WORKER_JOURNAL = BatchJournal(journal_filename)
+    # Unlike atexit, also run when the worker processes of a pool exit
+    multiprocessing_util.Finalize(None, _WORKER_JOURNAL.close, exitpriority=0)
+
+
+def _convert_input_in_worker(input_filename, output_directory, retry_failed, json_options):
+    return convert_input(_WORKER_JOURNAL, input_filename, output_directory,
+                         retry_failed, **json_options)
+
+
+def convert_input(journal, input_filename, output_directory, retry_failed=False,
+                  **json_options):
+    """
+    Converts a single input of a batch, unless the journal shows it needn't be.
+
+    :param journal: The :class:`BatchJournal` of the batch
+    :return: What converting it did, as described in :func:`convert_batch`
+    """
+    try:
+        stat = os.stat(input_filename)
+    except OSError:
+        stat = None
+    # Most inputs of a resumed batch are unchanged: tell without hashing or locking
+    if stat is not None and _is_up_to_date(journal.get(input_filename), stat, retry_failed):
+        return SKIPPED
+
+    worker = _worker_id()
+    is_claimed, previous = journal.claim(input_filename, worker)
+    if not is_claimed:
+        return BUSY
+    try:
+        return _convert_claimed_input(journal, input_filename, output_directory, stat,
+                                      previous, retry_failed, json_options)
+    except BaseException:
+        # Stopped, e.g. by Ctrl-C: leave the input for a resumed batch to convert
+        journal.release(input_filename, worker, previous)
+        raise
+
+
+def _convert_claimed_input(  # pylint: disable=too-many-arguments
+        journal, input_filename, output_directory, stat, previous, retry_failed, json_options):
+    """ :return: What converting the input, once claimed, did """
+    try:
+        if stat is None:
+            stat = os.stat(input_filename)
+        fingerprint = (_hash_file(input_filename), stat.st_size, stat.st_mtime_ns)
+    except OSError as error:
+        # Missing or unreadable: fail this input, not the whole batch
+        journal.record(input_filename, FAILED, (None, None, None), error=_describe(error))
+        return FAILED
+
+    if _is_up_to_date(previous, stat, retry_failed, content_hash=fingerprint[0]):
+        # Only touched since: keep the earlier result, with the new modification time
+        journal.record(input_filename, previous['status'], fingerprint,
+                       previous['output'], previous['error'])
+        return SKIPPED
+
+    try:
+        data = pool.shared(AutomaticConverter).convert_to_ut(input_filename)
+        output_filename = os.path.join(output_directory, output_filename_for(input_filename))
+        _write_atomically(data, output_filename, json_options)
+    except Exception as error:  # pylint: disable=broad-except
+        journal.record(input_filename, FAILED, fingerprint, error=_describe(error))
+        return FAILED
+    journal.record(input_filename, DONE, fingerprint, output=output_filename)
+    return CONVERTED
+
+
+def output_filename_for(input_filename):
+    """
+    A filesystem-safe filename for the input's output, named after it, and the same
+    whichever worker converts it
+    """
+    basename = os.path.basename(input_filename)
+    if compression.compression_for_filename(basename) is not None:
+        basename = os.path.splitext(basename)[0]
+    stem = re.sub(r'[^\w.-]+', '_', os.path.splitext(basename)[0]).strip('._') or 'contest'
+    path_hash = hashlib.sha256(os.path.abspath(input_filename).encode('utf-8')).hexdigest()
+    return f"{stem}-{path_hash[:12]}.json"
+
+
+def _is_up_to_date(entry, stat, retry_failed, content_hash=None):
+    """
+    Whether the journal entry is of a finished conversion of the input as it is now: with
+    the same content hash if given, or otherwise the same size and modification time
+    """
+    if entry is None:
+        return False
+    if entry['status'] == DONE:
+        if entry['output'] is None or not os.path.exists(entry['output']):
+            return False
+    elif entry['status'] != FAILED or retry_failed:
+        return False
+
+    if content_hash is not None:
+        return entry['content_hash'] == content_hash
+    return (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+
+
+def _hash_file(filename):
+    content_hash = hashlib.sha256()
+    with open(filename, 'rb') as file_object:
+        for chunk in iter(lambda: file_object.read(_HASH_CHUNK_BYTES), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def _write_atomically(data, output_filename, json_options):
+    """ Writes to a temporary file first, so a worker dying never leaves half a file """
+    directory = os.path.dirname(os.path.abspath(output_filename))
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory,
+                                     suffix='.tmp', delete=False) as file_obj:
+        try:
+            serialization.dump(data, file_obj, **json_options)
+        except BaseException:
+            file_obj.close()
+            os.remove(file_obj.name)
+            raise
+    os.replace(file_obj.name, output_filename)
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_exists(pid):
+    if os.name == 'nt':  # pragma: no cover - os.kill would terminate the process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists, but belongs to another user
+        return True
+    return True
@@ -0,0 +1,194 @@
+"""
+Tabulates ballot-level cast vote records, rather than reading an already-tabulated summary.
+
+Because every ballot is known, each transfer is counted exactly, even when several
+candidates are eliminated at once, rather than guessed at as
+:class:`~rcvformats.conversions.base.GenericGuessAtTransferConverter` must.
+
+Ballots are held as a :class:`~rcvformats.common.ballots.RankedBallots` matrix, and each
+round is a handful of numpy operations over it: only the ballots whose current choice was
+just eliminated are looked at again. Requires numpy (pip install rcvformats[numpy]).
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from rcvformats.common import ballots as ballots_module
+from rcvformats.conversions.base import Converter
+
+# The name transfers to ballots with no continuing candidates ranked are listed under
+EXHAUSTED = 'exhausted'
+
+# Contest name used if none is configured
+DEFAULT_CONTEST = 'Ranked-choice contest'
+
+
+class CvrCsvConverter(Converter):
+    """
+    Tabulates a single-winner instant-runoff contest from a CSV file of ranked ballots,
+    as read by :func:`~rcvformats.common.ballots.RankedBallots.from_csv`
+    """
+
+    def __init__(self, config=None, batch_elimination=False):
+        """
+        :param config: The Universal Tabulator 'config' of the contest: its 'contest' name,\
+                       and optionally 'date', 'jurisdiction' and 'office'. The ballots\
+                       themselves do not say.
+        :param batch_elimination: Eliminate every candidate who cannot possibly win at once:\
+                                  the most candidates whose combined votes are fewer than\
+                                  the next candidate's. Otherwise, one candidate per round.
+        """
+        if np is None:
+            raise ImportError("Tabulating ballots requires numpy: pip install rcvformats[numpy]")
+        self.config = {'contest': DEFAULT_CONTEST, **(config or {})}
+        self.batch_elimination = batch_elimination
+        super().__init__()
+
+    def _convert_file_object_to_ut(self, file_object):
+        return self.tabulate(ballots_module.RankedBallots.from_csv(file_object))
+
+    def tabulate(self, ballots):
+        """
+        :param ballots: The :class:`~rcvformats.common.ballots.RankedBallots` to count
+        :return: The Universal Tabulator data
+        """
+        ballots.ensure_countable()
+        count = BallotCount(ballots.compressed())
+        results = []
+        while True:
+            tally = count.tally()
+            continuing = count.continuing_ids()
+            total = tally[continuing].sum()
+            leader = continuing[np.argmax(tally[continuing])]
+            round_data = {'round': len(results) + 1,
+                          'tally': count.tally_dict(tally, continuing), 'tallyResults': []}
+            results.append(round_data)
+
+            if len(continuing) == 1 or tally[leader] * 2 > total:
+                round_data['tallyResults'].append({'elected': count.names[leader]})
+                break
+
+            if self.batch_elimination:
+                eliminated = count.batch_of_losers(tally, continuing)
+            else:
+                eliminated = count.by_fewest_votes(continuing)[:1]
+            transfers = count.eliminate(eliminated)
+            round_data['tallyResults'] = [
+                {'eliminated': count.names[candidate_id],
+                 'transfers': count.transfers_dict(transfers[candidate_id])}
+                for candidate_id in eliminated]
+
+        data = {'config': dict(self.config), 'results': results}
+        Converter.postprocess_use_standard_irv_threshold(data)
+        return data
+
+
+class BallotCount:  # pylint: disable=too-many-instance-attributes
+    """
+    The state of a count: which candidates continue, and which candidate each ballot
+    currently counts for. Ballots counting for no continuing candidate are exhausted.
+    """
+
+    def __init__(self, ballots):
+        """
+        :param ballots: The :class:`~rcvformats.common.ballots.RankedBallots` to count
+        """
+        self.names = ballots.candidates
+        self.weights = ballots.weights
+        self.is_integer = ballots.weights.dtype.kind in 'iu'
+
+        # Blank ranks are mapped to an extra, never-continuing candidate, which also
+        # stands for "exhausted" in each ballot's current choice
+        self.exhausted_id = len(self.names)
+        self.ranks = np.where(ballots.ranks == ballots_module.NO_RANKING,
+                              self.exhausted_id, ballots.ranks)
+        self.is_continuing = np.ones(len(self.names) + 1, dtype=bool)
+        self.is_continuing[self.exhausted_id] = False
+
+        self.current = np.full(len(self.ranks), self.exhausted_id, dtype=np.int32)
+        self.history = []
+        self._advance(np.arange(len(self.ranks)))
+
+    def continuing_ids(self):
+        """ The ids of every continuing candidate, in order """
+        return np.flatnonzero(self.is_continuing)
+
+    def tally(self):
+        """
+        :return: The votes for each candidate, and lastly the exhausted ballots. Also
+                 remembered in :attr:`history`, for breaking ties.
+        """
+        tally = np.bincount(self.current, weights=self.weights, minlength=len(self.names) + 1)
+        self.history.append(tally)
+        return tally
+
+    def eliminate(self, candidate_ids):
+        """
+        Removes candidates from the count, moving each of their ballots to its next
+        continuing choice.
+
+        :return: A dict of each eliminated candidate's id to the votes transferred to every\
+                 candidate, and lastly to exhausted
+        """
+        self.is_continuing[candidate_ids] = False
+        moving = np.flatnonzero(np.isin(self.current, candidate_ids))
+        from_ids = self.current[moving]
+        self._advance(moving)
+        return self._transfers(moving, from_ids, candidate_ids)
+
+    def _advance(self, rows):
+        """ Points each of the ballots in rows to its highest-ranked continuing candidate """
+        ranks = self.ranks[rows]
+        is_continuing = self.is_continuing[ranks]
+        first = is_continuing.argmax(axis=1)
+        choice = ranks[np.arange(len(rows)), first]
+        self.current[rows] = np.where(is_continuing.any(axis=1), choice, self.exhausted_id)
+
+    def _transfers(self, rows, from_ids, candidate_ids):
+        """ :return: See :func:`~eliminate` """
+        weights = self.weights[rows]
+        width = len(self.names) + 1
+        return {candidate_id: np.bincount(self.current[rows][from_ids == candidate_id],
+                                          weights=weights[from_ids == candidate_id],
+                                          minlength=width)
+                for candidate_id in candidate_ids}
+
+    def by_fewest_votes(self, candidate_ids):
+        """
+        :return: The candidate ids, sorted from fewest votes this round to most. Ties are
+                 broken by who had fewer votes on the latest round they differed, then by
+                 who was listed last.
+        """
+        candidate_ids = np.asarray(candidate_ids)
+        history = np.array(self.history)[:, candidate_ids]
+        # lexsort sorts by its last key first: this round, then each earlier round in turn
+        return candidate_ids[np.lexsort([-candidate_ids] + list(history))]
+
+    def batch_of_losers(self, tally, candidate_ids):
+        """
+        :return: The ids of the most candidates who, together, have fewer votes than any
+                 other candidate, and so cannot possibly win: at least the one with the
+                 fewest votes, and never every candidate.
+        """
+        by_fewest_votes = self.by_fewest_votes(candidate_ids)
+        votes = tally[by_fewest_votes]
+        is_safe = np.cumsum(votes)[:-1] < votes[1:]
+        num_to_eliminate = (np.flatnonzero(is_safe) + 1).max(initial=1)
+        return np.sort(by_fewest_votes[:num_to_eliminate])
+
+    def tally_dict(self, tally, candidate_ids):
+        """ :return: The Universal Tabulator tally of the given candidates, in order """
+        return {self.names[candidate_id]: self.votes(tally[candidate_id])
+                for candidate_id in candidate_ids}
+
+    def transfers_dict(self, transfers):
+        """ :return: The Universal Tabulator transfers, leaving out those of zero votes """
+        names = self.names + [EXHAUSTED]
+        return {names[candidate_id]: self.votes(transfers[candidate_id])
+                for candidate_id in np.flatnonzero(transfers)}
+
+    def votes(self, votes):
+        """ A vote count as a python number: an int if every ballot's weight is """
+        return int(round(votes)) if self.is_integer else float(votes)
@@ -2,10 +2,11 @@
 Reads an Dominion XML file containing many contests.
 """
 
-import json
 from tempfile import NamedTemporaryFile
 import xml.etree.ElementTree as ET
 
+from rcvformats.common import serialization
+from rcvformats.common.bundle import BundleWriter
 from rcvformats.conversions.base import Converter
 
 
@@ -15,10 +16,57 @@ class DominionMultiConverter():  # pylint: disable=too-few-public-methods
     testdata/inputs/dominion-multi-converter.xml, which contains many elections.
     """
     @classmethod
-    def explode_to_files(cls, file_object):
+    def explode_to_files(cls, file_object, **json_options):
         """
         Given the XML format with multiple elections,
         explodes into many files, and returns a dictionary of titles to NamedTemporaryFiles.
+
+        :param json_options: Passed to :func:`rcvformats.common.serialization.dump`
+        """
+        output = {}
+        for contest, urcvt_data in cls.convert_to_ut_per_contest(file_object).items():
+            # pylint: disable=consider-using-with
+            temp_file = NamedTemporaryFile(suffix=".json", mode='r+')
+            serialization.dump(urcvt_data, temp_file, **json_options)
+            temp_file.flush()
+            output[contest] = temp_file
+
+        return output
+
+    @classmethod
+    def explode_to_bundle(cls, file_object, filename, append=False, **json_options):
+        """
+        Like :func:`~explode_to_files`, but writes every contest to a single bundle file,
+        each as soon as it is converted, to be read with
+        :class:`~rcvformats.common.bundle.BundleReader`.
+
+        :param append: Add to the contests already in the bundle, rather than overwrite it
+        :param json_options: Passed to :class:`~rcvformats.common.bundle.BundleWriter`
+        :return: The titles of the contests written
+        """
+        with BundleWriter(filename, append, **json_options) as writer:
+            titles = []
+            for contest, urcvt_data in cls.iter_ut_per_contest(file_object):
+                writer.add(contest, urcvt_data)
+                titles.append(contest)
+        return titles
+
+    @classmethod
+    def convert_to_ut_per_contest(cls, file_object):
+        """
+        Like :func:`~explode_to_files`, but without writing any files.
+
+        :return: A dictionary of titles to Universal Tabulator data
+        """
+        return dict(cls.iter_ut_per_contest(file_object))
+
+    @classmethod
+    def iter_ut_per_contest(cls, file_object):
+        """
+        Like :func:`~convert_to_ut_per_contest`, but converts each contest only as it is
+        needed.
+
+        :return: An iterator of (title, Universal Tabulator data) pairs
         """
         element_tree = ET.parse(file_object)
         contest_id_groups = element_tree.getroot() \
@@ -31,7 +79,6 @@ class DominionMultiConverter():  # pylint: disable=too-few-public-methods
             .find('{ElectionSummaryReportRPT}ContestIdGroup_Collection') \
             .findall('{ElectionSummaryReportRPT}ContestIdGroup')
 
-        output = {}
         for contest_id_element in contest_id_groups:
             config = cls._parse_config(element_tree, contest_id_element)
             results = cls._parse_vote_count(contest_id_element)
@@ -43,14 +90,7 @@ class DominionMultiConverter():  # pylint: disable=too-few-public-methods
 
             Converter.postprocess_remove_last_round_elimination(urcvt_data)
             Converter.postprocess_use_standard_irv_threshold(urcvt_data)
-
-            # pylint: disable=consider-using-with
-            temp_file = NamedTemporaryFile(suffix=".json", mode='r+')
-            json.dump(urcvt_data, temp_file)
-            temp_file.flush()
-            output[config['contest']] = temp_file
-
-        return output
+            yield config['contest'], urcvt_data
 
     @classmethod
     def _parse_config(cls, element_tree, contest_id_element):
@@ -124,22 +124,24 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
                 return row
             return None
 
-    def __init__(self):
-        super().__init__()
-
-        # These fields will be filled out as data is loaded
+    class ParseContext:  # pylint: disable=too-few-public-methods
+        """
+        Everything learned while parsing a single file. It is kept here rather than on the
+        converter, so one converter can parse many files at once, e.g. from several threads.
+        """
 
-        # The loaded spreadsheet
-        self.sheet = None
+        def __init__(self, sheet):
+            # The sheet currently being read
+            self.sheet = sheet
 
-        # Row constants
-        self.row_constants = self.RowConstants()
+            # Row constants
+            self.row_constants = DominionXlsxConverter.RowConstants()
 
-        # names of each candidate
-        self.candidates = None
+            # names of each candidate
+            self.candidates = None
 
-        # list of RoundInfo, one per round
-        self.data_per_round = None
+            # list of RoundInfo, one per round
+            self.data_per_round = None
 
     def _convert_file_object_to_ut(self, file_object):
         workbook = load_workbook(file_object)  # note: somehow, readonly is 2x slower
@@ -152,33 +154,36 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
             round_by_round_sheet = config_sheet
         else:
             round_by_round_sheet = workbook[workbook.sheetnames[1]]
-        self.sheet = round_by_round_sheet
-        self.row_constants.find_rows_before_summary_table(workbook)
-        self.candidates = self._parse_candidates()
-        self.row_constants.find_rows_after_summary_table(self.sheet, len(self.candidates))
-        self.data_per_round = self._parse_rounds()
-        results = self._get_vote_counts_per_candidate()
+        context = self.ParseContext(round_by_round_sheet)
+        context.row_constants.find_rows_before_summary_table(workbook)
+        context.candidates = self._parse_candidates(context)
+        context.row_constants.find_rows_after_summary_table(
+            context.sheet, len(context.candidates))
+        context.data_per_round = self._parse_rounds(context)
+        results = self._get_vote_counts_per_candidate(context)
 
         # Config headers are always on the first sheet.
-        self.sheet = workbook[workbook.sheetnames[0]]
-        config = self._parse_config()
+        context.sheet = workbook[workbook.sheetnames[0]]
+        config = self._parse_config(context)
 
         urcvt_data = {'config': config, 'results': results}
 
         self.postprocess_remove_last_round_elimination(urcvt_data)
-        self._postprocess_set_threshold_from_spreadsheet(urcvt_data, round_by_round_sheet)
+        self._postprocess_set_threshold_from_spreadsheet(
+            context, urcvt_data, round_by_round_sheet)
         workbook.close()
 
         return urcvt_data
 
-    def _parse_config(self):
+    @classmethod
+    def _parse_config(cls, context):
         """
         Returns the URCV config format
         """
         config = {}
 
         # First, try to parse the date
-        date_with_time = self.sheet[self.DATE_CELL].value
+        date_with_time = context.sheet[cls.DATE_CELL].value
         try:
             config['date'] = str(date_with_time.date())
         except AttributeError:
@@ -186,13 +191,14 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
             pass
 
         # Then, grab the required title
-        seat = self.sheet.cell(self.row_constants.seat_title, 1).value
+        seat = context.sheet.cell(context.row_constants.seat_title, 1).value
         config['contest'] = seat
         config['office'] = seat
 
         return config
 
-    def _parse_rounds(self):
+    @classmethod
+    def _parse_rounds(cls, context):
         """
         Rounds are curious - they are separated by a varying number of columns,
         usually 3 except for the first few, where the initial columns have been
@@ -205,7 +211,7 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
         data_per_round = []
         max_cols = 1500
         while True:
-            cell = self.sheet.cell(self.row_constants.round_label, col)
+            cell = context.sheet.cell(context.row_constants.round_label, col)
             value = cell.value
 
             col += 1
@@ -238,7 +244,7 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
 
             # If not, we must be in the next round. Increment and carry on.
             assert value == 'Round ' + str(num_rounds + 1)
-            roundinfo = self.RoundInfo()
+            roundinfo = cls.RoundInfo()
             roundinfo.round_num = num_rounds
             roundinfo.column = col - 1
             data_per_round.append(roundinfo)
@@ -246,22 +252,23 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
         assert len(data_per_round) >= 1
         return data_per_round
 
-    def _parse_candidates(self):
+    @classmethod
+    def _parse_candidates(cls, context):
         """
         Grabs the list of candidate names from the summary table
         """
         end_of_candidates_marker = 'Continuing Ballots Total'
         max_num_rows = 500
         candidate_names = []
-        row = self.row_constants.first_candidate
+        row = context.row_constants.first_candidate
         while True:
-            candidate_name = self.sheet['A' + str(row)].value
+            candidate_name = context.sheet['A' + str(row)].value
             if candidate_name == end_of_candidates_marker:
                 break
             if row == max_num_rows:
                 raise DataError("This document is not in the correct format..."
                                 "or there are more than 500 candidates")
-            cell = self.sheet['A' + str(row)]
+            cell = context.sheet['A' + str(row)]
             name = cell.value
             candidate_names.append(name)
             row += 1
@@ -288,57 +295,61 @@ class DominionXlsxConverter(GenericGuessAtTransferConverter):
         """
         return color == 'FF89CC89'
 
-    def _parse_tally_for_round_at_column(self, col, eliminated_names):
+    @classmethod
+    def _parse_tally_for_round_at_column(cls, context, col, eliminated_names):
         """ Creates a 'tally' and 'tallyResults' struct for the given round """
-        starting_candidate_row = self.row_constants.first_candidate
+        starting_candidate_row = context.row_constants.first_candidate
         tally = {}
         tally_results = []
-        for i, name in enumerate(self.candidates):
+        for i, name in enumerate(context.candidates):
             if name in eliminated_names:
                 continue
 
             row = starting_candidate_row + i
-            cell = self.sheet.cell(row, col)
+            cell = context.sheet.cell(row, col)
             vote_count = cell.value
             tally[name] = vote_count
 
             fill_type = cell.fill.fill_type
             if fill_type is not None:
                 bg_color = cell.fill.bgColor.rgb
-                if self._is_eliminated_color(bg_color):
+                if cls._is_eliminated_color(bg_color):
                     eliminated_names.add(name)
                     tally_results.append({'eliminated': name})
-                elif self._is_elected_color(bg_color):
+                elif cls._is_elected_color(bg_color):
                     tally_results.append({'elected': name})
                 else:
                     # Just make sure we have no rogue colors
                     assert bg_color == '00000000'
 
         # Add inactive ballots
-        tally['Inactive Ballots'] = self.sheet.cell(self.row_constants.inactive_ballots, col).value
+        tally['Inactive Ballots'] = context.sheet.cell(
+            context.row_constants.inactive_ballots, col).value
 
         return tally, tally_results, eliminated_names
 
-    def _get_vote_counts_per_candidate(self):
+    @classmethod
+    def _get_vote_counts_per_candidate(cls, context):
         results = []
         eliminated_names = set()
-        for round_info in self.data_per_round:
+        for round_info in context.data_per_round:
             col = round_info.column
             tally, tally_results, eliminated_names = \
-                self._parse_tally_for_round_at_column(col, eliminated_names)
+                cls._parse_tally_for_round_at_column(context, col, eliminated_names)
             results.append({
                 'round': round_info.round_num + 1,
                 'tally': tally,
                 'tallyResults': tally_results})
         return results
 
-    def _postprocess_set_threshold_from_spreadsheet(self, data, sheet):
+    @classmethod
+    def _postprocess_set_threshold_from_spreadsheet(cls, context, data, sheet):
         """
         The threshold is always listed on the table of per-round info
         We don't guess here - if we can't find it, we leave it blank.
         """
-        last_round_col = self.data_per_round[-1].column
-        maybe_threshold_row = self.row_constants.maybe_threshold
+        last_round_col = context.data_per_round[-1].column
+        maybe_threshold_row = context.row_constants.maybe_threshold
         if maybe_threshold_row is not None:
             threshold = sheet.cell(maybe_threshold_row, last_round_col).value
             data['config']['threshold'] = threshold
@@ -27,7 +27,10 @@ class ElectionBuddyConverter(GenericGuessAtTransferConverter):
         ut_rounds = self._get_round_data_without_tallyresults(raw_data.rounds)
 
         # Then, compute the tally results
-        self._fill_in_tallyresults_from_tally(raw_data.rounds, ut_rounds)
+        backend = self._arithmetic_for(ut_rounds)
+        backend.parse_tallies(ut_rounds)
+        self._fill_in_tallyresults_from_tally(raw_data.rounds, ut_rounds, backend)
+        backend.restore_tallies(ut_rounds)
 
         return {'config': config, 'results': ut_rounds}
 
@@ -47,19 +50,24 @@ class ElectionBuddyConverter(GenericGuessAtTransferConverter):
         return ut_rounds
 
     @classmethod
-    def _fill_in_tallyresults_from_tally(cls, rounds, ut_rounds):
+    def _fill_in_tallyresults_from_tally(cls, rounds, ut_rounds, backend=None):
         """ Fills in tallyResults in ut_rounds """
         already_elected_set = set()
+        eliminated_names_per_round = []
+        elected_names_per_round = []
         for round_i in range(len(rounds)):
             # Get who was elected and eliminated
-            elected_names = cls._get_elected_names(rounds, round_i, already_elected_set)
-            eliminated_names = cls._get_eliminated_names(rounds, round_i)
-            # Get how the votes change between this round and next
-            vote_delta = cls.compute_vote_deltas_for_round(ut_rounds, round_i)
-            # Use that to compute the tallyResults structure
-            tally_results = cls.guess_at_tally_results(eliminated_names, elected_names, vote_delta)
-            # Store it, completing the structure for this round
-            ut_rounds[round_i]['tallyResults'] = tally_results
+            elected_names_per_round.append(
+                cls._get_elected_names(rounds, round_i, already_elected_set))
+            eliminated_names_per_round.append(cls._get_eliminated_names(rounds, round_i))
+
+        # Use how the votes change between rounds to compute the tallyResults structure
+        all_tally_results = cls.guess_at_tally_results_for_all_rounds(
+            ut_rounds, eliminated_names_per_round, elected_names_per_round, backend=backend)
+
+        # Store it, completing the structure for each round
+        for ut_round, tally_results in zip(ut_rounds, all_tally_results):
+            ut_round['tallyResults'] = tally_results
 
     @classmethod
     def _threshold_for_round(cls, rounds, round_i):
@@ -82,11 +90,10 @@ class ElectionBuddyConverter(GenericGuessAtTransferConverter):
         if round_i == len(rounds) - 1:
             return []
 
-        thisround_candidates = set(rounds[round_i]['candidates'])
         nextround_candidates = set(rounds[round_i + 1]['candidates'])
 
-        # Check who is no longer around next round
-        return list(thisround_candidates - nextround_candidates)
+        # Check who is no longer around next round, keeping the order of the file
+        return [name for name in rounds[round_i]['candidates'] if name not in nextround_candidates]
 
     @classmethod
     def _get_elected_names(cls, rounds, round_i, already_elected_set):
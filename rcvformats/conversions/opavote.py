@@ -2,10 +2,27 @@
 Reads an ElectionBuddy CSV results file, writes to the standard format
 """
 
-import json
+import array
+import itertools
 
+from rcvformats.common import jsonstream
+from rcvformats.common import model
+from rcvformats.conversions import round_matrix
 from rcvformats.conversions.base import GenericGuessAtTransferConverter
 
+# The only keys of each Opavote round used in the conversion: the rest, such as each
+# round's "msg", are dropped as soon as the round is read
+_ROUND_KEYS = ('count', 'winners', 'losers')
+
+
+def _keep_used_round_keys(round_data):
+    round_data = {key: round_data[key] for key in _ROUND_KEYS if key in round_data}
+    if isinstance(round_data.get('count'), list):
+        # Without a python object per count, every round's counts take a fraction of
+        # the memory while the rest of the file is read and converted
+        round_data['count'] = model.compact_votes(round_data['count'])
+    return round_data
+
 
 class OpavoteConverter(GenericGuessAtTransferConverter):
     """
@@ -49,17 +66,42 @@ class OpavoteConverter(GenericGuessAtTransferConverter):
         return rounds[round_i]['count'][candidate_i]
 
     def _convert_file_object_to_ut(self, file_object):
-        data = json.load(file_object)
+        data = jsonstream.load(file_object, {'rounds': _keep_used_round_keys})
+
+        rounds = data['rounds']
+        candidate_names = data['candidates']
+        ut_rounds = None
+        if round_matrix.is_available():
+            ut_rounds = self._convert_rounds_with_matrix(rounds, candidate_names)
+        if ut_rounds is None:
+            ut_rounds = self._convert_rounds(rounds, candidate_names)
 
+        return {'config': self._ut_config(data), 'results': ut_rounds}
+
+    def _convert_file_object_to_model(self, file_object):
+        data = jsonstream.load(file_object, {'rounds': _keep_used_round_keys})
+
+        election = None
+        if round_matrix.is_available():
+            election = self._fill_election_with_matrix(
+                model.Election(self._ut_config(data)), data['rounds'], data['candidates'])
+        if election is None:
+            election = model.Election.from_ut_dict({
+                'config': self._ut_config(data),
+                'results': self._convert_rounds(data['rounds'], data['candidates'])})
+        return election
+
+    @classmethod
+    def _ut_config(cls, data):
         threshold = sum(data['rounds'][-1]['count']) / (data['n_seats'] + 1)
-        ut_config = {
+        return {
             'contest': data['title'],
             'threshold': threshold
         }
 
+    def _convert_rounds(self, rounds, candidate_names):
+        """ :return: The Universal Tabulator 'results' of the Opavote rounds """
         # Fill out rounds['tally']
-        rounds = data['rounds']
-        candidate_names = data['candidates']
         ut_rounds = []
         for round_i in range(len(rounds)):
             ut_round = {
@@ -71,10 +113,111 @@ class OpavoteConverter(GenericGuessAtTransferConverter):
                 ut_round['tally'][name] = votes
             ut_rounds.append(ut_round)
 
-        self._fill_in_tallyresults(rounds, candidate_names, ut_rounds)
+        backend = self._arithmetic_for(ut_rounds)
+        backend.parse_tallies(ut_rounds)
+        self._fill_in_tallyresults(rounds, candidate_names, ut_rounds, backend)
+        backend.restore_tallies(ut_rounds)
         self._remove_eliminated_candidates_from_tally(rounds, candidate_names, ut_rounds)
+        return ut_rounds
+
+    def _convert_rounds_with_matrix(self, rounds, candidate_names):
+        """
+        Like :func:`~_convert_rounds`, but with every round's counts read straight into
+        a :class:`~rcvformats.conversions.round_matrix.RoundMatrix`, rather than into a
+        dict per round first, and with who has been eliminated from each round's tally
+        found all at once.
+
+        :return: The Universal Tabulator 'results', or None if the counts are not one\
+                 number per candidate in every round, or are too large to stay exact
+        """
+        matrix = self._count_matrix(rounds, candidate_names)
+        if matrix is None:
+            return None
+        all_tally_results = matrix.tally_results(
+            *self._transferring_names_from_matrix(matrix, rounds, candidate_names))
+
+        ut_rounds = []
+        for round_i, (counts, is_in_round_tally, tally_results) in enumerate(zip(
+                self._counts_per_round(matrix, rounds), self._tally_mask(matrix, rounds),
+                all_tally_results)):
+            tally = dict(zip(itertools.compress(candidate_names, is_in_round_tally),
+                             itertools.compress(counts, is_in_round_tally)))
+            ut_rounds.append({'round': round_i + 1, 'tally': tally,
+                              'tallyResults': tally_results})
+        return ut_rounds
+
+    def _fill_election_with_matrix(self, election, rounds, candidate_names):
+        """
+        Like :func:`~_convert_rounds_with_matrix`, but fills the model's rounds straight
+        from the matrix, so that the dicts of every round are never built
+
+        :return: The election, or None if the rounds could not be converted with a matrix
+        """
+        matrix = self._count_matrix(rounds, candidate_names)
+        if matrix is None or len(set(candidate_names)) != len(candidate_names):
+            return None
+        # Each candidate's id is then their column
+        for name in candidate_names:
+            election.candidate_id(name)
+        all_tally_results = matrix.model_tally_results(
+            *self._transferring_names_from_matrix(matrix, rounds, candidate_names), election)
+
+        columns = range(len(candidate_names))
+        for round_i, (counts, is_in_round_tally, tally_results) in enumerate(zip(
+                self._counts_per_round(matrix, rounds), self._tally_mask(matrix, rounds),
+                all_tally_results)):
+            election.rounds.append(model.Round(
+                round_i + 1,
+                array.array('I', itertools.compress(columns, is_in_round_tally)),
+                model.compact_votes(itertools.compress(counts, is_in_round_tally)),
+                tally_results))
+        return election
 
-        return {'config': ut_config, 'results': ut_rounds}
+    def _count_matrix(self, rounds, candidate_names):
+        """
+        :return: The :class:`~rcvformats.conversions.round_matrix.RoundMatrix` of the\
+                 counts, or None if they are not one number per candidate in every round,\
+                 or are too large to stay exact
+        """
+        try:
+            return round_matrix.RoundMatrix.from_tallies(
+                candidate_names, [round_data['count'] for round_data in rounds],
+                self.numeric, self.precision)
+        except (TypeError, ValueError, ArithmeticError):
+            return None
+
+    @classmethod
+    def _transferring_names_from_matrix(cls, matrix, rounds, candidate_names):
+        """
+        :return: For each round, the names of the candidates newly eliminated, and the\
+                 names of those newly elected
+        """
+        # Opavote lists everyone eliminated so far on the round after the latest was
+        # eliminated, and everyone elected so far on the round they were elected
+        eliminated_per_round = matrix.newly_listed(
+            [round_data['losers'] for round_data in rounds[1:]] + [rounds[-1]['losers']])
+        elected_per_round = matrix.newly_listed([round_data['winners'] for round_data in rounds])
+        return ([[candidate_names[i] for i in ids] for ids in eliminated_per_round],
+                [[candidate_names[i] for i in ids] for ids in elected_per_round])
+
+    @classmethod
+    def _tally_mask(cls, matrix, rounds):
+        """
+        As in _remove_eliminated_candidates_from_tally, each round's losers, which were
+        eliminated in an earlier round, are left out of its tally
+
+        :return: For each round, whether each column is in its tally
+        """
+        return (~matrix.mask_of_columns(
+            [[]] + [round_data['losers'] for round_data in rounds[1:]])).tolist()
+
+    @classmethod
+    def _counts_per_round(cls, matrix, rounds):
+        """ :return: Each round's counts, as the round-by-round path would write them """
+        if matrix.is_exact and not matrix.backend.already_integers:
+            # Written as the backend would have restored them, e.g. as floats
+            return matrix.tallies_as_json()
+        return [round_data['count'] for round_data in rounds]
 
     @classmethod
     def _remove_eliminated_candidates_from_tally(cls, rounds, candidate_names, ut_rounds):
@@ -84,10 +227,15 @@ class OpavoteConverter(GenericGuessAtTransferConverter):
                 del ut_rounds[round_i]['tally'][candidate_name]
 
     @classmethod
-    def _fill_in_tallyresults(cls, rounds, candidate_names, ut_rounds):
-        """ Fill out rounds['tallyResults'] based on rounds['tally'] """
+    def _transferring_names_per_round(cls, rounds, candidate_names):
+        """
+        :return: For each round, the names of the candidates newly eliminated, and the\
+                 names of those newly elected
+        """
         already_eliminated = set()
         already_elected = set()
+        eliminated_names_per_round = []
+        elected_names_per_round = []
         for round_i, _ in enumerate(rounds):
             # Get who was elected and eliminated
             eliminated_names = cls._get_eliminated_names(rounds, candidate_names, round_i)
@@ -101,11 +249,20 @@ class OpavoteConverter(GenericGuessAtTransferConverter):
             already_elected.update(elected_names)
             already_eliminated.update(eliminated_names)
 
-            # Get how the votes change between this round and next
-            vote_delta = cls.compute_vote_deltas_for_round(ut_rounds, round_i)
+            eliminated_names_per_round.append(eliminated_names)
+            elected_names_per_round.append(elected_names)
+        return eliminated_names_per_round, elected_names_per_round
+
+    @classmethod
+    def _fill_in_tallyresults(cls, rounds, candidate_names, ut_rounds, backend=None):
+        """ Fill out rounds['tallyResults'] based on rounds['tally'] """
+        eliminated_names_per_round, elected_names_per_round = \
+            cls._transferring_names_per_round(rounds, candidate_names)
 
-            # Use that to compute the tallyResults structure
-            tally_results = cls.guess_at_tally_results(eliminated_names, elected_names, vote_delta)
+        # Use how the votes change between rounds to compute the tallyResults structure
+        all_tally_results = cls.guess_at_tally_results_for_all_rounds(
+            ut_rounds, eliminated_names_per_round, elected_names_per_round, backend=backend)
 
-            # Store it, completing the structure for this round
-            ut_rounds[round_i]['tallyResults'] = tally_results
+        # Store it, completing the structure for each round
+        for ut_round, tally_results in zip(ut_rounds, all_tally_results):
+            ut_round['tallyResults'] = tally_results
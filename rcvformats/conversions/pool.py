@@ -0,0 +1,19 @@
+"""
+A module-level pool of converters, shared by every caller.
+
+Converters keep no state between conversions, so one instance per set of options can
+serve any number of conversions, on any number of threads, without being constructed
+(along with its schema) for each one.
+"""
+
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def shared(converter_type, **options):
+    """
+    :param converter_type: A :class:`~rcvformats.conversions.base.Converter` subclass
+    :param options: Keyword arguments for its constructor. They must be hashable.
+    :return: The shared instance of converter_type with these options
+    """
+    return converter_type(**options)
@@ -0,0 +1,368 @@
+"""
+The converters :class:`~rcvformats.conversions.automatic.AutomaticConverter` may try.
+
+Each converter is registered as a :class:`ConverterEntry`: a name, the import path of the
+converter class, and a cheap sniff of the file's first bytes. A converter's module is
+only imported the first time a file sniffs like its format, so registering more formats
+slows neither startup nor the detection of other formats.
+
+Other packages add converters through the "rcvformats.converters" entry point group,
+each naming a :class:`ConverterEntry`, e.g. in setup.py::
+
+    entry_points={'rcvformats.converters': ['myvendor = myvendor.rcv:CONVERTER_ENTRY']}
+
+Converters which sniff alike are tried in order of how often each has matched, most
+first. To remember this between runs, set the RCVFORMATS_PROBE_STATISTICS environment
+variable to a JSON file for it to be kept in. Matches are counted in memory, and added to
+the file every :data:`FLUSH_EVERY` matches and when the process exits, under a lock so
+that processes sharing the file do not lose each other's counts.
+"""
+
+import contextlib
+import functools
+import importlib
+from importlib import metadata
+import json
+from multiprocessing import util as multiprocessing_util
+import os
+import tempfile
+import threading
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows, where the file is not locked
+    fcntl = None
+
+# The entry point group other packages register converters under
+ENTRY_POINT_GROUP = 'rcvformats.converters'
+
+# The environment variable naming the file probe statistics are kept in
+STATISTICS_ENVIRONMENT_VARIABLE = 'RCVFORMATS_PROBE_STATISTICS'
+
+# How many bytes from the start of each file are sniffed
+SNIFF_BYTES = 4096
+
+# How many matches are counted in memory before they are added to the statistics file
+FLUSH_EVERY = 100
+
+# Guards every registry, entry and statistics. Shared rather than held by each, so that
+# they can be pickled along with a converter, e.g. to convert in another process.
+_LOCK = threading.RLock()
+
+# Every ProbeStatistics with a file, to flush at exit, and the process that is set up for
+_WITH_FILES = weakref.WeakSet()
+_FLUSHING_AT_EXIT_IN = None
+
+_BYTE_ORDER_MARK_AND_WHITESPACE = '\ufeff \t\r\n'
+
+
+def _as_bytes(head):
+    """ The head of a file opened in text mode, as it would read in binary mode """
+    return head.encode('utf-8') if isinstance(head, str) else head
+
+
+def decode_head(head):
+    """ The start of the file as text, in whichever of UTF-8, UTF-16 or UTF-32 it is in """
+    head = _as_bytes(head)
+    # The head may end partway through a character
+    return head.decode(json.detect_encoding(head), errors='ignore')
+
+
+def looks_like_json(head):
+    """ Does the start of the file look like a JSON object, in UTF-8, UTF-16 or UTF-32? """
+    return decode_head(head).lstrip(_BYTE_ORDER_MARK_AND_WHITESPACE).startswith('{')
+
+
+def looks_like_xml(head):
+    """ Does the start of the file look like an XML document? """
+    return decode_head(head).lstrip(_BYTE_ORDER_MARK_AND_WHITESPACE).startswith('<')
+
+
+def looks_like_zip(head):
+    """ Does the start of the file look like a zip archive, such as an .xlsx file? """
+    return _as_bytes(head).startswith(b'PK\x03\x04')
+
+
+def looks_like_utf16(head):
+    """ Does the start of the file look like UTF-16 text? """
+    head = _as_bytes(head)
+    return head.startswith((b'\xff\xfe', b'\xfe\xff')) or \
+        (len(head) >= 8 and head[1:8:2] == b'\x00' * 4)
+
+
+def looks_like_utf8_text(head):
+    """ Does the start of the file look like text other than JSON, such as a CSV file? """
+    head = _as_bytes(head)
+    return b'\x00' not in head and not looks_like_json(head) and not looks_like_zip(head)
+
+
+class ConverterEntry:
+    """ A converter, imported only when it is first needed, and how to recognize its files """
+
+    def __init__(self, name, target, sniff=None):
+        """
+        :param name: A unique name for the format, e.g. 'opavote'
+        :param target: The converter class, or its import path as 'module:ClassName'
+        :param sniff: A fast function given the first :data:`SNIFF_BYTES` of a file,\
+                      returning whether the file might be in this format. It must not\
+                      import anything slow. If None, every file might be.
+        """
+        self.name = name
+        self.target = target
+        self.sniff = sniff
+
+    def might_match(self, head):
+        """ Whether a file starting with head might be in this format """
+        if self.sniff is None:
+            return True
+        try:
+            return bool(self.sniff(head))
+        except Exception:  # pylint: disable=broad-except
+            # A broken sniff should not hide a converter which may work
+            return True
+
+    def load(self):
+        """ :return: The converter class, importing it if needed """
+        with _LOCK:
+            if isinstance(self.target, str):
+                module_name, class_name = self.target.split(':')
+                self.target = getattr(importlib.import_module(module_name), class_name)
+            return self.target
+
+    def __repr__(self):
+        return f"ConverterEntry({self.name!r}, {self.target!r})"
+
+
+# Built-in converters, in the order they were tried before there were statistics
+BUILTIN_ENTRIES = (
+    ('dominion_xlsx', 'rcvformats.conversions.dominion_xlsx:DominionXlsxConverter',
+     looks_like_zip),
+    ('electionbuddy', 'rcvformats.conversions.electionbuddy:ElectionBuddyConverter',
+     looks_like_utf8_text),
+    ('opavote', 'rcvformats.conversions.opavote:OpavoteConverter', looks_like_json),
+    ('dominion_txt', 'rcvformats.conversions.dominion_txt:DominionTxtConverter',
+     looks_like_utf16),
+)
+
+
+class ProbeStatistics:
+    """
+    How many times each converter has matched a file. If given a filename, the counts
+    are loaded from it, and added to it every flush_every matches, and when the
+    statistics are garbage collected or the process exits, so that every process sharing
+    the file learns from the others.
+    """
+
+    def __init__(self, filename=None, flush_every=FLUSH_EVERY):
+        self.filename = filename
+        self.flush_every = flush_every
+        self._unsaved = {}
+        self.hits = {} if filename is None else _load_hits(filename)
+        self._flush_at_exit()
+
+    def __getstate__(self):
+        """ Another process given a copy only saves the matches it counts itself """
+        state = self.__dict__.copy()
+        state['_unsaved'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._flush_at_exit()
+
+    def _flush_at_exit(self):
+        global _FLUSHING_AT_EXIT_IN  # pylint: disable=global-statement
+        if self.filename is None:
+            return
+        # Holds the unsaved counts rather than self, so that it can save them once self is gone
+        weakref.finalize(self, _save_hits, self.filename, self._unsaved)
+        with _LOCK:
+            _WITH_FILES.add(self)
+            if _FLUSHING_AT_EXIT_IN != os.getpid():
+                # Unlike atexit, also run when the worker processes of a pool exit
+                multiprocessing_util.Finalize(None, _flush_all, exitpriority=0)
+                _FLUSHING_AT_EXIT_IN = os.getpid()
+
+    def record_hit(self, name):
+        """ Counts a match, saving the counts every :attr:`flush_every` matches """
+        with _LOCK:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            self._unsaved[name] = self._unsaved.get(name, 0) + 1
+            if sum(self._unsaved.values()) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        """
+        Adds the counts not yet saved to those in the file, and takes in those other
+        processes have saved meanwhile
+        """
+        with _LOCK:
+            if self.filename is None or not self._unsaved:
+                return
+            on_disk = _save_hits(self.filename, self._unsaved)
+            if on_disk is not None:
+                self.hits = on_disk
+
+    def in_order(self, entries):
+        """ :return: The entries, most hits first, otherwise in their original order """
+        with _LOCK:
+            return sorted(entries, key=lambda entry: -self.hits.get(entry.name, 0))
+
+
+def _load_hits(filename):
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename, 'r', encoding='utf-8') as file_obj:
+            hits = json.load(file_obj)
+        return {str(name): int(count) for name, count in hits.items()}
+    except (OSError, ValueError, AttributeError):
+        # Statistics only speed detection up: never fail because of them
+        return {}
+
+
+def _save_hits(filename, unsaved):
+    """
+    Adds the unsaved counts to those in the file, while holding a lock on it, and
+    replaces it atomically. unsaved is emptied once they are saved.
+
+    :return: The counts now in the file, or None if it could not be written
+    """
+    with _LOCK:
+        if not unsaved:
+            return None
+        try:
+            with _locked(f"{filename}.lock"):
+                on_disk = _load_hits(filename)
+                for name, count in unsaved.items():
+                    on_disk[name] = on_disk.get(name, 0) + count
+                _replace_atomically(filename, on_disk)
+        except OSError:
+            return None
+        unsaved.clear()
+        return on_disk
+
+
+class Registry:
+    """ The converters to try, and in which order """
+
+    def __init__(self, entries=(), statistics=None, entry_point_group=ENTRY_POINT_GROUP):
+        """
+        :param entries: :class:`ConverterEntry` objects, or (name, target, sniff) tuples
+        :param statistics: The :class:`ProbeStatistics` to order by. Defaults to none saved.
+        :param entry_point_group: Also register every entry point in this group, when\
+                                  the converters are first needed. None to not.
+        """
+        self.statistics = statistics or ProbeStatistics()
+        self.entry_point_group = entry_point_group
+        self._entries = {}
+        self._loaded_entry_points = entry_point_group is None
+        for entry in entries:
+            self.register(entry)
+
+    def register(self, entry):
+        """
+        :param entry: A :class:`ConverterEntry`, or a (name, target, sniff) tuple
+        :raises ValueError: If a converter of the same name is already registered
+        """
+        if not isinstance(entry, ConverterEntry):
+            entry = ConverterEntry(*entry)
+        with _LOCK:
+            if entry.name in self._entries:
+                raise ValueError(f"A converter named {entry.name!r} is already registered")
+            self._entries[entry.name] = entry
+
+    @property
+    def entries(self):
+        """ Every registered :class:`ConverterEntry`, in the order registered """
+        with _LOCK:
+            if not self._loaded_entry_points:
+                self._loaded_entry_points = True
+                for entry_point in _entry_points(self.entry_point_group):
+                    self._register_entry_point(entry_point)
+        return list(self._entries.values())
+
+    def _register_entry_point(self, entry_point):
+        if entry_point.name in self._entries:
+            return
+        try:
+            entry = entry_point.load()
+        except Exception:  # pylint: disable=broad-except
+            # One broken plugin must not break every conversion
+            return
+        if not isinstance(entry, ConverterEntry):
+            entry = ConverterEntry(entry_point.name, entry)
+        self.register(entry)
+
+    def probe_order(self, head):
+        """
+        :param head: The first :data:`SNIFF_BYTES` of the file
+        :return: The entries which might match it, most likely first
+        """
+        return self.statistics.in_order(
+            [entry for entry in self.entries if entry.might_match(head)])
+
+    def record_hit(self, name):
+        """ Records that the named converter matched a file """
+        self.statistics.record_hit(name)
+
+
+def _flush_all():
+    for statistics in list(_WITH_FILES):
+        statistics.flush()
+
+
+def _forget_unsaved_in_child():
+    """ A forked process only saves the matches it counts itself, not its parent's """
+    for statistics in list(_WITH_FILES):
+        statistics._unsaved.clear()  # pylint: disable=protected-access
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_unsaved_in_child)
+
+
+@contextlib.contextmanager
+def _locked(lock_filename):
+    """ Holds an exclusive lock on the file, shared by every process, while in the context """
+    with open(lock_filename, 'a', encoding='utf-8') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _replace_atomically(filename, data):
+    """ Writes data to filename as JSON, so that readers never see half a file """
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory,
+                                     suffix='.tmp', delete=False) as file_obj:
+        try:
+            json.dump(data, file_obj)
+        except BaseException:
+            file_obj.close()
+            os.remove(file_obj.name)
+            raise
+    os.replace(file_obj.name, filename)
+
+
+def _entry_points(group):
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return entry_points.select(group=group)
+    return entry_points.get(group, [])  # pragma: no cover - python < 3.10
+
+
+@functools.lru_cache(maxsize=None)
+def default_registry():
+    """
+    :return: The registry shared by every
+             :class:`~rcvformats.conversions.automatic.AutomaticConverter` by default:
+             the built-in converters and those of installed packages.
+    """
+    return Registry(BUILTIN_ENTRIES,
+                    ProbeStatistics(os.environ.get(STATISTICS_ENVIRONMENT_VARIABLE)))
@@ -0,0 +1,413 @@
+"""
+Computes the tallyResults of every round at once, from a rounds x candidates matrix of tallies.
+
+Used by :class:`~rcvformats.conversions.base.GenericGuessAtTransferConverter` when numpy
+is installed (pip install rcvformats[numpy]). It gives the same results as guessing at
+each round's transfers one at a time, but computes every round's vote deltas and transfer
+weights in a handful of array operations, and only builds the tallyResults dicts at the end.
+
+With the exact fixed-point backend, tallies are held as int64 counts of 10^-precision votes,
+so deltas and weights stay exact, as long as they are small enough to also convert back to
+votes exactly: see :data:`MAX_EXACT_VOTES`.
+"""
+
+import array
+import itertools
+
+from rcvformats.common import model
+from rcvformats.conversions import arithmetic
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# The most 10^-precision votes all candidates may have between them on the exact path. Any
+# more, and adding up a round, or dividing by 10^precision as a float, may not be exact.
+MAX_EXACT_VOTES = 2 ** 52
+
+
+def is_available():
+    """ Whether numpy is installed, and so whether :class:`RoundMatrix` can be used """
+    return np is not None
+
+
+class RoundMatrix:
+    """
+    The tallies of every round, as a rounds x candidates matrix.
+    Each candidate is given an integer index, in the order they first appear.
+    """
+
+    def __init__(self, ut_rounds, backend=None):
+        """
+        :param ut_rounds: Universal Tabulator 'results' structure. Only 'tally' is read,
+                          and the tallies must be numbers, not strings.
+        :param backend: The numeric backend. If exact, the tallies must already be parsed
+                        with it. Uses floats if None.
+        :raises OverflowError: If the backend is exact and the tallies exceed\
+                               :data:`MAX_EXACT_VOTES`
+        """
+        self.backend = backend
+        self.names = []
+        self.index_of = {}
+        for round_data in ut_rounds:
+            for name in round_data['tally']:
+                if name not in self.index_of:
+                    self.index_of[name] = len(self.names)
+                    self.names.append(name)
+
+        shape = (len(ut_rounds), len(self.names))
+        dtype = np.int64 if self.is_exact else float
+        self.tallies = np.zeros(shape, dtype=dtype)
+        self.present = np.zeros(shape, dtype=bool)
+
+        # The column of each candidate in each round's tally, in the tally's own order,
+        # so that transfers are listed in the same order as the tally
+        self.columns_per_round = []
+        for round_i, round_data in enumerate(ut_rounds):
+            tally = round_data['tally']
+            columns = np.fromiter(map(self.index_of.__getitem__, tally), dtype=np.intp,
+                                  count=len(tally))
+            self.tallies[round_i, columns] = np.fromiter(tally.values(), dtype=dtype,
+                                                         count=len(tally))
+            self.present[round_i, columns] = True
+            self.columns_per_round.append(columns)
+        if self.is_exact:
+            _check_exact_range(self.tallies)
+
+    @classmethod
+    def from_tallies(cls, names, tallies, numeric=arithmetic.FLOAT, precision=None):
+        """
+        Builds the matrix directly, rather than from tally dicts, for formats which already
+        list every candidate's votes in every round, in the same order.
+
+        :param names: The name of each candidate, one per column
+        :param tallies: A rounds x candidates matrix of votes
+        :param numeric: The numeric backend, as for :func:`arithmetic.create`
+        :param precision: As for :func:`arithmetic.create`
+        :raises ValueError: If tallies does not have one column per name, or if the backend\
+                            cannot parse them
+        :raises OverflowError: As for :class:`RoundMatrix`
+        """
+        if numeric == arithmetic.FIXED:
+            matrix = _exact_matrix(tallies, precision)
+        else:
+            matrix = cls([])
+            matrix.tallies = np.array(tallies, dtype=float)
+        matrix.names = list(names)
+        matrix.index_of = {name: i for i, name in enumerate(matrix.names)}
+        if matrix.tallies.ndim != 2 or matrix.tallies.shape[1] != len(matrix.names):
+            raise ValueError("Each round must have one tally per candidate")
+        matrix.present = np.ones(matrix.tallies.shape, dtype=bool)
+        matrix.columns_per_round = [np.arange(len(matrix.names))] * matrix.num_rounds
+        return matrix
+
+    @property
+    def is_exact(self):
+        """ Whether the tallies are integers of the exact backend, rather than floats """
+        return self.backend is not None and self.backend.is_exact
+
+    def tallies_as_json(self):
+        """ :return: For each round, the tally of each column, as the backend writes them """
+        return self._to_json(self.tallies)
+
+    def _to_json(self, votes):
+        """ Like the exact backend's to_json, for an array of votes """
+        if not self.is_exact or self.backend.precision == 0:
+            return votes.tolist()
+        # Below MAX_EXACT_VOTES, this rounds exactly as python's int / int does
+        return (votes / self.backend.scale).tolist()
+
+    @property
+    def num_rounds(self):
+        """ Number of rounds """
+        return self.tallies.shape[0]
+
+    def vote_deltas(self):
+        """
+        See :func:`~rcvformats.conversions.base.GenericGuessAtTransferConverter.\
+_compute_vote_deltas_from_tally`, for every round at once.
+
+        :return: A rounds x candidates matrix of how each candidate's votes changed between
+                 that round and the next. Candidates missing from the next round are counted
+                 as having zero votes. The last round, and candidates missing from a round,
+                 have no change.
+        """
+        # Computed in place, as each temporary matrix would be as large as the tallies
+        deltas = np.zeros_like(self.tallies)
+        if self.num_rounds > 1:
+            np.subtract(self.tallies[1:], self.tallies[:-1], out=deltas[:-1])
+            np.subtract(0, self.tallies[:-1], out=deltas[:-1], where=~self.present[1:])
+            deltas[~self.present] = 0
+        return deltas
+
+    def mask_of_columns(self, columns_per_round):
+        """
+        :param columns_per_round: For each round, a list of candidate columns
+        :return: A rounds x candidates mask, True for each listed candidate in each round
+        """
+        rows, columns = _flatten(columns_per_round)
+        mask = np.zeros(self.tallies.shape, dtype=bool)
+        mask[rows, columns] = True
+        return mask
+
+    @classmethod
+    def newly_listed(cls, columns_per_round):
+        """
+        For formats which list every candidate eliminated or elected so far on each round
+
+        :param columns_per_round: For each round, a list of candidate columns
+        :return: For each round, the columns listed in no earlier round, in the order listed
+        """
+        rows, columns = _flatten(columns_per_round)
+        _, first_listed = np.unique(columns, return_index=True)
+        first_listed.sort()
+        rounds_split_at = np.searchsorted(rows[first_listed], np.arange(1, len(columns_per_round)))
+        return [part.tolist() for part in np.split(columns[first_listed], rounds_split_at)]
+
+    def _transferring_mask(self, eliminated_per_round, elected_per_round, has_subtraction):
+        """
+        A rounds x candidates mask of who is eliminated or elected in each round.
+        Like the round-by-round path, a candidate in no tally at all is only an error
+        on a round where votes were transferred: otherwise there is nothing to transfer.
+        """
+        rows = []
+        columns = []
+        for round_i, names in enumerate(zip(eliminated_per_round, elected_per_round)):
+            for name in names[0] + names[1]:
+                if name not in self.index_of:
+                    if has_subtraction[round_i]:
+                        raise KeyError(name)
+                    continue
+                rows.append(round_i)
+                columns.append(self.index_of[name])
+        transferring = np.zeros(self.tallies.shape, dtype=bool)
+        transferring[rows, columns] = True
+        return transferring
+
+    def tally_results(self, eliminated_per_round, elected_per_round, allow_guessing=True):
+        """
+        See :func:`~rcvformats.conversions.base.GenericGuessAtTransferConverter.\
+guess_at_tally_results`, for every round at once.
+
+        :param eliminated_per_round: for each round, the names of each eliminated candidate
+        :param elected_per_round: for each round, the names of each elected candidate
+        :param allow_guessing: Allow guessing of transfer data during batch elimination
+        :return: a list with the contents of each round's tallyResults
+        """
+        all_tally_results = []
+        for transfer_methods, to_columns, transfers_from in self._transfers_per_round(
+                eliminated_per_round, elected_per_round):
+            to_names = [self.names[column] for column in to_columns]
+            tally_results = []
+            for method, from_name, votes in _iter_transfers(
+                    transfer_methods, transfers_from, allow_guessing):
+                tally_result = {method: from_name}
+                if votes is not None:
+                    tally_result['transfers'] = dict(zip(to_names, votes))
+                tally_results.append(tally_result)
+            all_tally_results.append(tally_results)
+        return all_tally_results
+
+    def model_tally_results(self, eliminated_per_round, elected_per_round, election,
+                            allow_guessing=True):
+        """
+        Like :func:`~tally_results`, but as :class:`~rcvformats.common.model.TallyResult`
+        objects, so that no dicts are built.
+
+        :param election: The :class:`~rcvformats.common.model.Election` they are for, in\
+                         which each candidate's id must be their column
+        :return: a list of each round's tally results
+        """
+        all_tally_results = []
+        for transfer_methods, to_columns, transfers_from in self._transfers_per_round(
+                eliminated_per_round, elected_per_round):
+            # Shared by every tally result of the round, as none are changed once built
+            transfer_ids = array.array('I', to_columns)
+            tally_results = []
+            for method, from_name, votes in _iter_transfers(
+                    transfer_methods, transfers_from, allow_guessing):
+                tally_results.append(model.TallyResult(
+                    method == 'elected', election.candidate_id(from_name),
+                    None if votes is None else transfer_ids,
+                    None if votes is None else model.compact_votes(votes)))
+            all_tally_results.append(tally_results)
+        return all_tally_results
+
+    def _transfers_per_round(self, eliminated_per_round, elected_per_round):
+        """
+        Computes every round's transfers at once, then yields them one round at a time
+
+        :return: For each round, a tuple of the names transferring by each method, the\
+                 columns receiving votes, and a dict of each transferring name to the votes\
+                 it gave each of those columns
+        """
+        deltas = self.vote_deltas()
+        votes_subtracted = -self._row_sums(np.minimum(deltas, 0))
+        has_subtraction = votes_subtracted != 0
+        transferring = self._transferring_mask(
+            eliminated_per_round, elected_per_round, has_subtraction)
+
+        # As with the exact backend's weight, exact weights are out of votes_subtracted
+        # rather than 1
+        weights = np.negative(deltas)
+        if not self.is_exact:
+            np.divide(weights, votes_subtracted[:, None], out=weights,
+                      where=has_subtraction[:, None])
+        weights[~has_subtraction] = 1
+        self._check_weights(weights, transferring, has_subtraction, votes_subtracted,
+                            deltas, eliminated_per_round, elected_per_round)
+
+        # Can't gain more votes than you lost
+        assert np.all(votes_subtracted >= self._row_sums(np.maximum(deltas, 0)))
+
+        receiving = self.present & ~transferring & (deltas != 0)
+
+        for round_i in range(self.num_rounds):
+            columns = self.columns_per_round[round_i]
+            to_columns = columns[receiving[round_i, columns]]
+            transfer_methods = {
+                'eliminated': eliminated_per_round[round_i],
+                'elected': elected_per_round[round_i]
+            }
+            if self.is_exact:
+                transfers_from = self._split_transfers_exactly(
+                    transfer_methods, deltas[round_i, to_columns], weights[round_i])
+            else:
+                transfers_from = self._weigh_transfers(
+                    transfer_methods, deltas[round_i, to_columns], weights[round_i])
+            yield transfer_methods, to_columns.tolist(), transfers_from
+
+    def _row_sums(self, matrix):
+        """
+        Sum of each row, added from the first column to the last. This matches python's
+        sum() over a tally dict exactly only when the tally lists its candidates in column
+        order, as when every round lists them in the same order. Otherwise, the sums may
+        differ in the last bits of precision.
+
+        :param matrix: A temporary matrix, which is overwritten with the running sums
+        """
+        if not self.names:
+            return np.zeros(self.num_rounds, dtype=matrix.dtype)
+        return np.cumsum(matrix, axis=1, out=matrix)[:, -1].copy()
+
+    def _weigh_transfers(self, transfer_methods, to_deltas, weights):
+        """
+        :return: a dict mapping each transferring candidate's name to the votes it gave\
+                 each receiving candidate
+        """
+        transfers_from = {}
+        for from_name in itertools.chain.from_iterable(transfer_methods.values()):
+            # A candidate in no tally transfers nothing, so any weight will do
+            weight = weights[self.index_of[from_name]] if from_name in self.index_of else 1.0
+            transfers_from[from_name] = (to_deltas * weight).tolist()
+        return transfers_from
+
+    def _split_transfers_exactly(self, transfer_methods, to_deltas, weights):
+        """
+        See :func:`~rcvformats.conversions.base.GenericGuessAtTransferConverter.\
+_split_transfers_exactly`, for a single round of the matrix
+
+        :return: As for :func:`~_weigh_transfers`
+        """
+        from_names = list(dict.fromkeys(itertools.chain.from_iterable(transfer_methods.values())))
+        if len(from_names) == 1:
+            # The fast path: a single candidate transfers exactly what everyone else gained
+            return {from_names[0]: self._to_json(to_deltas)}
+
+        weight_list = [int(weights[self.index_of[name]]) if name in self.index_of else 1
+                       for name in from_names]
+        votes_subtracted = sum(weight_list)
+        transfers_from = {from_name: [] for from_name in from_names}
+        for votes in to_deltas.tolist():
+            parts = self.backend.split(votes, weight_list, votes_subtracted)
+            for from_name, part in zip(from_names, parts):
+                transfers_from[from_name].append(part)
+        return transfers_from
+
+    # pylint: disable=too-many-arguments
+    def _check_weights(self, weights, transferring, has_subtraction, votes_subtracted,
+                       deltas, eliminated_per_round, elected_per_round):
+        """ Weights must add up to 1 on every round where votes were transferred """
+        missing = transferring & ~self.present & has_subtraction[:, None]
+        if missing.any():
+            _, column = np.argwhere(missing)[0]
+            raise KeyError(self.names[column])
+
+        weight_sums = np.where(transferring, weights, 0).sum(axis=1)
+        if self.is_exact:
+            invalid = has_subtraction & (weight_sums != votes_subtracted)
+        else:
+            invalid = has_subtraction & (np.abs(weight_sums - 1.0) > 1e-8)
+        if not invalid.any():
+            return
+
+        round_i = int(np.argmax(invalid))
+        votes_gained = deltas[round_i].sum()
+        message = "Weights do not line up. This data is invalid. "\
+                  f"In the round where {eliminated_per_round[round_i]} were eliminated and "\
+                  f"{elected_per_round[round_i]} were elected, there were "\
+                  f"{votes_subtracted[round_i]} votes lost from the outgoing candidates, but "\
+                  f"{votes_gained} votes gained from continuing candidates. The number of votes "\
+                  "must stay the same or decrease between rounds."
+        raise ValueError(message)
+
+
+def _exact_matrix(tallies, precision):
+    """
+    :return: A :class:`RoundMatrix` of the tallies as int64 counts of 10^-precision votes,
+             as the fixed-point backend parses them
+    :raises OverflowError: If they exceed :data:`MAX_EXACT_VOTES`
+    """
+    # In the common case of whole votes, numpy finds they are all ints as it reads them, so
+    # the backend need not look at each one to find its precision, nor parse them
+    whole_votes = np.array(tallies)
+    if whole_votes.dtype.kind == 'i':
+        backend = arithmetic.FixedPointArithmetic(0, already_integers=True) \
+            if precision is None else arithmetic.FixedPointArithmetic(precision)
+        _check_exact_range(whole_votes, backend.scale)
+        matrix = RoundMatrix([], backend)
+        matrix.tallies = whole_votes * backend.scale
+        return matrix
+
+    backend = arithmetic.create_for_counts(arithmetic.FIXED, precision, tallies)
+    matrix = RoundMatrix([], backend)
+    matrix.tallies = np.array([list(map(backend.parse, counts)) for counts in tallies],
+                              dtype=np.int64)
+    _check_exact_range(matrix.tallies)
+    return matrix
+
+
+def _iter_transfers(transfer_methods, transfers_from, allow_guessing):
+    """
+    :return: For each transferring candidate of a round, a tuple of its method, its name and\
+             the votes it transferred, or None if no transfers are listed
+    """
+    for method, names in transfer_methods.items():
+        is_batch_elimination_round = len(names) > 1
+        for from_name in names:
+            votes = []
+            if not is_batch_elimination_round or allow_guessing:
+                votes = transfers_from[from_name]
+            if votes or method == 'eliminated':
+                # only add transfers on winners if they have actually been transferred
+                yield method, from_name, votes
+            else:
+                yield method, from_name, None
+
+
+def _check_exact_range(tallies, scale=1):
+    """ :raises OverflowError: If the scaled tallies of a round may exceed MAX_EXACT_VOTES """
+    if tallies.ndim == 2 and tallies.size:
+        most_votes = int(np.abs(tallies).max()) * scale
+        if most_votes > MAX_EXACT_VOTES // tallies.shape[1]:
+            raise OverflowError("The tallies are too large to hold exactly as int64")
+
+
+def _flatten(columns_per_round):
+    """ :return: The round and column of each listed column, as two arrays """
+    lengths = [len(columns) for columns in columns_per_round]
+    rows = np.repeat(np.arange(len(columns_per_round)), lengths)
+    columns = np.fromiter(itertools.chain.from_iterable(columns_per_round), dtype=np.intp,
+                          count=len(rows))
+    return rows, columns
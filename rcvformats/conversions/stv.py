@@ -0,0 +1,366 @@
+"""
+Tabulates multi-winner single transferable vote contests from ballot-level records, with
+fractional surplus transfers, as OpaVote's "Fractional Transfer STV" does.
+
+Each round, every candidate reaching the Droop threshold is elected. Then, the largest
+untransferred surplus is transferred: every ballot counting for that winner moves on to
+its next continuing choice, carrying the fraction of its value that is surplus. If there
+is no surplus, the candidate with the fewest votes is eliminated instead, and their
+ballots move on at their current value.
+
+With a precision, values are integers in units of 10^-precision, and each ballot's
+transferred value is rounded down, exactly as OpaVote's "prec" option does: what is lost
+to rounding is reported as the "residual surplus". Without one, floats are used.
+The counting itself is vectorised over the ballots, as in :mod:`~.cvr`.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from rcvformats.common import ballots as ballots_module
+from rcvformats.conversions.base import Converter
+from rcvformats.conversions.cvr import BallotCount, DEFAULT_CONTEST, EXHAUSTED
+
+# What transfers lost to rounding down are listed under
+RESIDUAL_SURPLUS = 'residual surplus'
+
+# Batch elimination options
+ZERO = 'zero'
+LOSERS = 'losers'
+
+# OpaVote's names for each batch elimination option
+_OPAVOTE_BATCH_ELIMINATION = {'None': None, 'Zero': ZERO, 'Losers': LOSERS}
+
+
+class StvConverter(Converter):
+    """
+    Tabulates a single transferable vote contest from a CSV file of ranked ballots,
+    as read by :func:`~rcvformats.common.ballots.RankedBallots.from_csv`
+    """
+
+    def __init__(self, seats, config=None, precision=None,  # pylint: disable=too-many-arguments
+                 dynamic_threshold=True, batch_elimination=None):
+        """
+        :param seats: The number of candidates to elect
+        :param config: The Universal Tabulator 'config' of the contest, without 'threshold'.\
+                       See :class:`~rcvformats.conversions.cvr.CvrCsvConverter`.
+        :param precision: Count with integers, in units of 10^-precision, rounding down each\
+                          ballot's transferred value. If None, count with floats.
+        :param dynamic_threshold: Recompute the threshold every round, leaving out exhausted\
+                                  ballots. Otherwise it is fixed by the first round.
+        :param batch_elimination: None to eliminate one candidate at a time, ZERO to\
+                                  eliminate every candidate with no votes at once, or\
+                                  LOSERS to eliminate every candidate who cannot catch up.
+        """
+        if np is None:
+            raise ImportError("Tabulating ballots requires numpy: pip install rcvformats[numpy]")
+        if batch_elimination not in (None, ZERO, LOSERS):
+            raise ValueError(f"Unknown batch elimination: {batch_elimination}")
+        self.seats = seats
+        self.config = {'contest': DEFAULT_CONTEST, **(config or {})}
+        self.precision = precision
+        self.dynamic_threshold = dynamic_threshold
+        self.batch_elimination = batch_elimination
+        super().__init__()
+
+    @classmethod
+    def like_opavote(cls, opavote_data, config=None):
+        """
+        :param opavote_data: An OpaVote results file, as parsed JSON
+        :param config: As for :class:`StvConverter`. Defaults to the file's title.
+        :return: A converter counting as OpaVote did for that file, for use with\
+                 :func:`~opavote_differences`
+        :raises ValueError: If OpaVote counted in a way this converter cannot
+        """
+        options = dict(opavote_data.get('options', []))
+        if opavote_data.get('method') != 'Fractional Transfer STV' or \
+                options.get('thresholdFormula', 'Droop') != 'Droop' or \
+                options.get('fractionalThreshold', 'Fractional') != 'Fractional':
+            raise ValueError("Only Fractional Transfer STV with a fractional Droop threshold "
+                             "is supported")
+        return cls(
+            opavote_data['n_seats'],
+            config or {'contest': opavote_data['title']},
+            precision=int(options.get('prec', opavote_data.get('precision', 6))),
+            dynamic_threshold=options.get('dynamicThreshold', 'Dynamic') == 'Dynamic',
+            batch_elimination=_OPAVOTE_BATCH_ELIMINATION[options.get('batchElimination',
+                                                                     'None')])
+
+    def _convert_file_object_to_ut(self, file_object):
+        return self.tabulate(ballots_module.RankedBallots.from_csv(file_object))
+
+    def tabulate(self, ballots):
+        """
+        :param ballots: The :class:`~rcvformats.common.ballots.RankedBallots` to count
+        :return: The Universal Tabulator data
+        """
+        ballots.ensure_countable()
+        count = FractionalBallotCount(ballots.compressed(), self.precision)
+        rounds = self.count_rounds(count)
+        results = []
+        for round_i, round_data in enumerate(rounds):
+            tally_results = [{'eliminated': count.names[candidate_id],
+                              'transfers': count.transfers_dict(transfers)}
+                             for candidate_id, transfers in round_data['eliminated'].items()]
+            for candidate_id in round_data['elected']:
+                tally_result = {'elected': count.names[candidate_id]}
+                if candidate_id in round_data['surplus']:
+                    tally_result['transfers'] = count.transfers_dict(
+                        round_data['surplus'][candidate_id])
+                tally_results.append(tally_result)
+            results.append({'round': round_i + 1,
+                            'tally': count.tally_dict(round_data['tally'], round_data['standing']),
+                            'tallyResults': tally_results})
+
+        config = {**self.config, 'threshold': count.votes(rounds[-1]['threshold'])}
+        return {'config': config, 'results': results}
+
+    def count_rounds(self, count):
+        """
+        Runs the count to completion.
+
+        :param count: A :class:`FractionalBallotCount`
+        :return: A list of each round, as a dict with its 'tally' of every candidate,\
+                 the ids of candidates 'standing' that round, its 'threshold' and\
+                 'exhausted' votes, the ids of all 'winners' so far, and dicts of\
+                 'eliminated' and 'surplus' candidate ids to their transfers afterwards.\
+                 'elected' lists the winners to report as elected that round: those whose\
+                 surplus is transferred on a later round are reported on that round\
+                 instead. Votes are in count's units.
+        """
+        winners = []
+        pending_surplus = []
+        standing = count.continuing_ids()
+        rounds = []
+        while True:
+            tally = count.tally()
+            threshold = self._threshold(count, tally, rounds)
+            round_data = {'tally': tally, 'standing': standing, 'threshold': threshold,
+                          'exhausted': count.exhausted(tally), 'elected': [],
+                          'eliminated': {}, 'surplus': {}}
+            rounds.append(round_data)
+
+            hopeful = count.continuing_ids()
+            newly_elected = [candidate_id for candidate_id in
+                             count.by_fewest_votes(hopeful)[::-1]
+                             if count.reached(tally[candidate_id], threshold)]
+            hopeful = np.setdiff1d(hopeful, newly_elected)
+            if len(winners) + len(newly_elected) + len(hopeful) <= self.seats:
+                newly_elected += count.by_fewest_votes(hopeful)[::-1].tolist()
+                hopeful = hopeful[:0]
+            count.elect(newly_elected)
+            winners += newly_elected
+            pending_surplus += newly_elected
+            round_data['winners'] = list(winners)
+            if len(winners) >= self.seats or hopeful.size == 0:
+                round_data['elected'] = _unlisted(winners, rounds)
+                return rounds
+
+            pending_surplus = [candidate_id for candidate_id in pending_surplus
+                               if tally[candidate_id] > threshold]
+            if pending_surplus:
+                largest = max(pending_surplus, key=lambda candidate_id: tally[candidate_id])
+                pending_surplus.remove(largest)
+                round_data['surplus'][largest] = count.transfer_surplus(
+                    largest, tally[largest], threshold)
+                round_data['elected'] = _unlisted(
+                    [candidate_id for candidate_id in winners if candidate_id not in
+                     pending_surplus], rounds)
+            else:
+                round_data['elected'] = _unlisted(winners, rounds)
+                eliminated = self._to_eliminate(count, tally, hopeful, len(winners))
+                round_data['eliminated'] = count.eliminate(eliminated)
+            standing = np.union1d(count.continuing_ids(), np.array(winners, dtype=int))
+
+    def _threshold(self, count, tally, rounds):
+        """ The Droop threshold: a bit more than the votes divided by one more than the seats """
+        if rounds and not self.dynamic_threshold:
+            return rounds[0]['threshold']
+        return count.droop_threshold(tally, self.seats)
+
+    def _to_eliminate(self, count, tally, hopeful, num_winners):
+        """ :return: The ids of the hopeful candidates to eliminate this round """
+        # Always leave enough candidates to fill the remaining seats
+        most = len(hopeful) - (self.seats - num_winners)
+        by_fewest_votes = count.by_fewest_votes(hopeful)
+        if self.batch_elimination == ZERO:
+            with_no_votes = by_fewest_votes[tally[by_fewest_votes] == 0]
+            if len(with_no_votes) > 1:
+                return np.sort(with_no_votes[:most])
+        elif self.batch_elimination == LOSERS:
+            losers = count.batch_of_losers(tally, hopeful)
+            return losers if len(losers) <= most else np.sort(by_fewest_votes[:most])
+        return by_fewest_votes[:1]
+
+    def opavote_differences(self, ballots, opavote_data):
+        """
+        OpaVote equivalence mode: counts the ballots, then compares every round with an
+        OpaVote results file of the same contest, e.g. one counted by a converter from
+        :func:`~like_opavote`.
+
+        :param ballots: The :class:`~rcvformats.common.ballots.RankedBallots` to count
+        :param opavote_data: The OpaVote results file, as parsed JSON
+        :return: A list describing each difference. Empty if the counts are identical.
+        """
+        ballots.ensure_countable()
+        count = FractionalBallotCount(ballots.compressed(), self.precision)
+        rounds = self.count_rounds(count)
+        id_of = {name: count.names.index(name) if name in count.names else None
+                 for name in opavote_data['candidates']}
+        if len(rounds) != len(opavote_data['rounds']):
+            return [f"Counted {len(rounds)} rounds, but OpaVote counted "
+                    f"{len(opavote_data['rounds'])}"]
+
+        differences = []
+        losers = set()
+        for round_data, opavote_round in zip(rounds, opavote_data['rounds']):
+            counted = {name: 0 if candidate_id is None else round_data['tally'][candidate_id]
+                       for name, candidate_id in id_of.items()}
+            differences += _round_differences(
+                round_data, opavote_round, opavote_data['candidates'], counted,
+                {'winners': {count.names[candidate_id] for candidate_id in round_data['winners']},
+                 'losers': set(losers)})
+            # OpaVote lists who was eliminated on the round after
+            losers.update(count.names[candidate_id] for candidate_id in round_data['eliminated'])
+        return differences
+
+
+class FractionalBallotCount(BallotCount):
+    """
+    A :class:`~rcvformats.conversions.cvr.BallotCount` where each ballot carries a value,
+    reduced each time it is part of a surplus. Winners whose surplus has been transferred
+    keep exactly the threshold.
+    """
+
+    def __init__(self, ballots, precision=None):
+        """
+        :param ballots: The :class:`~rcvformats.common.ballots.RankedBallots` to count
+        :param precision: See :class:`StvConverter`
+        """
+        self.precision = precision
+        if precision is None:
+            self.unit = 1.0
+            self.counts = ballots.weights
+            self.values = np.ones(len(ballots.weights))
+        elif ballots.weights.dtype.kind in 'iu':
+            self.unit = 10 ** precision
+            self.counts = ballots.weights
+            self.values = np.full(len(ballots.weights), self.unit, dtype=np.int64)
+        else:
+            # Each fractionally weighted row counts as a single ballot of that value
+            self.unit = 10 ** precision
+            self.counts = np.ones(len(ballots.weights), dtype=np.int64)
+            self.values = np.round(ballots.weights * self.unit).astype(np.int64)
+
+        super().__init__(ballots_module.RankedBallots(
+            ballots.candidates, ballots.ranks, self.values * self.counts))
+        self.is_integer = precision is not None
+        self.kept = np.zeros(len(self.names) + 1, dtype=self.weights.dtype)
+        self.total = self.weights.sum()
+
+    def tally(self):
+        tally = np.bincount(self.current, weights=self.weights, minlength=len(self.names) + 1)
+        if self.is_integer:
+            tally = tally.round().astype(np.int64)
+        tally += self.kept
+        self.history.append(tally)
+        return tally
+
+    def exhausted(self, tally):
+        """ Votes no longer counting for any candidate, including those lost to rounding """
+        return self.total - tally[:-1].sum()
+
+    def droop_threshold(self, tally, seats):
+        """ The Droop threshold, of the votes still counting for a candidate """
+        votes = tally[:-1].sum()
+        if self.is_integer:
+            return votes // (seats + 1) + 1
+        return votes / (seats + 1)
+
+    def reached(self, votes, threshold):
+        """ Whether votes are enough to be elected """
+        if self.is_integer:
+            return votes >= threshold
+        return votes > threshold
+
+    def elect(self, candidate_ids):
+        """ Removes winners from the continuing candidates. Their ballots stay with them. """
+        self.is_continuing[candidate_ids] = False
+
+    def transfer_surplus(self, candidate_id, votes, threshold):
+        """
+        Moves every ballot counting for the winner on to its next continuing choice,
+        keeping only the surplus part of its value.
+
+        :return: The votes transferred to every candidate, then exhausted, then to the\
+                 residual surplus lost to rounding
+        """
+        moving = np.flatnonzero(self.current == candidate_id)
+        surplus = votes - threshold
+        if self.is_integer:
+            self.values[moving] = _scale_down(self.values[moving], surplus, votes)
+        else:
+            self.values[moving] *= surplus / votes
+        self.weights[moving] = self.values[moving] * self.counts[moving]
+        self.kept[candidate_id] = threshold
+        self._advance(moving)
+
+        transfers = self._transfers(
+            moving, np.full(len(moving), candidate_id), [candidate_id])[candidate_id]
+        if not self.is_integer:
+            # Floats lose nothing to rounding worth reporting
+            return np.append(transfers, 0)
+        transfers = transfers.round().astype(np.int64)
+        return np.append(transfers, surplus - transfers.sum())
+
+    def transfers_dict(self, transfers):
+        names = self.names + [EXHAUSTED, RESIDUAL_SURPLUS]
+        return {names[candidate_id]: self.votes(transfers[candidate_id])
+                for candidate_id in np.flatnonzero(transfers)}
+
+    def votes(self, votes):
+        """ Units as a number of votes, to the count's precision """
+        if not self.is_integer:
+            return float(votes)
+        if self.precision == 0:
+            return int(votes)
+        return round(int(votes) / self.unit, self.precision)
+
+
+def _round_differences(round_data, opavote_round, candidates, counted, names):
+    """
+    :param counted: The votes counted for each candidate name
+    :param names: The names of the 'winners' and 'losers' so far
+    :return: Descriptions of how a round differs from OpaVote's
+    """
+    prefix = f"Round {opavote_round['n']}: "
+    expected = dict(zip(candidates, opavote_round['count']))
+    differences = [f"{prefix}{name} has {int(votes)}, but {expected[name]} in OpaVote"
+                   for name, votes in counted.items() if int(votes) != expected[name]]
+    for key, value in (('thresh', round_data['threshold']),
+                       ('exhausted', round_data['exhausted'])):
+        if int(value) != opavote_round[key]:
+            differences.append(
+                f"{prefix}{key} is {int(value)}, but {opavote_round[key]} in OpaVote")
+    for key, these_names in names.items():
+        opavote_names = {candidates[i] for i in opavote_round[key]}
+        if opavote_names != these_names:
+            differences.append(f"{prefix}{key} are {sorted(these_names)}, "
+                               f"but {sorted(opavote_names)} in OpaVote")
+    return differences
+
+
+def _scale_down(values, numerator, denominator):
+    """ values * numerator // denominator, without overflowing 64 bits """
+    if len(values) and int(values.max()) * int(numerator) >= 2 ** 63:
+        scaled = values.astype(object) * int(numerator) // int(denominator)
+        return scaled.astype(np.int64)
+    return values * numerator // denominator
+
+
+def _unlisted(winners, rounds):
+    """ The winners not yet listed as elected on any earlier round """
+    listed = {candidate_id for round_data in rounds[:-1] for candidate_id in round_data['elected']}
+    return [candidate_id for candidate_id in winners if candidate_id not in listed]
@@ -2,8 +2,10 @@
 Add transfers to an otherwise-valid Universal Tabulator format
 """
 
-import json
+import operator
 
+from rcvformats.common import jsonstream
+from rcvformats.conversions import arithmetic
 from rcvformats.conversions.base import GenericGuessAtTransferConverter
 
 
@@ -12,28 +14,119 @@ class UTWithoutTransfersConverter(GenericGuessAtTransferConverter):
     Reads an UT-formatted JSON file that is missing "transfers"
     """
 
-    def __init__(self, allow_guessing=True):
+    def __init__(self, allow_guessing=True, numeric=arithmetic.FLOAT, precision=None):
         """
         @param allow_guessing During batch elimination, should we guess at
                               where the votes went (distributing them proportionally)
                               or leave this blank?
+        @param numeric 'float' or 'fixed'. See GenericGuessAtTransferConverter.
+        @param precision Number of decimal places used by 'fixed'
         """
         self.allow_guessing = allow_guessing
-        super().__init__()
+        super().__init__(numeric, precision)
 
     def _convert_json_to_ut(self, json_data):
         return self.fill_in_tally_data(json_data)
 
     def _convert_file_object_to_ut(self, file_object):
-        data = json.load(file_object)
+        data = jsonstream.load(file_object)
         return self._convert_json_to_ut(data)
 
     def fill_in_tally_data(self, data):
         """ Given data in the UT format, fill in the tallyResults """
-        self._convert_tally_string_to_decimal(data['results'])
-        self._fill_in_tallyresults(data['results'])
+        self._fill_in_rounds(data['results'])
         return data
 
+    def filled_in_tally_data(self, data):
+        """
+        Like :func:`~fill_in_tally_data`, but data is left unchanged. The returned data shares
+        whatever did not change with data: the config, the other keys of each round, and any
+        tally which was already in its final form. Cached input can then be reused without
+        a deep copy, as long as neither it nor the returned data is modified in-place.
+
+        :param data: Data in the UT format
+        :return: New UT data, with the tallyResults filled in
+        """
+        return self._filled_in_copy(data, data['results'], 0)
+
+    def fill_in_new_rounds(self, data, new_rounds):
+        """
+        Like :func:`~fill_in_tally_data`, but for live counts, where rounds are added or
+        updated after the data was filled in. Only the new rounds and the round before them
+        are recomputed, since a round's transfers depend only on itself and the next round.
+
+        :param data: UT data previously returned by :func:`~fill_in_tally_data`,\
+                     or by this function. It is updated in-place.
+        :param new_rounds: Rounds in the UT format, missing "transfers". Each replaces\
+                           the round in data with the same "round" number, if any, along\
+                           with every round after it.
+        :return: data, with the new rounds filled in
+        """
+        if not new_rounds:
+            return data
+        new_rounds, first_new_i = self._sort_new_rounds(data['results'], new_rounds)
+
+        results = data['results']
+        del results[first_new_i:]
+        results.extend(new_rounds)
+
+        self._fill_in_rounds(results[max(first_new_i - 1, 0):])
+        return data
+
+    def with_new_rounds(self, data, new_rounds):
+        """
+        Like :func:`~fill_in_new_rounds`, but neither data nor new_rounds are changed.
+        As with :func:`~filled_in_tally_data`, the returned data shares the config, and every
+        round before the recomputed ones, with data.
+
+        :return: New UT data, with the new rounds filled in
+        """
+        if not new_rounds:
+            return data
+        new_rounds, first_new_i = self._sort_new_rounds(data['results'], new_rounds)
+        results = data['results'][:first_new_i] + new_rounds
+        return self._filled_in_copy(data, results, max(first_new_i - 1, 0))
+
+    @classmethod
+    def _sort_new_rounds(cls, results, new_rounds):
+        """
+        :return: A tuple of (new_rounds in order, the index in results of the first new round)
+        """
+        new_rounds = sorted(new_rounds, key=lambda round_data: round_data['round'])
+        first_new_i = new_rounds[0]['round'] - 1
+
+        expected_round_numbers = list(range(first_new_i + 1, first_new_i + 1 + len(new_rounds)))
+        if not 0 <= first_new_i <= len(results) or \
+                [r['round'] for r in new_rounds] != expected_round_numbers:
+            raise ValueError("New rounds must be consecutive, and continue from existing rounds")
+        return new_rounds, first_new_i
+
+    def _filled_in_copy(self, data, results, first_recomputed_i):
+        """
+        Fills in copies of results[first_recomputed_i:]. Only the dicts which are changed
+        are copied: each recomputed round and its tally. A copied tally is swapped back for
+        the original if every value in it was left as-is.
+
+        :return: A copy of data with the given results, as filled in
+        """
+        originals = results[first_recomputed_i:]
+        recomputed = [dict(round_data, tally=dict(round_data['tally']))
+                      for round_data in originals]
+        self._fill_in_rounds(recomputed)
+
+        for original, round_data in zip(originals, recomputed):
+            if all(map(operator.is_, original['tally'].values(), round_data['tally'].values())):
+                round_data['tally'] = original['tally']
+
+        return dict(data, results=results[:first_recomputed_i] + recomputed)
+
+    def _fill_in_rounds(self, rounds):
+        """ Converts the tallies, and fills in the tallyResults, of these rounds in-place """
+        backend = self._arithmetic_for(rounds)
+        self._convert_tally_string_to_decimal(rounds, backend)
+        self._fill_in_tallyresults(rounds, backend)
+        backend.restore_tallies(rounds)
+
     @classmethod
     def _get_eliminated_names(cls, rounds, round_i):
         """ Reads each tallyResult, returns any eliminated name """
@@ -47,7 +140,9 @@ class UTWithoutTransfersConverter(GenericGuessAtTransferConverter):
         return [d['elected'] for d in results if 'elected' in d]
 
     @classmethod
-    def _convert_tally_string_to_decimal(cls, rounds):
+    def _convert_tally_string_to_decimal(cls, rounds, backend=None):
+        """ Converts tallies to floats, or if the backend is exact, to its integers """
+        is_exact = backend is not None and backend.is_exact
         for round_data in rounds:
             for person in round_data['tally']:
                 tally_non_float = round_data['tally'][person]
@@ -56,21 +151,24 @@ class UTWithoutTransfersConverter(GenericGuessAtTransferConverter):
                         tally_non_float = 0
                     else:
                         raise ValueError("Must have values for every candidate")
-                round_data['tally'][person] = float(tally_non_float)
+                round_data['tally'][person] = \
+                    tally_non_float if is_exact else float(tally_non_float)
+        if is_exact:
+            backend.parse_tallies(rounds)
 
-    def _fill_in_tallyresults(self, rounds):
+    def _fill_in_tallyresults(self, rounds, backend=None):
         """ Fill out rounds['tallyResults'] based on rounds['tally'] """
-        for round_i, _ in enumerate(rounds):
-            # Get who was elected and eliminated
-            eliminated_names = self._get_eliminated_names(rounds, round_i)
-            elected_names = self._get_elected_names(rounds, round_i)
-
-            # Get how the votes change between this round and next
-            vote_delta = self.compute_vote_deltas_for_round(rounds, round_i)
+        # Get who was elected and eliminated
+        eliminated_names_per_round = [
+            self._get_eliminated_names(rounds, round_i) for round_i, _ in enumerate(rounds)]
+        elected_names_per_round = [
+            self._get_elected_names(rounds, round_i) for round_i, _ in enumerate(rounds)]
 
-            # Use that to compute the tallyResults structure
-            tally_results = self.guess_at_tally_results(
-                eliminated_names, elected_names, vote_delta, self.allow_guessing)
+        # Use how the votes change between rounds to compute the tallyResults structure
+        all_tally_results = self.guess_at_tally_results_for_all_rounds(
+            rounds, eliminated_names_per_round, elected_names_per_round, self.allow_guessing,
+            backend)
 
-            # Store it, completing the structure for this round
-            rounds[round_i]['tallyResults'] = tally_results
+        # Store it, completing the structure for each round
+        for round_data, tally_results in zip(rounds, all_tally_results):
+            round_data['tallyResults'] = tally_results
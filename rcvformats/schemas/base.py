@@ -3,17 +3,89 @@ Loads supported schemas (currently only one: the Universal Tabulator schema)
 """
 
 import abc
+import contextlib
+import functools
 import json
 import os
+import pickle
+import threading
 
 import jsonschema
 
+from rcvformats.common import aio
+from rcvformats.common import buffers
+from rcvformats.common import compression
+from rcvformats.common import jsonstream
+from rcvformats.common import model
 from rcvformats.common import utils
 
 
 class DataError(Exception):
     """ An error raised if the schema is correct, but the data inside it is invalid """
 
+    def __init__(self, message, round_number=None, path=None):
+        """
+        :param message: What is wrong
+        :param round_number: The round it is wrong in, counting from 1, if any
+        :param path: The keys and indices leading to where it is wrong, if known,\
+                     e.g. ['results', 2, 'tally', 'Alice']
+        """
+        super().__init__(message)
+        self.round_number = round_number
+        self.path = list(path or [])
+
+
+class _CheckNotFinished(DataError):
+    """ A logic check which could not finish, as the data did not match the schema """
+
+
+class ValidationIssue:
+    """ A single problem found by :func:`Schema.validate_all` """
+
+    def __init__(self, message, path=None, round_number=None, error=None):
+        """
+        :param message: What is wrong
+        :param path: The keys and indices leading to where it is wrong, e.g.\
+                     ['results', 2, 'tally', 'Alice']. Empty if it is the whole file.
+        :param round_number: The round it is wrong in, counting from 1, if any
+        :param error: The exception :func:`Schema.validate` would have reported for it
+        """
+        self.message = message
+        self.path = list(path or [])
+        self.round_number = round_number
+        self.error = error
+
+    @classmethod
+    def from_error(cls, error, rounds_key=None):
+        """
+        :param error: A jsonschema ValidationError, :class:`DataError`, or any other\
+                      exception, e.g. a JSONDecodeError
+        :param rounds_key: The top-level key of the list of rounds, e.g. 'results', so\
+                           that the round of an error in it is known
+        """
+        if isinstance(error, jsonschema.exceptions.ValidationError):
+            path = list(error.absolute_path)
+            round_number = None
+            if rounds_key is not None and len(path) > 1 and path[0] == rounds_key and \
+                    isinstance(path[1], int):
+                round_number = path[1] + 1
+            return cls(error.message, path, round_number, error)
+        if isinstance(error, DataError):
+            return cls(str(error), error.path, error.round_number, error)
+        # Some errors, e.g. a failed assert, have no message of their own
+        return cls(str(error) or type(error).__name__, error=error)
+
+    def to_dict(self):
+        """ :return: The issue as JSON-serializable data, e.g. for a report """
+        return {'message': self.message, 'path': self.path, 'round': self.round_number}
+
+    def __str__(self):
+        where = '/'.join(map(str, self.path))
+        return f"{where}: {self.message}" if where else self.message
+
+    def __repr__(self):
+        return f"ValidationIssue({self.message!r}, {self.path!r}, {self.round_number!r})"
+
 
 class Schema(abc.ABC):
     """
@@ -21,7 +93,26 @@ class Schema(abc.ABC):
     """
 
     def __init__(self):
-        self._last_error = None
+        # The last error is kept per-thread, so a single schema can validate on many threads
+        self._errors = threading.local()
+
+    def __getstate__(self):
+        """ Thread-local errors are not pickled, so schemas can be sent to other processes """
+        state = self.__dict__.copy()
+        del state['_errors']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._errors = threading.local()
+
+    @property
+    def _last_error(self):
+        return getattr(self._errors, 'last_error', None)
+
+    @_last_error.setter
+    def _last_error(self, error):
+        self._errors.last_error = error
 
     @abc.abstractmethod
     def version(self):
@@ -35,20 +126,102 @@ class Schema(abc.ABC):
         """
         Validates that the file matches the expected schema
 
-        :param data: The JSON filename, file object, or JSON data for the tabulated results
+        :param data: The JSON filename, file object, in-memory buffer (bytes, bytearray,\
+                     memoryview or mmap), or JSON data for the tabulated results,\
+                     or a :class:`~rcvformats.common.model.Election`.\
+                     Files and buffers may be gzip, bz2 or xz compressed.
         :return: whether or not the validation failed
         """
-        if utils.is_file_obj(data):
-            return self._validate_data(data)
-        if isinstance(data, dict):
-            return self._validate_data(data)
-        if utils.is_filename(data):
-            with open(data, 'rb') as file_object:
-                return self._validate_data(file_object)
+        with _opened(data) as opened:
+            if opened is None:
+                # Couldn't open the file at all
+                self._last_error = TypeError("Couldn't open file")
+                return False
+            if isinstance(opened, model.Election):
+                return self._validate_election(opened)
+            return self._validate_data(opened)
 
-        # Couldn't open the file at all
-        self._last_error = TypeError("Couldn't open file")
-        return False
+    def validate_all(self, data):
+        """
+        Like :func:`~validate`, but rather than stopping at the first problem, finds every
+        one it can in a single pass, e.g. to report them all to someone fixing a file.
+        :func:`~last_error` is set to the first problem's error.
+
+        :param data: As for :func:`~validate`
+        :return: A list of :class:`ValidationIssue`, empty if the data is valid
+        """
+        with _opened(data) as opened:
+            if opened is None:
+                issues = [ValidationIssue.from_error(TypeError("Couldn't open file"))]
+            else:
+                issues = self._find_issues(opened)
+        self._last_error = issues[0].error if issues else None
+        return issues
+
+    def is_valid(self, data):
+        """
+        Like :func:`~validate`, for bulk checks which only need to know whether data is
+        valid: it stops at the first problem without describing it, and so is faster.
+        :func:`~last_error` is not meaningful afterwards.
+
+        :param data: As for :func:`~validate`
+        :return: whether or not the data is valid
+        """
+        with _opened(data) as opened:
+            return opened is not None and self._is_valid(opened)
+
+    def _find_issues(self, data):
+        """
+        Implements :func:`~validate_all` for an opened file, dict or Election. Unless
+        overridden, only finds the problem :func:`~validate` would.
+        """
+        is_valid = self._validate_election(data) if isinstance(data, model.Election) \
+            else self._validate_data(data)
+        return [] if is_valid else [ValidationIssue.from_error(self.last_error())]
+
+    def _is_valid(self, data):
+        """
+        Implements :func:`~is_valid` for an opened file, dict or Election. Unless
+        overridden, the same as :func:`~validate`.
+        """
+        if isinstance(data, model.Election):
+            return self._validate_election(data)
+        return self._validate_data(data)
+
+    async def validate_async(self, data, executor=None, timeout=None):
+        """
+        Like :func:`~validate`, without blocking the event loop: files are read on a thread,
+        and the validation runs in the executor. :func:`~last_error` is set on the calling
+        thread, so if several validations run at once on the same schema and event loop,
+        read it before awaiting anything else.
+
+        :param data: The JSON filename, file object, or JSON data
+        :param executor: See :func:`rcvformats.common.aio.run`
+        :param timeout: Seconds before raising :class:`asyncio.TimeoutError`
+        :return: whether or not the validation failed
+        """
+        data = await aio.read_input(data)
+        is_valid, error = await aio.run(self._validate_with_error, data, executor == aio.PROCESS,
+                                        executor=executor, timeout=timeout)
+        self._last_error = error
+        return is_valid
+
+    def _validate_with_error(self, data, must_pickle=False):
+        """
+        :param must_pickle: If the error must be sent to another process. Errors which
+                            cannot be pickled are replaced by a DataError with the same message.
+        :return: a tuple of (:func:`~validate`, the error if it failed or None)
+        """
+        if self.validate(data):
+            return True, None
+
+        error = self.last_error()
+        if must_pickle:
+            try:
+                pickle.dumps(error)
+            except Exception:  # pylint: disable=broad-except
+                error = DataError(str(error))
+        return False, error
 
     @abc.abstractmethod
     def _validate_data(self, data):
@@ -57,6 +230,13 @@ class Schema(abc.ABC):
         Should accept either a filelike object or raw, loaded data
         """
 
+    def _validate_election(self, election):
+        """
+        Validates a :class:`~rcvformats.common.model.Election`. Unless overridden,
+        by converting it to a dict and calling :func:`~_validate_data`.
+        """
+        return self._validate_data(election.to_ut_dict())
+
     def last_error(self):
         """
         If validate() failed, this method will provide more detailed information
@@ -69,18 +249,63 @@ class Schema(abc.ABC):
         return self._last_error
 
 
+@contextlib.contextmanager
+def _opened(data):
+    """
+    Opens and decompresses filenames, file objects and buffers, yielding a binary file
+    object. Dicts and Elections are yielded as they are, and anything else as None.
+    """
+    if isinstance(data, (model.Election, dict)):
+        yield data
+    elif buffers.is_buffer(data):
+        with buffers.open_buffer(data) as file_object:
+            with compression.decompressed(file_object) as decompressed_file:
+                yield decompressed_file
+    elif utils.is_file_obj(data):
+        with compression.decompressed(data) as decompressed_file:
+            yield decompressed_file
+    elif utils.is_filename(data):
+        with open(data, 'rb') as file_object:
+            with compression.decompressed(file_object) as decompressed_file:
+                yield decompressed_file
+    else:
+        yield None
+
+
+@functools.lru_cache(maxsize=None)
+def _load_jsonschema(filepath):
+    """ Each JSON Schema is only read once, and shared by every instance. Do not modify it. """
+    with open(filepath, 'r', encoding='utf-8') as file_object:
+        return json.load(file_object)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_validator(filepath):
+    """
+    Each JSON Schema is only checked once, rather than on every validation as
+    jsonschema.validate does, and its validator shared by every instance
+    """
+    schema = _load_jsonschema(filepath)
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
 class GenericJsonSchema(Schema):
     """ Base class for a JSON Schema """
+
+    # The top-level key holding the list of rounds, so problems in it know their round
+    rounds_key = None
+
     @property
     @abc.abstractmethod
     def schema_filename(self):
         """ The JSON Schema filename """
 
     def __init__(self):
-        filename = self.schema_filename
-        filepath = os.path.join(self._get_jsonschema_directory(), filename)
-        with open(filepath, 'r', encoding='utf-8') as file_object:
-            self.schema = json.load(file_object)
+        filepath = os.path.join(self._get_jsonschema_directory(), self.schema_filename)
+        self.schema = _load_jsonschema(filepath)
+        self._validator = _load_validator(filepath)
 
         super().__init__()
 
@@ -91,18 +316,52 @@ class GenericJsonSchema(Schema):
     def _validate_data(self, data):
         """
         Opens the file and runs :func:`~is_schema_valid`
-        if is_filelike, opens the file, otherwise, the data should be a python dictionary
+        if is_filelike, reads the file a chunk at a time, otherwise, the data should be a
+        python dictionary
         """
         if not isinstance(data, dict):
             try:
-                file_bytes = data.read()
-                data = json.loads(file_bytes)
+                data = jsonstream.load(data)
             except (json.decoder.JSONDecodeError, UnicodeDecodeError) as error:
                 self._last_error = error
                 return False
 
         return self.validate_schema_and_logic(data)
 
+    def _load(self, data):
+        """ :return: data, read from the file if it is not already a dict """
+        if isinstance(data, model.Election):
+            return data.to_ut_dict()
+        if isinstance(data, dict):
+            return data
+        return jsonstream.load(data)
+
+    def _find_issues(self, data):
+        try:
+            data = self._load(data)
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError) as error:
+            return [ValidationIssue.from_error(error)]
+
+        issues = [ValidationIssue.from_error(error, self.rounds_key)
+                  for error in self._validator.iter_errors(data)]
+        matches_schema = not issues
+        for error in self.find_logic_errors(data):
+            # Checks which could not finish, as the data does not match the schema, only
+            # tell what the schema errors already have
+            if matches_schema or not isinstance(error, _CheckNotFinished):
+                issues.append(ValidationIssue.from_error(error))
+        return issues
+
+    def _is_valid(self, data):
+        if isinstance(data, model.Election):
+            return self._validate_election(data)
+        try:
+            data = self._load(data)
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+            return False
+        return self._validator.is_valid(data) and \
+            next(iter(self.find_logic_errors(data)), None) is None
+
     def validate_schema_and_logic(self, data):
         """ Runs both the schema and logic check """
         if not self.is_schema_valid(data):
@@ -121,12 +380,11 @@ class GenericJsonSchema(Schema):
         :param data: The input dictionary
         :return: Whether or not the data matches the schema
         """
-        try:
-            jsonschema.validate(data, self.schema)
+        error = jsonschema.exceptions.best_match(self._validator.iter_errors(data))
+        if error is None:
             return True
-        except jsonschema.exceptions.ValidationError as error:
-            self._last_error = error
-            return False
+        self._last_error = error
+        return False
 
     def is_data_valid(self, data):
         """
@@ -147,3 +405,29 @@ class GenericJsonSchema(Schema):
         Override to add any additional data validations you need done.
         Raise an exception if anything is invalid
         """
+
+    def find_logic_errors(self, data):
+        """
+        Like :func:`~ensure_data_is_logical`, but yields every :class:`DataError` found,
+        rather than raising the first. Unless overridden, only yields the first.
+
+        :param data: The input dictionary. If it does not match the schema, checks which\
+                     cannot finish yield a DataError saying so.
+        """
+        return self._run_checks([self._first_logic_error], data)
+
+    def _first_logic_error(self, data):
+        try:
+            self.ensure_data_is_logical(data)
+        except DataError as error:
+            yield error
+
+    @classmethod
+    def _run_checks(cls, checks, data):
+        """ Yields the errors each check yields, in turn, noting any which cannot finish """
+        for check in checks:
+            try:
+                yield from check(data)
+            except (KeyError, IndexError, TypeError, AttributeError, ValueError) as error:
+                yield _CheckNotFinished(
+                    f"Could not finish checking the data: {type(error).__name__}: {error}")
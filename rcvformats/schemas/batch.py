@@ -0,0 +1,148 @@
+"""
+Validates many files at once, optionally in worker processes, e.g. to re-validate a whole
+archive after a schema changes, and reports on each in a form other programs can read.
+
+Each file may be validated against a named schema or, if none is given, against whichever
+schema it is valid under, sniffed from its first bytes. Valid files are checked with the
+fast :func:`~rcvformats.schemas.base.Schema.is_valid`, and only invalid files are then
+checked again with :func:`~rcvformats.schemas.base.Schema.validate_all`, to report every
+problem with them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import time
+
+from rcvformats.common import compression
+from rcvformats.conversions import registry
+from rcvformats.schemas import electionbuddy
+from rcvformats.schemas import opavote
+from rcvformats.schemas import universaltabulator
+
+# Each schema, by the name the command line knows it by
+SCHEMAS = {
+    'ut': universaltabulator.SchemaV0,
+    'eb': electionbuddy.SchemaV0,
+    'ov10': opavote.SchemaV1_0,
+    'ov11': opavote.SchemaV1_1,
+}
+
+# The error of a file no schema could be guessed for
+UNRECOGNIZED = "No schema recognized the start of the file"
+
+# How many files each worker is sent at once: validating is quick, so sending files one
+# at a time would spend more time passing them between processes than validating them
+_FILES_PER_TASK = 16
+
+
+def validate_batch(filenames, schema_name=None, max_workers=None):
+    """
+    Validates each file, reporting on them all.
+
+    :param filenames: The files to validate. Each may be gzip, bz2 or xz compressed.
+    :param schema_name: A key of :data:`SCHEMAS` to validate every file against. If None,\
+                        each file is validated against the schema it is valid under, or,\
+                        if none, the one it most looks like.
+    :param max_workers: If set, validate in this many worker processes at once.\
+                        Otherwise, files are validated one after the other.
+    :return: The report: a dict with a 'files' list, holding a dict per file in the order\
+             given, as described in :func:`validate_file`, and a 'summary' of how many\
+             files there were in 'total', how many were 'valid' and 'invalid', those\
+             counts for each schema in 'schemas', and the 'seconds' the batch took.
+    """
+    if schema_name is not None and schema_name not in SCHEMAS:
+        raise ValueError(f"Unknown schema {schema_name!r}: expected one of {list(SCHEMAS)}")
+    filenames = list(filenames)
+    start = time.perf_counter()
+    validate = functools.partial(validate_file, schema_name=schema_name)
+    if max_workers is None:
+        files = [validate(filename) for filename in filenames]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            files = list(executor.map(validate, filenames, chunksize=_FILES_PER_TASK))
+    return {'files': files, 'summary': summarize(files, time.perf_counter() - start)}
+
+
+def validate_file(filename, schema_name=None):
+    """
+    :param filename: The file to validate
+    :param schema_name: As for :func:`validate_batch`
+    :return: A dict of the 'filename', whether it is 'valid', the name of the 'schema' it\
+             was validated against (None if none was recognized), the first problem as\
+             an 'error' string and every problem as 'issues' (each a\
+             :func:`~rcvformats.schemas.base.ValidationIssue.to_dict`), both None if\
+             valid, and the 'seconds' it took.
+    """
+    start = time.perf_counter()
+    report = {'filename': filename, 'valid': False, 'schema': schema_name,
+              'error': None, 'issues': None}
+    try:
+        candidates = [schema_name] if schema_name is not None else _guess_schemas(filename)
+    except OSError as error:
+        candidates = []
+        report['error'] = f"{type(error).__name__}: {error}"
+    for name in candidates:
+        if _shared_schema(name).is_valid(filename):
+            report.update(valid=True, schema=name)
+            break
+
+    if not report['valid'] and candidates:
+        # Report the problems under the most likely schema
+        report['schema'] = candidates[0]
+        issues = _shared_schema(candidates[0]).validate_all(filename)
+        report['issues'] = [issue.to_dict() for issue in issues]
+        report['error'] = str(issues[0]) if issues else None
+    elif report['error'] is None and not candidates:
+        report['error'] = UNRECOGNIZED
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def summarize(files, seconds):
+    """
+    :param files: The report of each file, from :func:`validate_file`
+    :param seconds: How long validating them took
+    :return: The 'summary' of a report, as described in :func:`validate_batch`
+    """
+    schemas = {}
+    for file_report in files:
+        counts = schemas.setdefault(file_report['schema'] or 'unrecognized',
+                                    {'valid': 0, 'invalid': 0})
+        counts['valid' if file_report['valid'] else 'invalid'] += 1
+    num_valid = sum(file_report['valid'] for file_report in files)
+    return {'total': len(files), 'valid': num_valid, 'invalid': len(files) - num_valid,
+            'schemas': schemas, 'seconds': seconds}
+
+
+def _guess_schemas(filename):
+    """
+    :return: The names of the schemas the file might be valid under, most likely first
+    """
+    with open(filename, 'rb') as file_object:
+        with compression.decompressed(file_object) as decompressed_file:
+            head = decompressed_file.read(registry.SNIFF_BYTES)
+    if registry.looks_like_json(head):
+        text = registry.decode_head(head)
+        if '"results"' in text or '"config"' in text:
+            return ['ut'] + _opavote_schemas(text)
+        return _opavote_schemas(text) + ['ut']
+    if registry.looks_like_utf8_text(head) and not registry.looks_like_xml(head):
+        return ['eb']
+    return []
+
+
+def _opavote_schemas(text):
+    """
+    Version 1.1 only adds to 1.0, so every file valid under 1.0 is also valid under 1.1.
+    Try 1.0 first, so such files are counted under it, unless the file uses what only 1.1
+    has: a round's threshold, or a surplus.
+    """
+    if '"thresh"' in text or '"surplus"' in text:
+        return ['ov11', 'ov10']
+    return ['ov10', 'ov11']
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_schema(name):
+    """ One instance of each schema per process, rather than loading it for every file """
+    return SCHEMAS[name]()
@@ -9,6 +9,8 @@ from rcvformats.schemas.base import GenericJsonSchema
 class SchemaV1_0(GenericJsonSchema):
     """ Schema for the initial Opavote schema """
 
+    rounds_key = 'rounds'
+
     @property
     def schema_filename(self):
         return 'opavote.schema.json'
@@ -22,6 +24,8 @@ class SchemaV1_0(GenericJsonSchema):
 class SchemaV1_1(GenericJsonSchema):
     """ Schema for the version created on 2022-05-18 """
 
+    rounds_key = 'rounds'
+
     @property
     def schema_filename(self):
         return 'opavote_v1_1.schema.json'
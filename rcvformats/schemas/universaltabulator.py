@@ -15,55 +15,117 @@ class SchemaV0(GenericJsonSchema):
     def version(self):
         return "Unversioned:V0"
 
+    rounds_key = 'results'
+
     def ensure_data_is_logical(self, data):
         """
         Various checks to ensure the data is sane - though it cannot catch everything,
         we have tried to place the most common errors here
         """
-        self.check_last_round_eliminations(data)
-        self.check_candidate_leaves_after_elimination(data)
-        self.check_unique_candidate_names(data)
-        self.check_no_empty_candidate_names(data)
-        self.check_votes_never_decrease_except_surplus(data)
+        for find_errors in self._logic_checks():
+            _raise_first(find_errors(data))
+
+    def find_logic_errors(self, data):
+        """ Every error each check of :func:`~ensure_data_is_logical` finds """
+        return self._run_checks(self._logic_checks(), data)
+
+    @classmethod
+    def _logic_checks(cls):
+        return (cls.find_last_round_eliminations,
+                cls.find_candidates_after_elimination,
+                cls.find_duplicate_candidate_names,
+                cls.find_empty_candidate_names,
+                cls.find_votes_decreasing_except_surplus)
+
+    def _validate_election(self, election):
+        """
+        Runs the same checks as :func:`~validate_schema_and_logic` on an
+        :class:`~rcvformats.common.model.Election`. The model's structure already matches
+        the schema, so only the config is checked against it.
+        """
+        if not self.is_schema_valid({'config': election.config, 'results': []}):
+            return False
+
+        try:
+            self.ensure_election_is_logical(election)
+            return True
+        except DataError as error:
+            self._last_error = error
+            return False
+
+    def ensure_election_is_logical(self, election):
+        """
+        Equivalent to :func:`~ensure_data_is_logical`, for an
+        :class:`~rcvformats.common.model.Election`: runs the same checks on its
+        :func:`~rcvformats.common.model.Election.ut_view`, one round at a time
+        """
+        if not election.rounds:
+            raise DataError("There must be at least one round.")
+        if any(r.number < 1 for r in election.rounds):
+            raise DataError("Round numbers must start at 1.")
+        self.ensure_data_is_logical(election.ut_view())
 
     @classmethod
     def check_unique_candidate_names(cls, data):
         """
         All candidate names must be unique
         """
+        _raise_first(cls.find_duplicate_candidate_names(data))
+
+    @classmethod
+    def find_duplicate_candidate_names(cls, data):
+        """ See :func:`~check_unique_candidate_names` """
         first_round_tally = data['results'][0]['tally']
         names = first_round_tally.keys()
         if len(set(names)) != len(names):
-            raise DataError("All candidate names must be unique.")
+            yield DataError("All candidate names must be unique.", 1, ['results', 0, 'tally'])
 
     @classmethod
     def check_no_empty_candidate_names(cls, data):
         """
         All candidate names must be unique
         """
+        _raise_first(cls.find_empty_candidate_names(data))
+
+    @classmethod
+    def find_empty_candidate_names(cls, data):
+        """ See :func:`~check_no_empty_candidate_names` """
         first_round_tally = data['results'][0]['tally']
         names = first_round_tally.keys()
         if any(n == "" for n in names):
-            raise DataError("All candidates must have non-empty names.")
+            yield DataError("All candidates must have non-empty names.",
+                            1, ['results', 0, 'tally', ''])
 
     @classmethod
     def check_last_round_eliminations(cls, data):
         """
         No eliminations allowed on the last round
         """
-        last_round_tally_results = data['results'][-1]['tallyResults']
-        for tally_result in last_round_tally_results:
+        _raise_first(cls.find_last_round_eliminations(data))
+
+    @classmethod
+    def find_last_round_eliminations(cls, data):
+        """ See :func:`~check_last_round_eliminations` """
+        last_round_i = len(data['results']) - 1
+        last_round_tally_results = data['results'][last_round_i]['tallyResults']
+        for tally_result_i, tally_result in enumerate(last_round_tally_results):
             if 'eliminated' in tally_result:
-                raise DataError(
+                yield DataError(
                     "There cannot be an elimination on the last round. "
                     "All eliminations require one additional round to signify where the "
-                    "votes have been transferred to.")
+                    "votes have been transferred to.",
+                    last_round_i + 1, ['results', last_round_i, 'tallyResults', tally_result_i])
 
     @classmethod
     def check_votes_never_decrease_except_surplus(cls, data):
         """
         Check that the vote counts never decrease, except in the case of surplus transfers.
         """
+        _raise_first(cls.find_votes_decreasing_except_surplus(data))
+
+    @classmethod
+    def find_votes_decreasing_except_surplus(cls, data):
+        """ See :func:`~check_votes_never_decrease_except_surplus` """
         first_round_tally = data['results'][0]['tally']
         prev_round_counts = first_round_tally
         prev_round_winners = set()
@@ -74,15 +136,18 @@ class SchemaV0(GenericJsonSchema):
                 if this_round_count >= float(prev_round_counts[name]):
                     continue
 
+                path = ['results', round_num, 'tally', name]
                 if this_round_count == 0:
-                    raise DataError("Vote count should not decrease to zero. Candidate "
-                                    f"{name} should be eliminated on Round {round_num}.")
-                if name not in prev_round_winners:
-                    raise DataError("Vote counts should never decrease except in the case of "
+                    yield DataError("Vote count should not decrease to zero. Candidate "
+                                    f"{name} should be eliminated on Round {round_num}.",
+                                    round_num + 1, path)
+                elif name not in prev_round_winners:
+                    yield DataError("Vote counts should never decrease except in the case of "
                                     f"a surplus transfer. Candidate {name}'s votes decreased "
                                     f"from {prev_round_counts[name]} to {this_round_count} "
                                     f"on Round {round_num+1}, but they were not elected on "
-                                    f"Round {round_num}.")
+                                    f"Round {round_num}.",
+                                    round_num + 1, path)
             prev_round_winners = {tr['elected'] for tr in result['tallyResults'] if 'elected' in tr}
             prev_round_counts = tally
 
@@ -92,15 +157,27 @@ class SchemaV0(GenericJsonSchema):
         After a candidate is eliminated, ensure they are not listed later as having
         zero votes. They should be removed from the list.
         """
+        _raise_first(cls.find_candidates_after_elimination(data))
+
+    @classmethod
+    def find_candidates_after_elimination(cls, data):
+        """ See :func:`~check_candidate_leaves_after_elimination` """
         eliminated_so_far = set()
         for round_num, result in enumerate(data['results']):
             tally = result['tally']
             for name in tally:
                 if name in eliminated_so_far:
-                    raise DataError(
+                    yield DataError(
                         f"Found {name} in Round {round_num+1}, though they were "
                         "already eliminated. After a candidate is eliminated, they should "
-                        "be removed from all future vote tallies.")
+                        "be removed from all future vote tallies.",
+                        round_num + 1, ['results', round_num, 'tally', name])
 
             eliminated_so_far.update(
                 {tr['eliminated'] for tr in result['tallyResults'] if 'eliminated' in tr})
+
+
+def _raise_first(errors):
+    """ Raises the first of the errors, if there are any """
+    for error in errors:
+        raise error
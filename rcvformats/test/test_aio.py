@@ -0,0 +1,75 @@
+"""
+Tests for the asyncio counterparts of converting and validating
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import time
+
+import pytest
+
+from rcvformats.common import aio
+from rcvformats.conversions.base import CouldNotConvertException
+from rcvformats.conversions.dominion_xlsx import DominionXlsxConverter
+from rcvformats.conversions.opavote import OpavoteConverter
+from rcvformats.schemas import universaltabulator
+
+OPAVOTE_FILE = 'testdata/inputs/opavote11/2022-example.json'
+XLSX_FILE = 'testdata/inputs/dominion_xlsx/v5_17_multi.xlsx'
+
+
+def test_async_matches_sync():
+    """ Each executor gives the same result as the blocking call """
+    expected = OpavoteConverter().convert_to_ut_and_validate(OPAVOTE_FILE)
+
+    async def convert_with_each_executor():
+        converter = OpavoteConverter()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = [await converter.convert_to_ut_and_validate_async(OPAVOTE_FILE, executor=e)
+                       for e in (None, executor, aio.PROCESS)]
+        with open(OPAVOTE_FILE, 'rb') as file_object:
+            results.append(await converter.convert_to_ut_async(file_object))
+        return results
+
+    assert asyncio.run(convert_with_each_executor()) == [expected] * 4
+
+
+def test_async_validation_sets_last_error():
+    """ Errors are the same as when validating synchronously, even from another process """
+    schema = universaltabulator.SchemaV0()
+    assert not schema.validate(OPAVOTE_FILE)
+    expected = str(schema.last_error())
+
+    async def validate_with_each_executor():
+        errors = []
+        for executor in (None, aio.PROCESS):
+            async_schema = universaltabulator.SchemaV0()
+            assert not await async_schema.validate_async(OPAVOTE_FILE, executor=executor)
+            errors.append(str(async_schema.last_error()))
+        return errors
+
+    assert asyncio.run(validate_with_each_executor()) == [expected] * 2
+
+
+def test_timeout_kills_process():
+    """ A call which times out in its own process does not keep running """
+    async def run_slowly():
+        with pytest.raises(asyncio.TimeoutError):
+            await aio.run(time.sleep, 30, executor=aio.PROCESS, timeout=0.2)
+        with pytest.raises(asyncio.TimeoutError):
+            await DominionXlsxConverter().convert_to_ut_async(
+                XLSX_FILE, executor=aio.PROCESS, timeout=0.01)
+
+    start = time.monotonic()
+    asyncio.run(run_slowly())
+    assert time.monotonic() - start < 10
+    assert not multiprocessing.active_children()
+
+
+def test_convert_many():
+    """ Results are in order, and failures are returned rather than raised """
+    inputs = [OPAVOTE_FILE, 'testdata/inputs/dominion.txt', OPAVOTE_FILE]
+    results = asyncio.run(aio.convert_many(OpavoteConverter(), inputs, max_concurrency=2))
+    assert results[0] == results[2] == OpavoteConverter().convert_to_ut_and_validate(OPAVOTE_FILE)
+    assert isinstance(results[1], CouldNotConvertException)
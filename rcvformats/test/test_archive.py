@@ -0,0 +1,121 @@
+"""
+Tests for converting every member of a zip archive
+"""
+
+from concurrent.futures import Future
+import gzip
+import json
+import os
+import zipfile
+
+from rcvformats.bin import cli
+from rcvformats.conversions import archive
+from rcvformats.conversions import automatic
+from rcvformats.conversions.dominion_multi_converter import DominionMultiConverter
+
+MEMBERS = {
+    'county/mayor.xlsx': 'testdata/inputs/dominion_xlsx/las-cruces-mayor.xlsx',
+    'county/alaska.txt': 'testdata/inputs/dominion.txt',
+    'county/eb.csv.gz': 'testdata/inputs/electionbuddy/standard.csv',
+    'multi.xml': 'testdata/inputs/dominion-multi-converter.xml',
+    'not-results.txt': 'README.md',
+}
+
+
+def _make_zip(tmp_path):
+    zip_filename = tmp_path / 'results.zip'
+    with zipfile.ZipFile(zip_filename, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr('county/', b'')
+        zip_file.writestr('__MACOSX/county/._mayor.xlsx', b'resource fork')
+        for member_name, filename in MEMBERS.items():
+            with open(filename, 'rb') as file_object:
+                contents = file_object.read()
+            if member_name.endswith('.gz'):
+                contents = gzip.compress(contents)
+            zip_file.writestr(member_name, contents)
+    return str(zip_filename)
+
+
+def test_convert_zip(tmp_path):
+    """ Each member gives the same result as converting the file on its own """
+    manifest = archive.convert_zip(_make_zip(tmp_path))
+    converter = automatic.AutomaticConverter()
+    with open('testdata/inputs/dominion-multi-converter.xml', 'rb') as file_object:
+        multi = DominionMultiConverter.convert_to_ut_per_contest(file_object)
+
+    expected = [
+        {'member': member_name, 'data': converter.convert_to_ut(MEMBERS[member_name])}
+        for member_name in ('county/mayor.xlsx', 'county/alaska.txt', 'county/eb.csv.gz')]
+    expected += [{'member': 'multi.xml', 'contest': contest, 'data': data}
+                 for contest, data in multi.items()]
+    for entry in expected[:3]:
+        entry['contest'] = entry['data']['config']['contest']
+
+    assert manifest[:-1] == expected
+    assert manifest[-1]['member'] == 'not-results.txt'
+    assert 'CouldNotConvertException' in manifest[-1]['error']
+
+
+def test_convert_zip_with_workers(tmp_path):
+    """ Worker processes give the same manifest, in the same order """
+    zip_filename = _make_zip(tmp_path)
+    assert archive.convert_zip(zip_filename, max_workers=2) == archive.convert_zip(zip_filename)
+
+
+class _RecordingExecutor:
+    """ Runs each task as it is submitted, recording the most results held at once """
+    most_queued = 0
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.queued = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        """ Runs the task now, counting it as queued until its result is taken """
+        executor = self
+
+        class _TakenFuture(Future):
+            def result(self, timeout=None):
+                executor.queued -= 1
+                return super().result(timeout)
+
+        future = _TakenFuture()
+        future.set_result(function(*args))
+        self.queued += 1
+        _RecordingExecutor.most_queued = max(_RecordingExecutor.most_queued, self.queued)
+        return future
+
+
+def test_convert_zip_reads_members_as_workers_free_up(tmp_path, monkeypatch):
+    """ Only a few members per worker are read and queued at once """
+    zip_filename = tmp_path / 'many.zip'
+    with zipfile.ZipFile(zip_filename, 'w') as zip_file:
+        for i in range(20):
+            zip_file.writestr(f"{i}.json", b'{}')
+
+    monkeypatch.setattr(archive, 'ProcessPoolExecutor', _RecordingExecutor)
+    manifest = archive.convert_zip(str(zip_filename), max_workers=2)
+    assert [entry['member'] for entry in manifest] == [f"{i}.json" for i in range(20)]
+    assert _RecordingExecutor.most_queued == 2 * archive.MEMBERS_QUEUED_PER_WORKER
+
+
+def test_cli_writes_outputs_and_manifest(tmp_path):
+    """ Each contest gets its own file, listed in the manifest alongside the errors """
+    output_directory = str(tmp_path / 'out')
+    cli.convert_zip(_make_zip(tmp_path), output_directory, None)
+    manifest_filename = os.path.join(output_directory, archive.MANIFEST_FILENAME)
+    with open(manifest_filename, encoding='utf-8') as file_obj:
+        manifest = json.load(file_obj)
+
+    outputs = [entry['output'] for entry in manifest if 'output' in entry]
+    assert len(outputs) == len(set(outputs)) == len(manifest) - 1
+    assert sorted(outputs + [archive.MANIFEST_FILENAME]) == sorted(os.listdir(output_directory))
+    for entry in manifest[:-1]:
+        with open(os.path.join(output_directory, entry['output']), encoding='utf-8') as file_obj:
+            assert json.load(file_obj)['config']['contest'] == entry['contest']
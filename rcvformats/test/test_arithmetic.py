@@ -0,0 +1,106 @@
+"""
+Tests for the exact, fixed-point numeric backend
+"""
+
+import copy
+import decimal
+import json
+
+import pytest
+
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions import arithmetic
+from rcvformats.conversions import electionbuddy
+from rcvformats.conversions.base import CouldNotConvertException
+from rcvformats.conversions import opavote
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+
+
+def _assert_transfers_add_up(ut_data):
+    """ On every round, transfers add up to exactly what each candidate gained """
+    def exact(votes):
+        return decimal.Decimal(str(votes))
+
+    results = ut_data['results']
+    for round_i, round_data in enumerate(results[:-1]):
+        next_tally = results[round_i + 1]['tally']
+        gained = {}
+        for tally_result in round_data['tallyResults']:
+            for name, votes in tally_result.get('transfers', {}).items():
+                gained[name] = gained.get(name, 0) + exact(votes)
+        for name, votes in gained.items():
+            assert votes == exact(next_tally[name]) - exact(round_data['tally'][name])
+
+
+def test_decimal_places():
+    """ Precision is found from how the number was written """
+    assert arithmetic.decimal_places(5) == 0
+    assert arithmetic.decimal_places(5.0) == 0
+    assert arithmetic.decimal_places('5') == 0
+    assert arithmetic.decimal_places('5.250') == 3
+    assert arithmetic.decimal_places(0.1) == 1
+    assert arithmetic.decimal_places(1e-7) == 7
+
+
+def test_parse_and_split():
+    """ Parsing rejects extra decimal places, and splits add up exactly """
+    backend = arithmetic.FixedPointArithmetic(2)
+    assert backend.parse('1.25') == 125
+    assert backend.parse(0.1) == 10
+    assert backend.parse(3) == 300
+    with pytest.raises(ValueError):
+        backend.parse('1.255')
+
+    assert backend.split(100, [1, 1, 1], 3) == [0.34, 0.33, 0.33]
+    assert sum(arithmetic.FixedPointArithmetic(0).split(1000, [7, 3, 5, 11], 26)) == 1000
+
+    with pytest.raises(ValueError):
+        arithmetic.create('decimal', None, [])
+
+
+def test_fixed_matches_float_on_single_transfers():
+    """ Without batch eliminations there is nothing to round, so both backends agree """
+    election = SyntheticElection(seed=3, num_candidates=30, num_seats=3, surpluses=False)
+    data = election.to_ut(with_transfers=False)
+    floats = UTWithoutTransfersConverter().convert_to_ut(copy.deepcopy(data))
+    fixed = UTWithoutTransfersConverter(numeric='fixed').convert_to_ut(copy.deepcopy(data))
+    assert floats == fixed
+
+    opavote_data = json.dumps(election.to_opavote()).encode()
+    with open('testdata/inputs/opavote11/2022-example.json', 'rb') as file_obj:
+        for data in (opavote_data, file_obj.read()):
+            fixed = opavote.OpavoteConverter(numeric='fixed').convert_to_ut_and_validate(data)
+            assert fixed == opavote.OpavoteConverter().convert_to_ut_and_validate(data)
+
+
+def test_fixed_transfers_are_exact():
+    """ Fractional and batch-elimination transfers add up, without floating point drift """
+    filename = 'testdata/inputs/electionbuddy/multiwinner.csv'
+    converted = electionbuddy.ElectionBuddyConverter(numeric='fixed') \
+        .convert_to_ut_and_validate(filename)
+    assert converted['results'][0]['tallyResults'][0]['transfers'] == {'Nancy Harris': 0.33}
+
+    converter = UTWithoutTransfersConverter(numeric='fixed')
+    for filename in ('testdata/inputs/ut-without-transfers/nyc-batch-elim.json',
+                     'testdata/inputs/ut-without-transfers/with-decimals.json'):
+        first = converter.convert_to_ut_and_validate(filename)
+        _assert_transfers_add_up(first)
+        assert json.dumps(first) == json.dumps(converter.convert_to_ut_and_validate(filename))
+
+    election = SyntheticElection(seed=4, num_candidates=40, num_seats=3, batch_eliminations=True)
+    _assert_transfers_add_up(converter.convert_to_ut(election.to_ut(with_transfers=False)))
+
+
+def test_fixed_precision_can_be_set():
+    """ Tallies more precise than the given precision are rejected """
+    data = {'config': {'contest': 'c'}, 'results': [
+        {'round': 1, 'tally': {'A': '10.5', 'B': '3.25'},
+         'tallyResults': [{'eliminated': 'B'}]},
+        {'round': 2, 'tally': {'A': '13.75'}, 'tallyResults': [{'elected': 'A'}]}]}
+    converted = UTWithoutTransfersConverter(numeric='fixed', precision=3).convert_to_ut(
+        copy.deepcopy(data))
+    assert converted['results'][0]['tallyResults'][0]['transfers'] == {'A': 3.25}
+
+    converter = UTWithoutTransfersConverter(numeric='fixed', precision=1)
+    with pytest.raises(CouldNotConvertException):
+        converter.convert_to_ut(copy.deepcopy(data))
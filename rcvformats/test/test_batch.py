@@ -0,0 +1,183 @@
+"""
+Tests for resumable batch conversion
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from rcvformats.bin import cli
+from rcvformats.conversions import automatic
+from rcvformats.conversions import batch
+
+INPUTS = ['testdata/inputs/electionbuddy/standard.csv',
+          'testdata/inputs/opavote11/2022-example.json',
+          'testdata/inputs/dominion.txt']
+
+
+@pytest.fixture(name='inputs')
+def fixture_inputs(tmp_path):
+    """ Copies of the inputs, which tests may change, and a file which cannot convert """
+    directory = tmp_path / 'inputs'
+    directory.mkdir()
+    copies = []
+    for filename in INPUTS:
+        copies.append(str(directory / os.path.basename(filename)))
+        shutil.copyfile(filename, copies[-1])
+    copies.append(str(directory / 'not-results.txt'))
+    shutil.copyfile('README.md', copies[-1])
+    return copies
+
+
+# What a first run does with the inputs
+FIRST_OUTCOMES = [batch.CONVERTED] * 3 + [batch.FAILED]
+
+
+def test_convert_batch(tmp_path, inputs):
+    """ Each output matches converting the input on its own, and the journal says where """
+    output_directory = str(tmp_path / 'out')
+    outcomes = batch.convert_batch(inputs, output_directory)
+    assert list(outcomes.values()) == FIRST_OUTCOMES
+
+    converter = automatic.AutomaticConverter()
+    with batch.BatchJournal(os.path.join(output_directory, batch.JOURNAL_FILENAME)) as journal:
+        for filename in inputs[:3]:
+            entry = journal.get(filename)
+            assert entry['status'] == batch.DONE
+            with open(entry['output'], encoding='utf-8') as file_obj:
+                assert json.load(file_obj) == converter.convert_to_ut(filename)
+        failure, = journal.entries(batch.FAILED)
+        assert failure['input'] == inputs[3]
+        assert 'CouldNotConvertException' in failure['error']
+
+
+def test_resume_skips_unchanged_inputs(tmp_path, inputs):
+    """ Rerunning converts only what changed, or was never finished """
+    output_directory = str(tmp_path / 'out')
+    batch.convert_batch(inputs, output_directory)
+    assert list(batch.convert_batch(inputs, output_directory).values()) == \
+        [batch.SKIPPED] * 4
+
+    # Touched but unchanged files are hashed, and still skipped
+    os.utime(inputs[0], ns=(0, 0))
+    # Changed files are converted again
+    with open(inputs[1], 'a', encoding='utf-8') as file_obj:
+        file_obj.write('\n')
+    # As are files whose output has gone
+    with batch.BatchJournal(os.path.join(output_directory, batch.JOURNAL_FILENAME)) as journal:
+        os.remove(journal.get(inputs[2])['output'])
+
+    outcomes = batch.convert_batch(inputs, output_directory)
+    assert list(outcomes.values()) == \
+        [batch.SKIPPED, batch.CONVERTED, batch.CONVERTED, batch.SKIPPED]
+    assert list(batch.convert_batch(inputs, output_directory).values()) == \
+        [batch.SKIPPED] * 4
+
+
+def test_retry_failed(tmp_path, inputs):
+    """ Failures are only retried when asked to """
+    output_directory = str(tmp_path / 'out')
+    batch.convert_batch(inputs, output_directory)
+    outcomes = batch.convert_batch(inputs, output_directory, retry_failed=True)
+    assert list(outcomes.values()) == [batch.SKIPPED] * 3 + [batch.FAILED]
+
+
+def test_claims(tmp_path, inputs):
+    """ Inputs claimed by another worker are left to it, unless it has gone quiet """
+    output_directory = str(tmp_path / 'out')
+    journal_filename = str(tmp_path / 'journal.sqlite3')
+    with batch.BatchJournal(journal_filename) as journal:
+        assert journal.claim(inputs[0], 'other-worker') == (True, None)
+        assert journal.claim(inputs[0], 'yet-another-worker')[0] is False
+
+    outcomes = batch.convert_batch(inputs[:2], output_directory, journal_filename)
+    assert list(outcomes.values()) == [batch.BUSY, batch.CONVERTED]
+
+    # A worker which died mid-conversion leaves its claim to go stale
+    with batch.BatchJournal(journal_filename, stale_after=0) as journal:
+        time.sleep(0.01)
+        assert journal.claim(inputs[0], 'restarted-worker')[0] is True
+        assert journal.get(inputs[0])['worker'] == 'restarted-worker'
+
+    # ...or at once, if it was on this machine and its process is gone
+    with subprocess.Popen([sys.executable, '-c', '']) as process:
+        process.wait()
+    dead_worker = f"{socket.gethostname()}:{process.pid}"
+    with batch.BatchJournal(journal_filename) as journal:
+        assert journal.claim(inputs[1], dead_worker)[0] is True
+        assert journal.claim(inputs[1], 'restarted-worker')[0] is True
+        assert journal.claim(inputs[1], f"{socket.gethostname()}:{os.getpid()}")[0] is False
+
+
+def test_stopped_worker_releases_its_claim(tmp_path, inputs, monkeypatch):
+    """ Stopping a batch mid-conversion leaves the input as it was, for a resumed batch """
+    output_directory = str(tmp_path / 'out')
+    batch.convert_batch(inputs[3:], output_directory)
+
+    def interrupt(*_):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(automatic.AutomaticConverter, 'convert_to_ut', interrupt)
+    for filenames in (inputs[3:], inputs[:1]):
+        with pytest.raises(KeyboardInterrupt):
+            batch.convert_batch(filenames, output_directory, retry_failed=True)
+    monkeypatch.undo()
+
+    with batch.BatchJournal(os.path.join(output_directory, batch.JOURNAL_FILENAME)) as journal:
+        assert journal.get(inputs[3])['status'] == batch.FAILED
+        assert journal.get(inputs[0]) is None
+    outcomes = batch.convert_batch(inputs, output_directory, retry_failed=True)
+    assert list(outcomes.values()) == FIRST_OUTCOMES
+
+
+def test_missing_inputs_fail(tmp_path, inputs):
+    """ An input which cannot be read fails, rather than the whole batch """
+    missing = str(tmp_path / 'inputs' / 'missing.csv')
+    outcomes = batch.convert_batch([missing] + inputs, str(tmp_path / 'out'))
+    assert list(outcomes.values()) == [batch.FAILED] + FIRST_OUTCOMES
+    with batch.BatchJournal(str(tmp_path / 'out' / batch.JOURNAL_FILENAME)) as journal:
+        assert journal.get(missing)['error'].startswith('FileNotFoundError: ')
+
+
+def test_workers_share_the_batch(tmp_path, inputs):
+    """ Worker processes give the same outcomes and outputs """
+    outcomes = batch.convert_batch(inputs, str(tmp_path / 'out'), max_workers=2)
+    assert list(outcomes.values()) == FIRST_OUTCOMES
+    outputs = [filename for filename in os.listdir(tmp_path / 'out') if filename.endswith('.json')]
+    assert sorted(outputs) == sorted(batch.output_filename_for(filename) for filename in inputs[:3])
+
+
+def test_journal_opened_once(tmp_path, inputs, monkeypatch):
+    """ One journal connection is used for every input, rather than one per input """
+    opened = []
+
+    class _CountingJournal(batch.BatchJournal):
+        def __init__(self, *args, **kwargs):
+            opened.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(batch, 'BatchJournal', _CountingJournal)
+    outcomes = batch.convert_batch(inputs, str(tmp_path / 'out'))
+    assert list(outcomes.values()) == FIRST_OUTCOMES
+    assert len(opened) == 1
+
+
+def test_output_filenames():
+    """ Outputs are named after their input, and differ for inputs of the same name """
+    assert batch.output_filename_for('a/results.json.gz').startswith('results-')
+    assert batch.output_filename_for('a/results.json') != \
+        batch.output_filename_for('b/results.json')
+
+
+def test_cli(tmp_path, inputs, capsys):
+    """ Directories are walked, and a summary printed """
+    output_directory = str(tmp_path / 'out')
+    cli.convert_batch([os.path.dirname(inputs[0])], output_directory, None, None, False)
+    assert 'Converted 3 files' in capsys.readouterr().out
+    cli.convert_batch([os.path.dirname(inputs[0])], output_directory, None, None, False)
+    assert 'skipped 4 unchanged' in capsys.readouterr().out
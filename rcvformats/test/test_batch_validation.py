@@ -0,0 +1,118 @@
+"""
+Tests for validating many files at once
+"""
+
+import gzip
+import json
+import shutil
+
+import pytest
+
+from rcvformats.bin import cli
+from rcvformats.schemas import batch
+
+INPUTS = {'testdata/inputs/universal-tabulator/simple.json': 'ut',
+          'testdata/inputs/electionbuddy/standard.csv': 'eb',
+          'testdata/inputs/opavote11/2022-example.json': 'ov11',
+          'testdata/inputs/dominion.txt': None}
+
+
+def _without_timings(report):
+    for file_report in report['files']:
+        del file_report['seconds']
+    del report['summary']['seconds']
+    return report
+
+
+def test_detects_schemas():
+    """ Each file is validated against the schema it is valid under """
+    report = batch.validate_batch(INPUTS)
+    assert [file_report['schema'] for file_report in report['files']] == list(INPUTS.values())
+    assert [file_report['valid'] for file_report in report['files']] == [True] * 3 + [False]
+    assert report['files'][3]['error'] == batch.UNRECOGNIZED
+    assert all(file_report['seconds'] >= 0 for file_report in report['files'])
+
+    summary = report['summary']
+    assert (summary['total'], summary['valid'], summary['invalid']) == (4, 3, 1)
+    assert summary['schemas'] == {'ut': {'valid': 1, 'invalid': 0},
+                                  'eb': {'valid': 1, 'invalid': 0},
+                                  'ov11': {'valid': 1, 'invalid': 0},
+                                  'unrecognized': {'valid': 0, 'invalid': 1}}
+
+
+def test_guesses_schemas(tmp_path):
+    """ Guessing sees past byte order marks and encodings, and tells OpaVote versions apart """
+    with open('testdata/inputs/universal-tabulator/simple.json', 'r', encoding='utf-8') as file_obj:
+        invalid_ut = json.load(file_obj)
+    invalid_ut['results'][0]['tally'] = 'none'
+    ut_text = json.dumps(invalid_ut)
+    files = {'ut-utf16.json': ut_text.encode('utf-16'),
+             'ut-utf32.json': ut_text.encode('utf-32'),
+             'bom.xml': b'\xef\xbb\xbf<?xml version="1.0"?><results/>'}
+    for filename, contents in files.items():
+        (tmp_path / filename).write_bytes(contents)
+
+    report = batch.validate_batch([str(tmp_path / 'ut-utf16.json'),
+                                   str(tmp_path / 'ut-utf32.json'),
+                                   str(tmp_path / 'bom.xml'),
+                                   'testdata/inputs/opavote10/fairvote.json',
+                                   'testdata/inputs/opavote11/2022-example.json'])
+    assert [file_report['schema'] for file_report in report['files']] == \
+        ['ut', 'ut', None, 'ov10', 'ov11']
+    assert [file_report['valid'] for file_report in report['files']] == \
+        [False, False, False, True, True]
+    assert report['files'][2]['error'] == batch.UNRECOGNIZED
+    assert report['summary']['schemas']['ov10'] == {'valid': 1, 'invalid': 0}
+
+
+def test_reports_every_issue(tmp_path):
+    """ Invalid files list every problem, under the schema they most look like """
+    with open('testdata/inputs/universal-tabulator/simple.json', encoding='utf-8') as file_obj:
+        data = json.load(file_obj)
+    data['config']['threshold'] = ''
+    del data['results'][1]['round']
+    filename = str(tmp_path / 'edited.json.gz')
+    with gzip.open(filename, 'wt', encoding='utf-8') as file_obj:
+        json.dump(data, file_obj)
+
+    file_report, = batch.validate_batch([filename])['files']
+    assert file_report['schema'] == 'ut'
+    assert not file_report['valid']
+    assert [issue['path'] for issue in file_report['issues']] == \
+        [['config', 'threshold'], ['results', 1]]
+    assert file_report['issues'][1]['round'] == 2
+    assert file_report['error'].startswith('config/threshold: ')
+
+
+def test_given_schema():
+    """ A schema given is used for every file """
+    report = batch.validate_batch(list(INPUTS)[:2], 'ut')
+    assert [file_report['valid'] for file_report in report['files']] == [True, False]
+    assert report['files'][1]['schema'] == 'ut'
+    with pytest.raises(ValueError):
+        batch.validate_batch(INPUTS, 'dominion')
+
+
+def test_workers_give_the_same_report():
+    """ Validating in worker processes changes nothing but the timings """
+    filenames = list(INPUTS) * 20 + ['no-such-file.json']
+    assert _without_timings(batch.validate_batch(filenames, max_workers=2)) == \
+        _without_timings(batch.validate_batch(filenames))
+
+
+def test_cli(tmp_path, capsys):
+    """ Directories are walked, and the report written as JSON """
+    directory = tmp_path / 'inputs'
+    directory.mkdir()
+    shutil.copyfile('testdata/inputs/electionbuddy/standard.csv', directory / 'standard.csv')
+    shutil.copyfile('README.md', directory / 'README.md')
+
+    report_filename = str(tmp_path / 'report.json')
+    report = cli.validate_batch([str(directory)], None, None, report_filename)
+    with open(report_filename, encoding='utf-8') as file_obj:
+        assert json.load(file_obj) == report
+    assert report['summary']['valid'] == 1
+    assert '1 of 2 files are valid' in capsys.readouterr().err
+
+    cli.validate_batch([str(directory)], cli.FormatEnum.EB, None, None, compact=True)
+    assert json.loads(capsys.readouterr().out)['summary']['invalid'] == 1
@@ -0,0 +1,85 @@
+"""
+Tests that in-memory buffers can be converted and validated like files
+"""
+
+import mmap
+
+import pytest
+
+from rcvformats.common import buffers
+from rcvformats.conversions import automatic
+from rcvformats.conversions import dominion_txt
+from rcvformats.conversions import dominion_xlsx
+from rcvformats.conversions import electionbuddy
+from rcvformats.conversions import opavote
+from rcvformats.conversions.base import CouldNotOpenFileException
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+from rcvformats.schemas import electionbuddy as electionbuddy_schema
+from rcvformats.schemas import universaltabulator
+
+CONVERSIONS = [
+    (dominion_xlsx.DominionXlsxConverter, 'testdata/inputs/dominion_xlsx/v5_17_multi.xlsx'),
+    (dominion_txt.DominionTxtConverter, 'testdata/inputs/dominion.txt'),
+    (electionbuddy.ElectionBuddyConverter, 'testdata/inputs/electionbuddy/multiwinner.csv'),
+    (opavote.OpavoteConverter, 'testdata/inputs/opavote11/2022-example.json'),
+    (UTWithoutTransfersConverter, 'testdata/inputs/ut-without-transfers/with-decimals.json'),
+    (automatic.AutomaticConverter, 'testdata/inputs/electionbuddy/standard.csv'),
+]
+
+
+def _each_buffer_of(filename):
+    """ Yields the file contents as every supported type of buffer """
+    with open(filename, 'rb') as file_object:
+        contents = file_object.read()
+        yield contents
+        yield bytearray(contents)
+        yield memoryview(contents)
+        yield memoryview(b'--' + contents + b'--')[2:-2]
+        with mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+@pytest.mark.parametrize('converter_type,filename', CONVERSIONS)
+def test_buffers_convert_like_files(converter_type, filename):
+    """ Each type of buffer gives the same result as the file """
+    expected = converter_type().convert_to_ut_and_validate(filename)
+    for buffer in _each_buffer_of(filename):
+        assert converter_type().convert_to_ut_and_validate(buffer) == expected
+
+
+def test_buffers_validate_like_files():
+    """ Schemas accept buffers, and give the same errors """
+    cases = [(universaltabulator.SchemaV0, f) for f in (
+        'testdata/inputs/universal-tabulator/macomb-multiwinner.json',
+        'testdata/inputs/opavote11/2022-example.json')]
+    cases += [(electionbuddy_schema.SchemaV0, 'testdata/inputs/electionbuddy/standard.csv')]
+    for schema_type, filename in cases:
+        schema = schema_type()
+        is_valid = schema.validate(filename)
+        error = str(schema.last_error())
+        for buffer in _each_buffer_of(filename):
+            assert schema.validate(buffer) == is_valid
+            assert str(schema.last_error()) == error
+
+
+def test_buffer_reader():
+    """ Reads, seeks and reads lines like BytesIO """
+    contents = b'first line\n' + b'x' * 1000 + b'\nlast line'
+    reader = buffers.BufferReader(bytearray(contents))
+    assert reader.readline() == b'first line\n'
+    assert reader.readline(10) == b'x' * 10
+    assert len(reader.readline()) == 991
+    assert reader.readline() == b'last line'
+    assert reader.readline() == b''
+    reader.seek(-4, 2)
+    assert reader.read() == b'line'
+    reader.seek(0)
+    assert list(reader) == contents.splitlines(keepends=True)
+
+
+def test_unsupported_input_raises():
+    """ Anything which is not data, a file or a buffer is an error, not None """
+    with pytest.raises(CouldNotOpenFileException):
+        opavote.OpavoteConverter().convert_to_ut('testdata/does-not-exist.json')
+    with pytest.raises(CouldNotOpenFileException):
+        opavote.OpavoteConverter().convert_to_ut(12)
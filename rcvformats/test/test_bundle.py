@@ -0,0 +1,96 @@
+"""
+Tests for multi-contest bundle files
+"""
+
+import json
+import struct
+
+import pytest
+
+from rcvformats.common import bundle
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions.dominion_multi_converter import DominionMultiConverter
+
+MULTI_FILE = 'testdata/inputs/dominion-multi-converter.xml'
+
+
+def _contests(seeds):
+    return {f'Contest {seed}': SyntheticElection(seed=seed).to_ut() for seed in seeds}
+
+
+def test_round_trip(tmp_path):
+    """ Every contest reads back as written, in order, and the JSON is compact """
+    filename = tmp_path / 'contests.bundle'
+    contests = _contests(range(5))
+    with bundle.BundleWriter(filename) as writer:
+        writer.add_many(contests)
+
+    with bundle.BundleReader(filename) as reader:
+        assert len(reader) == 5
+        assert list(reader) == list(contests)
+        assert 'Contest 3' in reader and 'Contest 5' not in reader
+        assert reader['Contest 3'] == contests['Contest 3']
+        assert dict(reader.items()) == contests
+        assert reader.read_bytes('Contest 0') == \
+            json.dumps(contests['Contest 0'], separators=(',', ':')).encode('utf-8')
+        with pytest.raises(KeyError):
+            reader['Contest 5']  # pylint: disable=pointless-statement
+
+
+def test_append(tmp_path):
+    """ Appending keeps the existing contests, and refuses duplicate ids """
+    filename = tmp_path / 'contests.bundle'
+    with bundle.BundleWriter(filename, append=True) as writer:
+        writer.add_many(_contests(range(2)))
+    with bundle.BundleWriter(filename, append=True) as writer:
+        writer.add_many(_contests(range(2, 4)))
+        with pytest.raises(ValueError):
+            writer.add('Contest 0', {})
+
+    with bundle.BundleReader(filename) as reader:
+        assert dict(reader.items()) == _contests(range(4))
+
+    with bundle.BundleWriter(filename) as writer:
+        writer.add_many(_contests([9]))
+    with bundle.BundleReader(filename) as reader:
+        assert list(reader) == ['Contest 9']
+
+
+def test_interrupted_append_keeps_old_index(tmp_path):
+    """ Until an append is closed, the bundle still reads as it was before """
+    filename = tmp_path / 'contests.bundle'
+    with bundle.BundleWriter(filename) as writer:
+        writer.add_many(_contests(range(2)))
+
+    writer = bundle.BundleWriter(filename, append=True)
+    writer.add_many(_contests(range(2, 4)))
+    writer.file_object.flush()
+    with bundle.BundleReader(filename) as reader:
+        assert dict(reader.items()) == _contests(range(2))
+    writer.close()
+
+
+def test_invalid_files(tmp_path):
+    """ Files which are not complete bundles are rejected """
+    not_bundle = tmp_path / 'not.bundle'
+    not_bundle.write_bytes(b'{"config": {}}' * 4)
+    with pytest.raises(ValueError):
+        bundle.BundleReader(not_bundle)
+
+    unclosed = tmp_path / 'unclosed.bundle'
+    unclosed.write_bytes(struct.pack('<8sQQ', bundle.MAGIC, 0, 0))
+    with pytest.raises(ValueError):
+        bundle.BundleReader(unclosed)
+
+
+def test_explode_to_bundle(tmp_path):
+    """ The multi-converter can write every contest to a single bundle """
+    filename = tmp_path / 'multi.bundle'
+    with open(MULTI_FILE, 'rb') as file_object:
+        titles = DominionMultiConverter.explode_to_bundle(file_object, filename)
+    with open(MULTI_FILE, 'rb') as file_object:
+        expected = DominionMultiConverter.convert_to_ut_per_contest(file_object)
+
+    assert titles == list(expected)
+    with bundle.BundleReader(filename) as reader:
+        assert dict(reader.items()) == expected
@@ -0,0 +1,90 @@
+"""
+Tests for the columnar export and its loaders
+"""
+
+import glob
+import json
+import math
+
+import numpy as np
+
+from rcvformats.common import columnar
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions.opavote import OpavoteConverter
+
+
+def _ut_files():
+    return glob.glob('testdata/conversions/*.json') + \
+        glob.glob('testdata/inputs/universal-tabulator/*.json')
+
+
+def _assert_matches_ut(election, data):
+    """ Every tally, elected and eliminated candidate and transfer is in the arrays """
+    names = election.candidates.tolist()
+    assert election.config == data['config']
+    assert election.num_rounds == len(data['results'])
+
+    transfers = set()
+    for round_i, round_data in enumerate(data['results']):
+        row = election.votes[round_i]
+        assert {names[i]: v for i, v in enumerate(row.tolist()) if not math.isnan(v)} == \
+            {name: float(votes) for name, votes in round_data['tally'].items()}
+        for tally_result in round_data['tallyResults']:
+            name = tally_result.get('elected', tally_result.get('eliminated'))
+            rounds = election.elected_round if 'elected' in tally_result \
+                else election.eliminated_round
+            assert rounds[names.index(name)] == round_data['round']
+            for to_name, votes in tally_result.get('transfers', {}).items():
+                transfers.add((round_data['round'], name, to_name, float(votes)))
+
+    assert transfers == set(zip(
+        election.transfer_round.tolist(),
+        [names[i] for i in election.transfer_from.tolist()],
+        [names[i] for i in election.transfer_to.tolist()],
+        election.transfer_votes.tolist()))
+
+
+def _assert_same(first, second):
+    assert first.config == second.config
+    for name in columnar._ARRAY_NAMES:  # pylint: disable=protected-access
+        np.testing.assert_array_equal(getattr(first, name), getattr(second, name))
+
+
+def test_from_ut_matches():
+    """ The arrays hold the same results as the nested dicts """
+    for filename in _ut_files():
+        with open(filename, 'r', encoding='utf-8') as file_object:
+            data = json.load(file_object)
+        _assert_matches_ut(columnar.ColumnarElection.from_ut_dict(data), data)
+
+    data = OpavoteConverter().convert_to_ut('testdata/inputs/opavote11/2022-example.json')
+    election = OpavoteConverter().convert_to_columnar(
+        'testdata/inputs/opavote11/2022-example.json')
+    _assert_matches_ut(election, data)
+
+    matrix = election.transfer_matrix(1)
+    names = election.candidates.tolist()
+    for to_name, votes in data['results'][0]['tallyResults'][0]['transfers'].items():
+        assert matrix[names.index('BBB'), names.index(to_name)] == votes
+
+
+def test_save_and_load(tmp_path):
+    """ npz files are memory-mapped when loaded, and CSVs load back the same """
+    data = SyntheticElection(seed=6, num_candidates=50, num_seats=3).to_ut()
+    election = columnar.ColumnarElection.from_ut_dict(data)
+
+    npz_filename = str(tmp_path / 'election.npz')
+    election.save_npz(npz_filename)
+    mapped = columnar.load_npz(npz_filename)
+    assert isinstance(mapped.votes, np.memmap)
+    _assert_same(mapped, election)
+    _assert_same(columnar.load_npz(npz_filename, mmap=False), election)
+
+    election.save_csv(str(tmp_path / 'csv'))
+    _assert_same(columnar.load_csv(str(tmp_path / 'csv')), election)
+
+    one_round = {'config': {'contest': 'c'}, 'results': [
+        {'round': 1, 'tally': {'A': 3}, 'tallyResults': [{'elected': 'A'}]}]}
+    without_transfers = columnar.ColumnarElection.from_ut_dict(one_round)
+    without_transfers.save_npz(npz_filename)
+    _assert_same(columnar.load_npz(npz_filename), without_transfers)
@@ -0,0 +1,86 @@
+"""
+Tests for reading and writing compressed files
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+
+import pytest
+
+from rcvformats.bin import cli
+from rcvformats.common import compression
+from rcvformats.conversions import automatic
+from rcvformats.conversions import dominion_txt
+from rcvformats.conversions import dominion_xlsx
+from rcvformats.conversions import electionbuddy
+from rcvformats.conversions import opavote
+from rcvformats.schemas import universaltabulator
+
+COMPRESSORS = {'.gz': gzip.compress, '.bz2': bz2.compress, '.xz': lzma.compress}
+
+CONVERSIONS = [
+    (dominion_xlsx.DominionXlsxConverter, 'testdata/inputs/dominion_xlsx/las-cruces-mayor.xlsx'),
+    (dominion_txt.DominionTxtConverter, 'testdata/inputs/dominion.txt'),
+    (electionbuddy.ElectionBuddyConverter, 'testdata/inputs/electionbuddy/standard.csv'),
+    (opavote.OpavoteConverter, 'testdata/inputs/opavote10/fairvote.json'),
+    (automatic.AutomaticConverter, 'testdata/inputs/opavote11/2022-example.json'),
+    (automatic.AutomaticConverter, 'testdata/inputs/universal-tabulator/macomb-multiwinner.json'),
+]
+
+
+def _compress_to(tmp_path, filename, extension):
+    """ Writes a compressed copy of filename, named without a hint of its compression """
+    with open(filename, 'rb') as file_object:
+        compressed = COMPRESSORS[extension](file_object.read())
+    compressed_filename = tmp_path / ('input' + extension.replace('.', '_'))
+    compressed_filename.write_bytes(compressed)
+    return str(compressed_filename), compressed
+
+
+@pytest.mark.parametrize('converter_type,filename', CONVERSIONS)
+def test_compressed_inputs_convert(tmp_path, converter_type, filename):
+    """ Compression is recognized from the contents, in files, file objects and buffers """
+    expected = converter_type().convert_to_ut_and_validate(filename)
+    for extension in COMPRESSORS:
+        compressed_filename, compressed = _compress_to(tmp_path, filename, extension)
+        assert converter_type().convert_to_ut_and_validate(compressed_filename) == expected
+        assert converter_type().convert_to_ut_and_validate(compressed) == expected
+        with open(compressed_filename, 'rb') as file_object:
+            assert converter_type().convert_to_ut_and_validate(file_object) == expected
+
+
+def test_compressed_inputs_validate(tmp_path):
+    """ Schemas give the same results and errors for compressed files """
+    schema = universaltabulator.SchemaV0()
+    for filename in ('testdata/inputs/universal-tabulator/macomb-multiwinner.json',
+                     'testdata/inputs/opavote11/2022-example.json'):
+        is_valid = schema.validate(filename)
+        error = str(schema.last_error())
+        for extension in COMPRESSORS:
+            compressed_filename, _ = _compress_to(tmp_path, filename, extension)
+            assert schema.validate(compressed_filename) == is_valid
+            assert str(schema.last_error()) == error
+
+
+def test_sniff():
+    """ Only the magic bytes matter, and the position is left unchanged """
+    with open('testdata/inputs/opavote10/fairvote.json', 'rb') as file_object:
+        assert compression.sniff(file_object) is None
+        assert file_object.tell() == 0
+    with open('testdata/inputs/opavote10/fairvote.json', 'r', encoding='utf-8') as file_object:
+        assert compression.sniff(file_object) is None
+
+
+def test_cli_writes_compressed_output(tmp_path):
+    """ The output is compressed according to its extension """
+    input_filename = 'testdata/inputs/opavote11/2022-example.json'
+    expected = automatic.AutomaticConverter().convert_to_ut(input_filename)
+    for extension, opener in (('.gz', gzip.open), ('.bz2', bz2.open),
+                              ('.xz', lzma.open), ('', open)):
+        output_filename = str(tmp_path / ('output.json' + extension))
+        compressed_input, _ = _compress_to(tmp_path, input_filename, '.gz')
+        cli.convert(compressed_input, output_filename)
+        with opener(output_filename, 'rt', encoding='utf-8') as file_object:
+            assert json.load(file_object) == expected
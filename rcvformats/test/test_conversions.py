@@ -2,9 +2,12 @@
 Integration tests for conversions between file formats
 """
 
+import copy
 import os
 import json
 
+import pytest
+
 from rcvformats.conversions import automatic
 from rcvformats.conversions import dominion_multi_converter
 from rcvformats.conversions import dominion_txt
@@ -220,6 +223,59 @@ def test_add_xfer_accepts_json():
     assert not _does_all_batch_elim_have_transfer_data(with_transfers)
 
 
+def test_add_xfer_to_new_rounds():
+    """ Filling in rounds as they are added gives the same result as filling in all at once """
+    converter = UTWithoutTransfersConverter(allow_guessing=True)
+    input_filename = 'testdata/inputs/ut-without-transfers/nyc-batch-elim.json'
+    with open(input_filename, 'r', encoding='utf-8') as file_obj:
+        original = json.load(file_obj)
+    expected = converter.fill_in_tally_data(copy.deepcopy(original))
+
+    # Start with three rounds
+    live = copy.deepcopy(original)
+    live['results'] = live['results'][:3]
+    live = converter.fill_in_tally_data(live)
+
+    # Then resend the third round with a fourth, and then add the rest
+    live = converter.fill_in_new_rounds(live, copy.deepcopy(original['results'][2:4]))
+    assert live['results'][:3] == expected['results'][:3]
+    live = converter.fill_in_new_rounds(live, copy.deepcopy(original['results'][4:]))
+    assert live == expected
+
+    with pytest.raises(ValueError):
+        converter.fill_in_new_rounds(live, copy.deepcopy(original['results'][2:3]) * 2)
+
+
+def test_add_xfer_without_mutating():
+    """ The pure variants match the in-place ones, and share whatever did not change """
+    converter = UTWithoutTransfersConverter(allow_guessing=True)
+    for input_filename in ('testdata/inputs/ut-without-transfers/nyc-batch-elim.json',
+                           'testdata/inputs/ut-without-transfers/with-decimals.json'):
+        with open(input_filename, 'r', encoding='utf-8') as file_obj:
+            original = json.load(file_obj)
+        untouched = copy.deepcopy(original)
+        expected = converter.fill_in_tally_data(copy.deepcopy(original))
+
+        filled = converter.filled_in_tally_data(original)
+        assert original == untouched
+        assert filled == expected
+        assert filled['config'] is original['config']
+
+        # Float tallies are already in their final form, so are shared too
+        filled_again = converter.filled_in_tally_data(filled)
+        assert filled_again == expected
+        assert all(new['tally'] is old['tally']
+                   for new, old in zip(filled_again['results'], filled['results']))
+
+        # Rounds before the recomputed ones are shared
+        first_rounds = converter.filled_in_tally_data(
+            dict(original, results=original['results'][:3]))
+        live = converter.with_new_rounds(first_rounds, original['results'][3:])
+        assert original == untouched
+        assert live == expected
+        assert all(new is old for new, old in zip(live['results'][:2], first_rounds['results']))
+
+
 def test_explode_multi_format():
     """ Test the single Dominion XML turns into 25 RCTab JSONs """
     converter = dominion_multi_converter.DominionMultiConverter()
@@ -0,0 +1,150 @@
+"""
+Tests for tabulating ballot-level cast vote records
+"""
+
+import gzip
+import io
+import random
+
+import numpy as np
+import pytest
+
+from rcvformats.common.ballots import NO_RANKING, RankedBallots
+from rcvformats.conversions.base import CouldNotConvertException
+from rcvformats.conversions.cvr import CvrCsvConverter
+from rcvformats.schemas import universaltabulator
+
+
+def _random_rankings(seed, num_ballots, num_candidates=6, max_ranks=4):
+    rng = random.Random(seed)
+    names = [f'Candidate {i}' for i in range(num_candidates)]
+    # Skew first choices, so that there are few ties
+    popularity = [rng.random() ** 2 for _ in names]
+    return [rng.sample(names, rng.randint(0, max_ranks)) if rng.random() > 0.3 else
+            rng.choices(names, popularity)[:1] + rng.sample(names, rng.randint(0, max_ranks - 1))
+            for _ in range(num_ballots)]
+
+
+def _irv_one_ballot_at_a_time(rankings):
+    """ A slow, obvious instant-runoff count, to check the vectorised one against """
+    continuing = list(dict.fromkeys(name for ranking in rankings for name in ranking))
+    rounds = []
+    while True:
+        tally = dict.fromkeys(continuing, 0)
+        for ranking in rankings:
+            choice = next((name for name in ranking if name in tally), None)
+            if choice is not None:
+                tally[choice] += 1
+        rounds.append(tally)
+        leader = max(tally, key=tally.get)
+        if len(tally) == 1 or tally[leader] * 2 > sum(tally.values()):
+            return rounds, leader
+        continuing.remove(min(reversed(continuing), key=tally.get))
+
+
+def test_simple_contest():
+    """ Transfers are exact, including to exhausted ballots, and the output is valid """
+    ballots = RankedBallots.from_rankings(
+        [['A', 'B'], ['A'], ['B', 'C'], ['C', 'B'], ['D', 'C'], ['D', None, 'A'], ['D']],
+        weights=[4, 1, 3, 3, 1, 1, 1])
+    data = CvrCsvConverter({'contest': 'Mayor', 'date': '2022-11-08'}).tabulate(ballots)
+    assert universaltabulator.SchemaV0().validate_schema_and_logic(data)
+    assert data['config'] == {'contest': 'Mayor', 'date': '2022-11-08', 'threshold': 7}
+    assert data['results'] == [
+        {'round': 1, 'tally': {'A': 5, 'B': 3, 'C': 3, 'D': 3},
+         'tallyResults': [{'eliminated': 'D', 'transfers': {'A': 1, 'C': 1, 'exhausted': 1}}]},
+        {'round': 2, 'tally': {'A': 6, 'B': 3, 'C': 4},
+         'tallyResults': [{'eliminated': 'B', 'transfers': {'C': 3}}]},
+        {'round': 3, 'tally': {'A': 6, 'C': 7},
+         'tallyResults': [{'elected': 'C'}]}]
+
+
+def test_batch_elimination_transfers_are_exact():
+    """ Each candidate eliminated together has their own transfers, not a guess """
+    ballots = RankedBallots.from_rankings(
+        [['A'], ['B'], ['C', 'A'], ['D', 'B']], weights=[10, 9, 2, 1])
+    data = CvrCsvConverter(batch_elimination=True).tabulate(ballots)
+    assert data['results'][0]['tallyResults'] == [
+        {'eliminated': 'C', 'transfers': {'A': 2}},
+        {'eliminated': 'D', 'transfers': {'B': 1}}]
+    assert data['results'][1]['tally'] == {'A': 12, 'B': 10}
+
+    one_at_a_time = CvrCsvConverter().tabulate(ballots)
+    assert len(one_at_a_time['results']) == 3
+    assert one_at_a_time['results'][-1] == data['results'][-1] | {'round': 3}
+
+
+def test_ties_broken_by_earlier_rounds():
+    """ Tied for fewest votes, the candidate with fewer votes the round before goes """
+    ballots = RankedBallots.from_rankings(
+        [['A'], ['B'], ['C'], ['D', 'C'], ['E', 'B']], weights=[10, 4, 3, 2, 1])
+    results = CvrCsvConverter().tabulate(ballots)['results']
+    assert results[2]['tally'] == {'A': 10, 'B': 5, 'C': 5}
+    assert results[2]['tallyResults'][0]['eliminated'] == 'C'
+
+
+def test_matches_counting_one_ballot_at_a_time():
+    """ The vectorised count agrees with the obvious one on random contests """
+    for seed in range(20):
+        rankings = _random_rankings(seed, 300)
+        expected_rounds, expected_winner = _irv_one_ballot_at_a_time(rankings)
+        data = CvrCsvConverter().tabulate(RankedBallots.from_rankings(rankings))
+        assert universaltabulator.SchemaV0().validate_schema_and_logic(data)
+        assert [r['tally'] for r in data['results']] == expected_rounds
+        assert data['results'][-1]['tallyResults'] == [{'elected': expected_winner}]
+
+        # Every vote leaving a candidate arrives somewhere
+        for this_round, next_round in zip(data['results'], data['results'][1:]):
+            for tally_result in this_round['tallyResults']:
+                transfers = tally_result['transfers']
+                assert sum(transfers.values()) == this_round['tally'][tally_result['eliminated']]
+                for name, votes in transfers.items():
+                    if name != 'exhausted':
+                        assert next_round['tally'][name] >= this_round['tally'][name] + votes
+
+
+def test_csv():
+    """ Reads blank ranks, short rows, a count column and a byte order mark """
+    csv_text = '﻿Rank 1,Rank 2,Count\nA,B,3\n,B,2\nB\nC,A,1.5\n'
+    ballots = RankedBallots.from_csv(io.BytesIO(csv_text.encode('utf-8')))
+    assert ballots.candidates == ['A', 'B', 'C']
+    assert ballots.ranks.tolist() == [[0, 1], [NO_RANKING, 1], [1, NO_RANKING], [2, 0]]
+    assert ballots.weights.tolist() == [3, 2, 1, 1.5]
+
+    with pytest.raises(ValueError):
+        RankedBallots.from_csv(io.BytesIO(b''))
+
+
+def test_nothing_to_count():
+    """ Files without ballots, or without candidates, say so """
+    for csv_text, message in (('Rank 1,Rank 2\n', 'no ballots'),
+                              ('Rank 1,Rank 2,Count\n,,3\n,\n', 'no candidates')):
+        ballots = RankedBallots.from_csv(io.BytesIO(csv_text.encode('utf-8')))
+        with pytest.raises(ValueError, match=message):
+            CvrCsvConverter().tabulate(ballots)
+        with pytest.raises(CouldNotConvertException, match=message):
+            CvrCsvConverter().convert_to_ut(csv_text.encode('utf-8'))
+
+
+def test_convert_compressed_csv():
+    """ The converter reads a CSV file the same way as from_rankings """
+    rankings = _random_rankings(1, 500)
+    csv_text = 'Rank 1,Rank 2,Rank 3,Rank 4\n' + \
+        ''.join(','.join(ranking) + '\n' for ranking in rankings)
+    data = CvrCsvConverter().convert_to_ut_and_validate(gzip.compress(csv_text.encode('utf-8')))
+    assert data == CvrCsvConverter().tabulate(RankedBallots.from_rankings(rankings))
+
+
+def test_compressed_ballots():
+    """ Identical ballots are merged into one row, weighted by how many there were """
+    rankings = _random_rankings(2, 2000, num_candidates=4, max_ranks=2)
+    ballots = RankedBallots.from_rankings(rankings)
+    compressed = ballots.compressed()
+    assert len(compressed.ranks) < 30
+    assert compressed.num_ballots == 2000
+    for row, weight in zip(compressed.ranks.tolist(), compressed.weights.tolist()):
+        assert weight == sum(1 for other in ballots.ranks.tolist() if other == row)
+
+    # Ballots too long to key by a single integer are compared row by row instead
+    long_ballots = RankedBallots(['A', 'B'], np.zeros((5, 100), dtype=np.int32))
+    assert long_ballots.compressed().weights.tolist() == [5]
@@ -0,0 +1,100 @@
+"""
+Tests for reading JSON a chunk at a time
+"""
+
+import glob
+import io
+import json
+
+import pytest
+
+from rcvformats.common import jsonstream
+from rcvformats.common import profiling
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions.opavote import OpavoteConverter
+from rcvformats.schemas import universaltabulator
+
+
+def _load(text, chunk_size=3, **kwargs):
+    return jsonstream.load(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size, **kwargs)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, jsonstream.CHUNK_SIZE])
+def test_same_as_json_load(chunk_size):
+    """ Every JSON test file decodes exactly as json.load decodes it, whatever the chunks """
+    for filename in glob.glob('testdata/**/*.json', recursive=True):
+        with open(filename, 'rb') as file_object:
+            file_bytes = file_object.read()
+        assert jsonstream.load(io.BytesIO(file_bytes), chunk_size=chunk_size) == \
+            json.loads(file_bytes), filename
+
+
+@pytest.mark.parametrize('text', [
+    '12.5e3', ' -0.25 ', '[1, 22, 333.5e-1]', '{}', '{"a": []}', '"text"', 'null',
+    '{"a": [{"b": 1.5}, true], "c": {"d": [2]}, "e": -7}'])
+def test_values_split_across_chunks(text):
+    """ Numbers and literals split between chunks are read whole, in any encoding """
+    for chunk_size in (1, 2, 5):
+        assert _load(text, chunk_size) == json.loads(text)
+    assert jsonstream.load(io.BytesIO(text.encode('utf-16')), chunk_size=3) == json.loads(text)
+    assert jsonstream.load(io.BytesIO(text.encode('utf-8-sig')), chunk_size=3) == \
+        json.loads(text)
+
+
+def test_text_mode_files(tmp_path):
+    """ Files opened in text mode are read as they are, without detecting an encoding """
+    for text in ('{"a": [1, {"b": "\u00e9"}], "c": 2.5}', '[1, 22]', ' "text" '):
+        for chunk_size in (1, 4, jsonstream.CHUNK_SIZE):
+            assert jsonstream.load(io.StringIO(text), chunk_size=chunk_size) == json.loads(text)
+
+    filename = 'testdata/inputs/universal-tabulator/simple.json'
+    schema = universaltabulator.SchemaV0()
+    with open(filename, 'r', encoding='utf-8') as file_object:
+        assert schema.validate(io.StringIO(file_object.read()))
+    with open(filename, 'r', encoding='utf-8') as file_object:
+        assert schema.validate(file_object)
+
+    with open(filename, 'r', encoding='utf-8') as file_object:
+        data = json.load(file_object)
+    with open(tmp_path / 'in-utf16.json', 'w', encoding='utf-16') as file_object:
+        json.dump(data, file_object)
+    with open(tmp_path / 'in-utf16.json', 'r', encoding='utf-16') as file_object:
+        assert jsonstream.load(file_object, chunk_size=7) == data
+
+
+@pytest.mark.parametrize('text', [
+    '', '{', '{"a" 1}', '{"a": 1,}', '{"a": [1,]}', '{"a": [1 2]}', '{1: 2}', '{} x', 'nul'])
+def test_invalid_json(text):
+    """ Invalid JSON raises the same exception as json.load """
+    with pytest.raises(json.JSONDecodeError):
+        _load(text)
+
+
+def test_item_hooks():
+    """ Each element of a hooked array is replaced by what the hook returns """
+    data = _load('{"rounds": [{"count": [1], "msg": "long"}, {"count": [2]}], "msg": [3]}',
+                 item_hooks={'rounds': lambda round_data: round_data['count']})
+    assert data == {'rounds': [[1], [2]], 'msg': [3]}
+
+
+def test_opavote_round_text_is_never_all_in_memory():
+    """ Long text in every Opavote round is never held in memory all at once """
+    election = SyntheticElection(seed=1, num_candidates=20)
+    opavote_data = election.to_opavote()
+    without_text = json.dumps(opavote_data).encode('utf-8')
+    for round_data in opavote_data['rounds']:
+        round_data['msg'] = 'Transferring votes. ' * 5000
+    with_text = json.dumps(opavote_data).encode('utf-8')
+
+    converter = OpavoteConverter()
+    assert converter.convert_to_ut(with_text) == converter.convert_to_ut(without_text)
+    # Reading the whole file at once, as json.load does, would take more than its length
+    peak = profiling.peak_memory_of_conversion(converter, io.BytesIO(with_text))
+    assert peak < len(with_text) // 2
+
+
+def test_schema_reports_invalid_json():
+    """ Validating a file which is not JSON fails with the decoding error """
+    schema = universaltabulator.SchemaV0()
+    assert not schema.validate(io.BytesIO(b'{"config": {"contest": "x"}, "results": [}'))
+    assert isinstance(schema.last_error(), json.JSONDecodeError)
@@ -0,0 +1,86 @@
+"""
+Memory regression tests: each converter must stay within a peak-memory budget
+on generated inputs of a few sizes
+"""
+
+import io
+import json
+
+from rcvformats.common import profiling
+from rcvformats.common.synthetic import SyntheticElection, to_dominion_multi_xml
+from rcvformats.conversions.automatic import AutomaticConverter
+from rcvformats.conversions.dominion_multi_converter import DominionMultiConverter
+from rcvformats.conversions.dominion_txt import DominionTxtConverter
+from rcvformats.conversions.dominion_xlsx import DominionXlsxConverter
+from rcvformats.conversions.electionbuddy import ElectionBuddyConverter
+from rcvformats.conversions.opavote import OpavoteConverter
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+
+KIB = 1024
+MIB = 1024 * KIB
+
+# Peak bytes allowed, keyed by number of candidates (and so, rounds).
+# These are roughly twice what each conversion needed when they were added:
+# if a change legitimately needs more, raise them deliberately.
+BUDGETS = {
+    DominionXlsxConverter: {10: 1 * MIB, 100: 24 * MIB},
+    DominionTxtConverter: {10: 256 * KIB, 100: 2 * MIB},
+    ElectionBuddyConverter: {10: 64 * KIB, 100: 2 * MIB},
+    OpavoteConverter: {10: 64 * KIB, 100: 2 * MIB},
+    UTWithoutTransfersConverter: {10: 64 * KIB, 100: 1 * MIB},
+    AutomaticConverter: {10: 512 * KIB, 100: 1536 * KIB},
+}
+
+# Peak bytes allowed for the multi-contest XML, keyed by the number of 10-candidate contests
+MULTI_BUDGETS = {10: 512 * KIB, 100: 4 * MIB}
+
+
+def _input_for(converter_type, election):
+    """ The bytes each converter reads """
+    if converter_type is DominionXlsxConverter:
+        return election.to_dominion_xlsx()
+    if converter_type is DominionTxtConverter:
+        return election.to_dominion_txt()
+    if converter_type is ElectionBuddyConverter:
+        return election.to_electionbuddy_csv().encode('utf-8')
+    if converter_type is OpavoteConverter:
+        return json.dumps(election.to_opavote()).encode('utf-8')
+    if converter_type is UTWithoutTransfersConverter:
+        return json.dumps(election.to_ut(with_transfers=False)).encode('utf-8')
+    return json.dumps(election.to_ut()).encode('utf-8')
+
+
+def test_converters_within_memory_budget():
+    """ Every converter stays within its budget at every size """
+    for size in (10, 100):
+        election = SyntheticElection(seed=size, num_candidates=size)
+        for converter_type, budgets in BUDGETS.items():
+            file_bytes = _input_for(converter_type, election)
+            peak = profiling.peak_memory_of_conversion(converter_type(), io.BytesIO(file_bytes))
+            assert peak <= budgets[size], \
+                f"{converter_type.__name__} used {peak} bytes on {size} candidates, " \
+                f"over its budget of {budgets[size]}"
+
+
+def test_multi_converter_within_memory_budget():
+    """ Exploding the multi-contest XML stays within its budget """
+    for num_contests, budget in MULTI_BUDGETS.items():
+        elections = [SyntheticElection(seed=i, num_candidates=10) for i in range(num_contests)]
+        xml_bytes = to_dominion_multi_xml(elections)
+        temp_files, peak = profiling.peak_memory_of(
+            DominionMultiConverter.explode_to_files, io.BytesIO(xml_bytes))
+        for temp_file in temp_files.values():
+            temp_file.close()
+        assert peak <= budget, \
+            f"DominionMultiConverter used {peak} bytes on {num_contests} contests, " \
+            f"over its budget of {budget}"
+
+
+def test_memory_grows_with_input_size():
+    """ Sanity check that the helper measures the conversion, not the test harness """
+    small = SyntheticElection(seed=1, num_candidates=10)
+    large = SyntheticElection(seed=1, num_candidates=100)
+    converter = UTWithoutTransfersConverter()
+    small_peak = profiling.peak_memory_of_conversion(converter, small.to_ut(with_transfers=False))
+    large_peak = profiling.peak_memory_of_conversion(converter, large.to_ut(with_transfers=False))
+    assert large_peak > 10 * small_peak
@@ -0,0 +1,97 @@
+"""
+Tests for the compact election model
+"""
+
+import copy
+import glob
+import io
+import json
+import tracemalloc
+
+from rcvformats.common.model import Election
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions.opavote import OpavoteConverter
+from rcvformats.schemas import universaltabulator
+
+
+def _ut_files():
+    return glob.glob('testdata/conversions/*.json') + \
+        glob.glob('testdata/inputs/universal-tabulator/*.json')
+
+
+def test_round_trip():
+    """ Converting to the model and back, or streaming it, gives back the same data """
+    for filename in _ut_files():
+        with open(filename, 'r', encoding='utf-8') as file_obj:
+            data = json.load(file_obj)
+        election = Election.from_ut_dict(data)
+        assert election.to_ut_dict() == data
+
+        streamed = io.StringIO()
+        election.write_json(streamed)
+        assert streamed.getvalue() == json.dumps(data)
+
+
+def test_candidates_are_interned():
+    """ Each name is stored once, and referred to by id """
+    election = Election.from_ut_dict(SyntheticElection(seed=1, num_candidates=20).to_ut())
+    assert len(election.candidate_names) == 20
+    assert election.candidate_id(election.candidate_names[3]) == 3
+    assert election.candidate_id('New Candidate') == 20
+
+    converted = OpavoteConverter().convert_to_model('testdata/inputs/opavote10/fairvote.json')
+    assert converted.to_ut_dict() == OpavoteConverter().convert_to_ut(
+        'testdata/inputs/opavote10/fairvote.json')
+
+
+def test_validation_matches_dicts():
+    """ Validating the model gives the same result and error as validating the dict """
+    def modifications():
+        yield lambda d: None
+        yield lambda d: d['results'][-1]['tallyResults'].append({'eliminated': 'X'})
+        yield lambda d: d['results'][1]['tally'].update({d['results'][0]['tallyResults'][0]
+                                                        ['eliminated']: 0})
+        yield lambda d: d['results'][0]['tally'].update({'': 1})
+        yield lambda d: d['results'][1]['tally'].update(
+            {k: 0.5 for k in d['results'][1]['tally']})
+        yield lambda d: d['config'].update({'threshold': ''})
+
+    schema = universaltabulator.SchemaV0()
+    original = SyntheticElection(seed=2, num_candidates=10).to_ut()
+    for modify in modifications():
+        data = copy.deepcopy(original)
+        modify(data)
+        is_valid = schema.validate(data)
+        error = str(schema.last_error())
+        assert schema.validate(Election.from_ut_dict(data)) == is_valid
+        if not is_valid:
+            assert str(schema.last_error()) == error
+
+
+def test_smaller_than_dicts():
+    """ The model holds the same data in much less memory """
+    text = json.dumps(SyntheticElection(seed=3, num_candidates=200).to_ut())
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        data = json.loads(text)
+        dict_bytes = tracemalloc.get_traced_memory()[0] - before
+        election = Election.from_ut_dict(data)
+        del data
+        model_bytes = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert election.rounds
+    assert model_bytes < dict_bytes / 2
+
+
+def test_ut_view():
+    """ The view reads like the dicts, building each round only when looked at """
+    data = SyntheticElection(seed=4, num_candidates=8).to_ut()
+    view = Election.from_ut_dict(data).ut_view()
+    assert view['config'] == data['config']
+    assert len(view['results']) == len(data['results'])
+    assert view['results'][-1] == data['results'][-1]
+    assert view['results'][1:] == data['results'][1:]
+    assert list(view['results']) == data['results']
+    assert universaltabulator.SchemaV0().is_valid(Election.from_ut_dict(data))
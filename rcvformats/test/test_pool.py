@@ -0,0 +1,62 @@
+"""
+Tests that shared converters and schemas can be used from many threads at once
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import glob
+
+from rcvformats.conversions import dominion_txt
+from rcvformats.conversions import dominion_xlsx
+from rcvformats.conversions import electionbuddy
+from rcvformats.conversions import opavote
+from rcvformats.conversions import pool
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+from rcvformats.schemas import universaltabulator
+
+
+def _conversions():
+    conversions = [(dominion_xlsx.DominionXlsxConverter, f)
+                   for f in glob.glob('testdata/inputs/dominion_xlsx/*.xlsx')]
+    conversions += [(dominion_txt.DominionTxtConverter, 'testdata/inputs/dominion.txt')]
+    conversions += [(electionbuddy.ElectionBuddyConverter, f)
+                    for f in glob.glob('testdata/inputs/electionbuddy/*')]
+    conversions += [(opavote.OpavoteConverter, f) for f in glob.glob('testdata/inputs/opavote*/*')]
+    conversions += [(UTWithoutTransfersConverter, f)
+                    for f in glob.glob('testdata/inputs/ut-without-transfers/*')]
+    return conversions
+
+
+def test_pool_shares_instances():
+    """ One instance per converter type and options """
+    assert pool.shared(opavote.OpavoteConverter) is pool.shared(opavote.OpavoteConverter)
+    assert pool.shared(UTWithoutTransfersConverter, allow_guessing=False) is not \
+        pool.shared(UTWithoutTransfersConverter, allow_guessing=True)
+    assert not pool.shared(UTWithoutTransfersConverter, allow_guessing=False).allow_guessing
+
+
+def test_concurrent_conversions_match_serial():
+    """ Shared converters give the same results on many threads as one at a time """
+    conversions = _conversions() * 2
+    expected = [converter_type().convert_to_ut_and_validate(f) for converter_type, f in conversions]
+
+    def convert(conversion):
+        converter_type, filename = conversion
+        return pool.shared(converter_type).convert_to_ut_and_validate(filename)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(convert, conversions)) == expected
+
+
+def test_schema_errors_are_per_thread():
+    """ A shared schema reports each thread's own last error """
+    schema = universaltabulator.SchemaV0()
+    filenames = glob.glob('testdata/inputs/universal-tabulator/*.json') + \
+        glob.glob('testdata/inputs/opavote11/*.json')
+
+    def validate(filename):
+        is_valid = schema.validate(filename)
+        return is_valid, str(schema.last_error()) if not is_valid else None
+
+    expected = [validate(f) for f in filenames]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(validate, filenames * 4)) == expected * 4
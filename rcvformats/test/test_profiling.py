@@ -0,0 +1,26 @@
+"""
+Tests for the time and memory measurement helpers
+"""
+
+from rcvformats.common import profiling
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+
+
+def test_peak_memory_grows_with_allocation():
+    """ Allocating a large list should be reflected in the peak """
+    _, small_peak = profiling.peak_memory_of(lambda: [0] * 1000)
+    _, large_peak = profiling.peak_memory_of(lambda: [0] * 1000000)
+    assert large_peak > 1000000 * 8 > small_peak
+
+
+def test_measure_reports_rounds_and_throughput():
+    """ Measuring a conversion reports its rounds and throughput """
+    filename = 'testdata/inputs/ut-without-transfers/with-decimals.json'
+    converter = UTWithoutTransfersConverter()
+    result, measurement = profiling.measure(
+        converter.convert_to_ut, filename, repeat=2, input_bytes=1000)
+
+    report = measurement.as_dict()
+    assert report['num_rounds'] == len(result['results']) == 3
+    assert report['peak_bytes'] > 0
+    assert report['bytes_per_second'] == 1000 / measurement.seconds
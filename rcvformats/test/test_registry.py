@@ -0,0 +1,208 @@
+"""
+Tests for the lazy converter registry the automatic converter probes with
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import json
+import pickle
+import sys
+
+import pytest
+
+from rcvformats.conversions import registry
+from rcvformats.conversions.automatic import AutomaticConverter
+from rcvformats.conversions.base import CouldNotConvertException
+from rcvformats.conversions.opavote import OpavoteConverter
+
+OPAVOTE_FILE = 'testdata/inputs/opavote11/2022-example.json'
+
+
+def _head(filename):
+    with open(filename, 'rb') as file_object:
+        return file_object.read(registry.SNIFF_BYTES)
+
+
+def _names(entries):
+    return [entry.name for entry in entries]
+
+
+def _builtin_registry(statistics=None):
+    return registry.Registry(registry.BUILTIN_ENTRIES, statistics, entry_point_group=None)
+
+
+@pytest.mark.parametrize('filename, expected_name', [
+    ('testdata/inputs/dominion_xlsx/alaska.xlsx', 'dominion_xlsx'),
+    ('testdata/inputs/electionbuddy/standard.csv', 'electionbuddy'),
+    (OPAVOTE_FILE, 'opavote'),
+    ('testdata/inputs/dominion.txt', 'dominion_txt'),
+])
+def test_sniffs(filename, expected_name):
+    """ Each test file sniffs like its own format, and nothing slower to try """
+    assert _names(_builtin_registry().probe_order(_head(filename))) == [expected_name]
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig', 'utf-16', 'utf-16-le', 'utf-32'])
+def test_json_in_any_encoding(encoding):
+    """ Universal Tabulator files in any encoding JSON allows are passed through """
+    filename = 'testdata/inputs/universal-tabulator/simple.json'
+    with open(filename, 'r', encoding='utf-8') as file_object:
+        text = file_object.read()
+    assert registry.looks_like_json(text.encode(encoding))
+    assert AutomaticConverter(_builtin_registry()).convert_to_ut(text.encode(encoding)) == \
+        json.loads(text)
+
+
+@pytest.mark.parametrize('filename', [
+    'testdata/inputs/universal-tabulator/simple.json',
+    'testdata/inputs/electionbuddy/standard.csv',
+    OPAVOTE_FILE,
+])
+def test_files_opened_in_text_mode(filename):
+    """ Files opened in text mode are sniffed and converted as in binary mode """
+    with open(filename, 'r', encoding='utf-8') as file_object:
+        assert _names(_builtin_registry().probe_order(file_object.read(registry.SNIFF_BYTES))) \
+            == _names(_builtin_registry().probe_order(_head(filename)))
+        file_object.seek(0)
+        converted = AutomaticConverter(_builtin_registry()).convert_to_ut(file_object)
+    assert converted == AutomaticConverter(_builtin_registry()).convert_to_ut(filename)
+
+
+def test_entries_are_loaded_lazily():
+    """ A converter is only imported once it is needed """
+    entry = registry.ConverterEntry('opavote', 'rcvformats.conversions.opavote:OpavoteConverter')
+    assert entry.target == 'rcvformats.conversions.opavote:OpavoteConverter'
+    assert entry.load() is OpavoteConverter
+    assert entry.target is OpavoteConverter
+
+
+def test_broken_sniff_might_match():
+    """ A sniff which raises does not hide its converter """
+    def broken_sniff(head):
+        raise RuntimeError(head)
+    entry = registry.ConverterEntry('broken', OpavoteConverter, broken_sniff)
+    assert entry.might_match(b'{}')
+
+
+def test_duplicate_names_are_rejected():
+    """ Two converters cannot share a name """
+    converters = _builtin_registry()
+    with pytest.raises(ValueError):
+        converters.register(('opavote', OpavoteConverter, None))
+
+
+def test_order_adapts_to_hits():
+    """ Converters which match more often are tried first """
+    converters = registry.Registry([('first', OpavoteConverter, None),
+                                    ('second', OpavoteConverter, None)],
+                                   entry_point_group=None)
+    assert _names(converters.probe_order(b'{}')) == ['first', 'second']
+    converters.record_hit('second')
+    assert _names(converters.probe_order(b'{}')) == ['second', 'first']
+
+
+def test_statistics_are_saved_and_merged(tmp_path):
+    """ Hits are kept in the file, adding to those other processes saved meanwhile """
+    filename = tmp_path / 'statistics.json'
+    first = registry.ProbeStatistics(filename)
+    second = registry.ProbeStatistics(filename)
+    first.record_hit('opavote')
+    second.record_hit('opavote')
+    second.record_hit('electionbuddy')
+    assert not filename.exists()
+
+    first.flush()
+    second.flush()
+    with open(filename, 'r', encoding='utf-8') as file_object:
+        assert json.load(file_object) == {'opavote': 2, 'electionbuddy': 1}
+    assert registry.ProbeStatistics(filename).hits == {'opavote': 2, 'electionbuddy': 1}
+    assert second.hits == {'opavote': 2, 'electionbuddy': 1}
+
+
+def test_statistics_are_saved_in_batches(tmp_path):
+    """ Only every flush_every hits is the file written """
+    filename = tmp_path / 'statistics.json'
+    statistics = registry.ProbeStatistics(filename, flush_every=3)
+    for _ in range(2):
+        statistics.record_hit('opavote')
+    assert not filename.exists()
+    statistics.record_hit('opavote')
+    assert registry.ProbeStatistics(filename).hits == {'opavote': 3}
+
+    # A copy sent to another process only saves what it counts itself
+    statistics.record_hit('opavote')
+    copy = pickle.loads(pickle.dumps(statistics))
+    copy.flush()
+    assert registry.ProbeStatistics(filename).hits == {'opavote': 3}
+
+
+def _record_hits(filename, num_hits):
+    statistics = registry.ProbeStatistics(filename, flush_every=7)
+    for _ in range(num_hits):
+        statistics.record_hit('opavote')
+    # The rest are saved when the worker process exits
+
+
+def test_processes_do_not_lose_each_others_hits(tmp_path):
+    """ Processes saving to the same file at once add up to every hit """
+    filename = str(tmp_path / 'statistics.json')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_record_hits, [filename] * 8, [50] * 8))
+    assert registry.ProbeStatistics(filename).hits == {'opavote': 400}
+
+
+def test_unreadable_statistics_are_ignored(tmp_path):
+    """ A corrupt statistics file only means starting from no statistics """
+    filename = tmp_path / 'statistics.json'
+    filename.write_text('not json', encoding='utf-8')
+    statistics = registry.ProbeStatistics(filename)
+    assert statistics.hits == {}
+    statistics.record_hit('opavote')
+    statistics.flush()
+    assert registry.ProbeStatistics(filename).hits == {'opavote': 1}
+
+
+class _FakeEntryPoint:  # pylint: disable=too-few-public-methods
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def load(self):
+        """ Returns the value, or raises it """
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+def test_entry_point_plugins(monkeypatch):
+    """ Plugins are registered on first use, and broken ones are skipped """
+    plugins = [_FakeEntryPoint('plugin', registry.ConverterEntry('plugin', OpavoteConverter)),
+               _FakeEntryPoint('bare', OpavoteConverter),
+               _FakeEntryPoint('broken', ImportError('no such module'))]
+    monkeypatch.setattr(registry, '_entry_points', lambda group: plugins)
+    converters = registry.Registry(registry.BUILTIN_ENTRIES)
+    assert _names(converters.entries)[-2:] == ['plugin', 'bare']
+    assert converters.entries[-1].load() is OpavoteConverter
+
+
+def test_automatic_converter_records_hits():
+    """ The automatic converter converts with, and counts, the converter which matched """
+    converters = _builtin_registry()
+    data = AutomaticConverter(converters).convert_to_ut_and_validate(OPAVOTE_FILE)
+    assert data['config']['contest']
+    assert converters.statistics.hits == {'opavote': 1}
+
+
+def test_automatic_converter_does_not_import_unneeded_converters(monkeypatch):
+    """ Converting a JSON file never imports the spreadsheet converter """
+    monkeypatch.delitem(sys.modules, 'rcvformats.conversions.dominion_xlsx', raising=False)
+    converters = _builtin_registry()
+    AutomaticConverter(converters).convert_to_ut(OPAVOTE_FILE)
+    assert isinstance(converters.entries[0].target, str)
+    assert 'rcvformats.conversions.dominion_xlsx' not in sys.modules
+
+
+def test_automatic_converter_reports_no_match():
+    """ Files no converter can read still fail with every converter's error """
+    converters = registry.Registry(entry_point_group=None)
+    with pytest.raises(CouldNotConvertException):
+        AutomaticConverter(converters).convert_to_ut(OPAVOTE_FILE)
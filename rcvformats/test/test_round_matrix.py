@@ -0,0 +1,195 @@
+"""
+Tests that the round matrix engine gives the same tallyResults as guessing round by round
+"""
+
+import copy
+import io
+import json
+import glob
+
+import pytest
+
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions import arithmetic
+from rcvformats.conversions import electionbuddy
+from rcvformats.conversions import opavote
+from rcvformats.conversions import round_matrix
+from rcvformats.conversions.base import GenericGuessAtTransferConverter
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+
+
+def _tally_only(ut_data):
+    """ Each round's tally and who was eliminated or elected """
+    rounds = [{'tally': r['tally']} for r in ut_data['results']]
+    eliminated = [[t['eliminated'] for t in r['tallyResults'] if 'eliminated' in t]
+                  for r in ut_data['results']]
+    elected = [[t['elected'] for t in r['tallyResults'] if 'elected' in t]
+               for r in ut_data['results']]
+    return rounds, eliminated, elected
+
+
+def _round_by_round(rounds, eliminated, elected, allow_guessing=True, backend=None):
+    converter = GenericGuessAtTransferConverter
+    return [converter.guess_at_tally_results(
+        eliminated[round_i], elected[round_i],
+        converter.compute_vote_deltas_for_round(rounds, round_i), allow_guessing, backend)
+        for round_i in range(len(rounds))]
+
+
+def test_matches_round_by_round():
+    """ Results, including the order of transfers, are exactly the same """
+    elections = [
+        SyntheticElection(seed=1, num_candidates=200, num_rounds=10, batch_eliminations=True),
+        SyntheticElection(seed=2, num_candidates=30, num_seats=4),
+        SyntheticElection(seed=3, num_candidates=25, num_seats=3, batch_eliminations=True),
+    ]
+    for election in elections:
+        rounds, eliminated, elected = _tally_only(election.to_ut())
+        matrix = round_matrix.RoundMatrix(rounds)
+        for allow_guessing in (True, False):
+            assert matrix.tally_results(eliminated, elected, allow_guessing) == \
+                _round_by_round(rounds, eliminated, elected, allow_guessing)
+
+
+def test_exact_matches_round_by_round():
+    """ With the exact backend, the int64 matrix splits transfers exactly the same way """
+    elections = [
+        SyntheticElection(seed=1, num_candidates=200, num_rounds=10, batch_eliminations=True),
+        SyntheticElection(seed=3, num_candidates=25, num_seats=3, batch_eliminations=True),
+    ]
+    for election in elections:
+        rounds, eliminated, elected = _tally_only(election.to_ut())
+        for precision in (0, 3):
+            backend = arithmetic.FixedPointArithmetic(precision)
+            parsed_rounds = copy.deepcopy(rounds)
+            backend.parse_tallies(parsed_rounds)
+            matrix = round_matrix.RoundMatrix(parsed_rounds, backend)
+            for allow_guessing in (True, False):
+                assert matrix.tally_results(eliminated, elected, allow_guessing) == \
+                    _round_by_round(parsed_rounds, eliminated, elected, allow_guessing, backend)
+
+    # Too many votes to be exact in int64
+    with pytest.raises(OverflowError):
+        round_matrix.RoundMatrix([{'tally': {'A': 2 ** 62}}], backend)
+
+
+def test_conversions_without_numpy_unchanged(monkeypatch):
+    """ Converters give the same results whether or not numpy is available """
+    conversions = [(opavote.OpavoteConverter, f) for f in glob.glob('testdata/inputs/opavote*/*')]
+    conversions += [(electionbuddy.ElectionBuddyConverter, f)
+                    for f in glob.glob('testdata/inputs/electionbuddy/*')]
+    conversions += [(UTWithoutTransfersConverter, f)
+                    for f in glob.glob('testdata/inputs/ut-without-transfers/*')]
+
+    with_numpy = [converter().convert_to_ut(f) for converter, f in conversions]
+    monkeypatch.setattr(round_matrix, 'np', None)
+    assert not round_matrix.is_available()
+    without_numpy = [converter().convert_to_ut(f) for converter, f in conversions]
+    assert with_numpy == without_numpy
+
+
+def test_invalid_data_raises():
+    """ Continuing candidates losing votes is caught, as it is round by round """
+    rounds = [{'tally': {'A': 10, 'B': 5, 'C': 2}}, {'tally': {'A': 8, 'B': 9}}]
+    eliminated = [['C'], []]
+    elected = [[], []]
+    with pytest.raises(ValueError):
+        _round_by_round(copy.deepcopy(rounds), eliminated, elected)
+    with pytest.raises(ValueError):
+        round_matrix.RoundMatrix(rounds).tally_results(eliminated, elected)
+
+
+def test_candidates_in_no_tally():
+    """ Like round by round, an unknown candidate is only an error if votes are transferred """
+    rounds = [{'tally': {'A': 10, 'B': 5}}, {'tally': {'A': 10, 'B': 5}},
+              {'tally': {'A': 15}}]
+    elected = [[], [], []]
+
+    # Nothing moves from the first round to the second
+    eliminated = [['Nobody'], [], []]
+    assert round_matrix.RoundMatrix(rounds[:2]).tally_results(eliminated[:2], elected[:2]) == \
+        _round_by_round(rounds[:2], eliminated[:2], elected[:2])
+
+    # But B's votes move from the second round to the third
+    eliminated = [[], ['Nobody'], []]
+    with pytest.raises(KeyError):
+        _round_by_round(rounds, eliminated, elected)
+    with pytest.raises(KeyError):
+        round_matrix.RoundMatrix(rounds).tally_results(eliminated, elected)
+
+
+def _opavote_without_numpy(monkeypatch, opavote_data, **converter_args):
+    with monkeypatch.context() as patch:
+        patch.setattr(round_matrix, 'np', None)
+        return opavote.OpavoteConverter(**converter_args).convert_to_ut(
+            json.dumps(opavote_data).encode())
+
+
+def test_opavote_count_matrix_matches_dicts(monkeypatch):
+    """ Reading Opavote counts straight into a matrix gives exactly the same results """
+    elections = [
+        SyntheticElection(seed=4, num_candidates=60, num_rounds=8, batch_eliminations=True),
+        SyntheticElection(seed=5, num_candidates=20, num_seats=4),
+        SyntheticElection(seed=6, num_candidates=15, num_seats=3, batch_eliminations=True),
+    ]
+    for election in elections:
+        opavote_data = election.to_opavote()
+        converted = opavote.OpavoteConverter().convert_to_ut(json.dumps(opavote_data).encode())
+        assert json.dumps(converted) == \
+            json.dumps(_opavote_without_numpy(monkeypatch, opavote_data))
+
+
+def test_opavote_exact_count_matrix_matches_dicts(monkeypatch):
+    """ So does the fixed-point backend, for whole and fractional votes """
+    opavote_data = SyntheticElection(seed=3, num_candidates=25, num_seats=3,
+                                     batch_eliminations=True).to_opavote()
+    fractional_data = copy.deepcopy(opavote_data)
+    for round_data in fractional_data['rounds']:
+        round_data['count'] = [votes / 1000 for votes in round_data['count']]
+    huge_data = copy.deepcopy(opavote_data)
+    for round_data in huge_data['rounds']:
+        round_data['count'] = [votes * 10 ** 15 for votes in round_data['count']]
+
+    for data in (opavote_data, fractional_data, huge_data):
+        for precision in (None, 6):
+            converter = opavote.OpavoteConverter(numeric='fixed', precision=precision)
+            converted = converter.convert_to_ut(json.dumps(data).encode())
+            assert json.dumps(converted) == json.dumps(_opavote_without_numpy(
+                monkeypatch, data, numeric='fixed', precision=precision))
+
+
+def test_opavote_irregular_counts(monkeypatch):
+    """ Counts with extra entries are converted round by round, just as without numpy """
+    opavote_data = SyntheticElection(seed=7, num_candidates=5).to_opavote()
+    for round_data in opavote_data['rounds']:
+        round_data['count'].append(0)
+    converted = opavote.OpavoteConverter().convert_to_ut(json.dumps(opavote_data).encode())
+    assert converted == _opavote_without_numpy(monkeypatch, opavote_data)
+
+
+def test_opavote_model_filled_from_count_matrix(monkeypatch):
+    """ The model filled straight from the count matrix writes the same JSON as via dicts """
+    opavote_data = SyntheticElection(seed=8, num_candidates=15, num_seats=2,
+                                     batch_eliminations=True, surpluses=True).to_opavote()
+    fractional_data = copy.deepcopy(opavote_data)
+    for round_data in fractional_data['rounds']:
+        round_data['count'] = [votes / 1000 for votes in round_data['count']]
+
+    for data in (opavote_data, fractional_data):
+        raw = json.dumps(data).encode()
+        for numeric in (arithmetic.FLOAT, arithmetic.FIXED):
+            converter = opavote.OpavoteConverter(numeric=numeric)
+            direct = io.StringIO()
+            converter.convert_to_model(raw).write_json(direct)
+            with monkeypatch.context() as patch:
+                patch.setattr(round_matrix, 'np', None)
+                via_dicts = io.StringIO()
+                converter.convert_to_model(raw).write_json(via_dicts)
+            assert direct.getvalue() == via_dicts.getvalue()
+            assert direct.getvalue() == json.dumps(converter.convert_to_ut(raw))
+
+
+def test_newly_listed():
+    """ Only the first time each candidate is listed counts, in the order listed """
+    assert round_matrix.RoundMatrix.newly_listed([[2], [2, 0, 1], [], [1, 3, 0]]) == \
+        [[2], [0, 1], [], [3]]
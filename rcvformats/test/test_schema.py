@@ -6,6 +6,7 @@ import json
 import tempfile
 import os
 
+from rcvformats.common.synthetic import SyntheticElection
 from rcvformats.schemas import electionbuddy
 from rcvformats.schemas import universaltabulator
 from rcvformats.schemas import opavote
@@ -106,3 +107,63 @@ def test_vote_counts_decrease_to_zero_message():
     schema = universaltabulator.SchemaV0()
     assert not schema.validate(data)
     assert 'should be eliminated' in str(schema.last_error())
+
+
+def _hand_edited_ut():
+    """ UT data with several mistakes, as if edited by hand """
+    election = SyntheticElection(seed=0, num_candidates=6, num_rounds=5).to_ut()
+    election['config']['threshold'] = ''
+    del election['results'][1]['round']
+    eliminated = election['results'][0]['tallyResults'][0]['eliminated']
+    election['results'][2]['tally'][eliminated] = 0
+    election['results'][-1]['tallyResults'].append({'eliminated': eliminated})
+    return election
+
+
+def test_validate_all_finds_every_error():
+    """ Every schema and logic error is found at once, with where it is """
+    schema = universaltabulator.SchemaV0()
+    issues = schema.validate_all(_hand_edited_ut())
+    eliminated = _hand_edited_ut()['results'][0]['tallyResults'][0]['eliminated']
+    num_rounds = len(_hand_edited_ut()['results'])
+
+    assert [(issue.path, issue.round_number) for issue in issues] == [
+        (['config', 'threshold'], None),
+        (['results', 1], 2),
+        (['results', num_rounds - 1, 'tallyResults', 1], num_rounds),
+        (['results', 2, 'tally', eliminated], 3)]
+    assert 'already eliminated' in issues[-1].message
+    assert issues[-1].to_dict() == {'message': issues[-1].message,
+                                    'path': ['results', 2, 'tally', eliminated], 'round': 3}
+    assert str(issues[1]).startswith('results/1: ')
+    assert schema.last_error() is issues[0].error
+
+
+def test_validate_all_of_valid_and_unreadable_files():
+    """ Valid files have no issues, and files which are not JSON have one """
+    schema = universaltabulator.SchemaV0()
+    assert schema.validate_all('testdata/inputs/universal-tabulator/macomb-multiwinner.json') == []
+    issues = schema.validate_all(b'{"config": ')
+    assert len(issues) == 1 and isinstance(issues[0].error, json.JSONDecodeError)
+    assert len(electionbuddy.SchemaV0().validate_all('README.md')) == 1
+
+
+def test_validate_all_opavote_rounds():
+    """ Errors in Opavote rounds know their round """
+    filename = 'testdata/inputs/opavote11/2022-example.json'
+    with open(filename, 'r', encoding='utf-8') as fileobj:
+        data = json.load(fileobj)
+    del data['rounds'][1]['count']
+    issue, = opavote.SchemaV1_1().validate_all(data)
+    assert issue.round_number == 2
+
+
+def test_is_valid_agrees_with_validate():
+    """ The fast check gives the same answer as validate, for valid and invalid data """
+    schema = universaltabulator.SchemaV0()
+    for filename in os.listdir('testdata/inputs/universal-tabulator'):
+        assert schema.is_valid(os.path.join('testdata/inputs/universal-tabulator', filename))
+    assert not schema.is_valid(_hand_edited_ut())
+    assert not schema.is_valid(b'not json')
+    assert not schema.is_valid(12)
+    assert electionbuddy.SchemaV0().is_valid('testdata/inputs/electionbuddy/standard.csv')
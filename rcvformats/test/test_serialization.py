@@ -0,0 +1,73 @@
+"""
+Tests for writing JSON with each encoder and option
+"""
+
+import glob
+import io
+import json
+
+import pytest
+
+from rcvformats.common import serialization
+from rcvformats.common.synthetic import SyntheticElection
+
+
+def _ut_files():
+    return glob.glob('testdata/conversions/*.json') + \
+        glob.glob('testdata/inputs/universal-tabulator/*.json')
+
+
+def test_default_matches_stdlib():
+    """ Without options, the output is exactly json.dumps, to text and binary files """
+    for filename in _ut_files():
+        with open(filename, 'r', encoding='utf-8') as file_object:
+            data = json.load(file_object)
+        assert serialization.dumps(data) == json.dumps(data)
+
+        binary = io.BytesIO()
+        serialization.dump(data, binary)
+        assert binary.getvalue() == json.dumps(data).encode('utf-8')
+
+    for data in ([1, 2.5, 'three'], 'text', {}, {'empty': []}):
+        assert serialization.dumps(data) == json.dumps(data)
+
+
+def test_compact_with_each_encoder():
+    """ Compact output has no spaces, and every encoder reads back the same """
+    data = SyntheticElection(seed=5, num_candidates=300, num_seats=3).to_ut()
+    text = serialization.dumps(data, compact=True, encoder=serialization.STDLIB)
+    assert text == json.dumps(data, separators=(',', ':'))
+    # The same bytes whether or not orjson is installed, unless it is asked for
+    assert serialization.dumps(data, compact=True) == text
+
+    if serialization.is_orjson_available():
+        assert json.loads(serialization.dumps(
+            data, compact=True, encoder=serialization.ORJSON)) == data
+        with pytest.raises(ValueError):
+            serialization.dumps(data, encoder=serialization.ORJSON)
+
+    with pytest.raises(ValueError):
+        serialization.dumps(data, encoder='simplejson')
+
+
+def test_orjson_falls_back_to_stdlib(monkeypatch):
+    """ Asking for orjson without it installed warns and writes what the stdlib would """
+    data = SyntheticElection(seed=6, num_candidates=10).to_ut()
+    monkeypatch.setattr(serialization, 'orjson', None)
+    with pytest.warns(RuntimeWarning, match='orjson is not installed'):
+        text = serialization.dumps(data, compact=True, encoder=serialization.ORJSON)
+    assert text == json.dumps(data, separators=(',', ':'))
+    with pytest.raises(ValueError):
+        serialization.dumps(data, encoder=serialization.ORJSON)
+
+
+def test_float_precision():
+    """ Only float transfers are rounded, and the input is left alone """
+    data = {'config': {'threshold': 10.55555}, 'results': [
+        {'tally': {'A': 1.23456, 'B': 7},
+         'tallyResults': [{'eliminated': 'C', 'transfers': {'A': 0.33000000000000007, 'B': 2}}]}]}
+    expected = {'config': {'threshold': 10.55555}, 'results': [
+        {'tally': {'A': 1.23456, 'B': 7},
+         'tallyResults': [{'eliminated': 'C', 'transfers': {'A': 0.33, 'B': 2}}]}]}
+    assert serialization.dumps(data, float_precision=2) == json.dumps(expected)
+    assert data['results'][0]['tallyResults'][0]['transfers']['A'] == 0.33000000000000007
@@ -0,0 +1,104 @@
+"""
+Tests for the SQLite contest store
+"""
+
+import glob
+import json
+import os
+
+import pytest
+
+from rcvformats.common.store import ContestStore
+from rcvformats.common.synthetic import SyntheticElection
+from rcvformats.conversions.opavote import OpavoteConverter
+
+
+def _ut_files():
+    return sorted(glob.glob('testdata/conversions/*.json') +
+                  glob.glob('testdata/inputs/universal-tabulator/*.json'))
+
+
+def _load_ut_files():
+    contests = []
+    for filename in _ut_files():
+        with open(filename, 'r', encoding='utf-8') as file_obj:
+            contests.append(json.load(file_obj))
+    return contests
+
+
+def test_round_trip():
+    """ Every file loads back exactly as it was added, with rounds and tallies in order """
+    contests = _load_ut_files()
+    with ContestStore() as store:
+        contest_ids = store.add_many(contests, _ut_files())
+        for contest_id, data in zip(contest_ids, contests):
+            loaded = store.load(contest_id)
+            assert loaded == data
+            assert json.dumps(loaded['results']) == json.dumps(data['results'])
+
+
+def test_persists_to_file(tmp_path):
+    """ Contests and candidate ids survive closing and reopening the database """
+    filename = os.path.join(tmp_path, 'contests.sqlite')
+    data = SyntheticElection(num_candidates=20, seed=3).to_ut()
+    with ContestStore(filename) as store:
+        first_id = store.add(data)
+    with ContestStore(filename) as store:
+        second_id = store.add(data)
+        assert store.load(first_id) == store.load(second_id) == data
+        assert store.connection.execute('SELECT COUNT(*) FROM candidates').fetchone()[0] == 20
+
+
+def test_queries():
+    """ Contests can be found by candidate, name, date, jurisdiction and number of rounds """
+    contests = _load_ut_files()
+    with ContestStore() as store:
+        contest_ids = store.add_many(contests)
+        candidate = next(iter(contests[0]['results'][0]['tally']))
+        assert store.contests_with_candidate(candidate) == [
+            contest_id for contest_id, data in zip(contest_ids, contests)
+            if candidate in data['results'][0]['tally']]
+        assert store.contests_with_candidate('No Such Candidate') == []
+
+        assert store.find_contests() == contest_ids
+        assert store.find_contests(min_rounds=4) == [
+            contest_id for contest_id, data in zip(contest_ids, contests)
+            if len(data['results']) >= 4]
+
+        config = contests[0]['config']
+        assert contest_ids[0] in store.find_contests(
+            contest=config['contest'], date=config.get('date'),
+            jurisdiction=config.get('jurisdiction'))
+
+        plan = ' '.join(row[-1] for row in store.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM contests WHERE date = ?', ('2020-01-01',)))
+        assert 'contests_by_date' in plan
+
+
+def test_failed_bulk_insert_adds_nothing():
+    """ If any contest cannot be added, none of them are """
+    good = SyntheticElection(num_candidates=3, seed=1).to_ut()
+    bad = {'config': {'contest': 'Bad', 'unknown': 1}, 'results': []}
+    with ContestStore() as store:
+        with pytest.raises(ValueError):
+            store.add_many([good, bad])
+        assert store.find_contests() == []
+        with pytest.raises(KeyError):
+            store.load(1)
+
+        # The candidates of the rolled-back contest can still be added afterwards
+        assert store.load(store.add(good)) == good
+
+
+def test_add_converted_and_remove():
+    """ Converted files are recorded with their source, and can be removed """
+    filename = 'testdata/inputs/opavote11/2022-example.json'
+    with ContestStore() as store:
+        contest_id = store.add_converted(OpavoteConverter(), [filename])[0]
+        assert store.load(contest_id) == OpavoteConverter().convert_to_ut_and_validate(filename)
+        assert store.connection.execute(
+            'SELECT source FROM contests').fetchone()[0] == filename
+
+        store.remove(contest_id)
+        assert store.find_contests() == []
+        assert store.connection.execute('SELECT COUNT(*) FROM tallies').fetchone()[0] == 0
@@ -0,0 +1,151 @@
+"""
+Tests for tabulating single transferable vote contests from ballot-level records
+"""
+
+import json
+import random
+
+import pytest
+
+from rcvformats.common.ballots import RankedBallots
+from rcvformats.conversions import stv
+from rcvformats.conversions.cvr import CvrCsvConverter
+from rcvformats.schemas import universaltabulator
+
+OPAVOTE_FILE = 'testdata/inputs/opavote11/2022-example.json'
+
+
+def _opavote_example():
+    """ The OpaVote example file, and ballots which OpaVote counted into it """
+    with open(OPAVOTE_FILE, 'r', encoding='utf-8') as file_object:
+        opavote_data = json.load(file_object)
+    rankings = [['BBB', 'Implement']] * 7 + [['BBB', 'ADHD']] * 4 + \
+        [['BBB', 'Tax Credit']] * 2 + [['Implement']] * 7 + [['ADHD']] * 2 + [['Tax Credit']] * 2
+    return opavote_data, RankedBallots.from_rankings(rankings)
+
+
+def _random_rankings(seed, num_ballots, num_candidates):
+    rng = random.Random(seed)
+    names = [f'Candidate {i}' for i in range(num_candidates)]
+    popularity = [rng.random() ** 3 for _ in names]
+    rankings = []
+    for _ in range(num_ballots):
+        first = rng.choices(names, popularity)[0]
+        rest = [name for name in names if name != first]
+        rankings.append([first] + rng.sample(rest, rng.randint(0, min(4, len(rest)))))
+    return rankings
+
+
+def _winners(data):
+    return [tally_result['elected'] for round_data in data['results']
+            for tally_result in round_data['tallyResults'] if 'elected' in tally_result]
+
+
+def test_matches_opavote():
+    """ In OpaVote equivalence mode, every round matches OpaVote's own count exactly """
+    opavote_data, ballots = _opavote_example()
+    converter = stv.StvConverter.like_opavote(opavote_data)
+    assert (converter.seats, converter.precision, converter.batch_elimination) == (2, 6, stv.ZERO)
+    assert not converter.opavote_differences(ballots, opavote_data)
+
+    data = converter.tabulate(ballots)
+    assert universaltabulator.SchemaV0().validate_schema_and_logic(data)
+    assert data['results'][0]['tallyResults'] == [{'elected': 'BBB', 'transfers': {
+        'Implement': 2.692305, 'ADHD': 1.53846, 'Tax Credit': 0.76923,
+        'residual surplus': 0.000004}}]
+    assert data['results'][1]['tally']['BBB'] == 8.000001
+    assert _winners(data) == ['BBB', 'Implement']
+
+    # Different ballots are reported, round by round
+    _, other_ballots = _opavote_example()
+    other_ballots.weights[0] = 0
+    differences = converter.opavote_differences(other_ballots, opavote_data)
+    assert differences
+    assert differences[0].startswith('Round 1: BBB has 12000000, but 13000000 in OpaVote')
+
+
+def test_unsupported_opavote_method():
+    """ Methods other than fractional transfer STV cannot be matched """
+    opavote_data, _ = _opavote_example()
+    with pytest.raises(ValueError):
+        stv.StvConverter.like_opavote({**opavote_data, 'method': 'Meek STV'})
+
+
+def test_random_contests_are_valid_and_exact():
+    """ Every count is valid, fills every seat, and accounts for every vote """
+    for seed in range(10):
+        ballots = RankedBallots.from_rankings(_random_rankings(seed, 300, 4 + seed))
+        for seats in (1, 3):
+            for precision in (None, 4):
+                for batch_elimination in (None, stv.ZERO, stv.LOSERS):
+                    converter = stv.StvConverter(seats, precision=precision,
+                                                 batch_elimination=batch_elimination)
+                    data = converter.tabulate(ballots)
+                    assert universaltabulator.SchemaV0().validate_schema_and_logic(data)
+                    assert len(set(_winners(data))) == len(_winners(data)) == seats
+
+                    count = stv.FractionalBallotCount(ballots.compressed(), precision)
+                    for round_data in converter.count_rounds(count):
+                        assert round_data['tally'][:-1].sum() + round_data['exhausted'] == \
+                            pytest.approx(count.total)
+
+
+def test_single_winner_matches_irv():
+    """ With one seat, STV is instant-runoff voting """
+    for seed in range(5):
+        ballots = RankedBallots.from_rankings(_random_rankings(seed, 500, 6))
+        irv = CvrCsvConverter().tabulate(ballots)
+        single_winner = stv.StvConverter(1).tabulate(ballots)
+        assert [r['tally'] for r in single_winner['results']] == \
+            [r['tally'] for r in irv['results']]
+        assert _winners(single_winner) == _winners(irv)
+
+
+def test_surplus_transfers_add_up_exactly():
+    """ With a precision, each surplus is split exactly, with rounding as residual surplus """
+    ballots = RankedBallots.from_rankings(
+        [['A', 'B'], ['A', 'C'], ['A'], ['B'], ['C'], ['D', 'C']], weights=[5, 3, 2, 2, 2, 1])
+    data = stv.StvConverter(2, precision=3).tabulate(ballots)
+    first_round = data['results'][0]
+    assert first_round['tallyResults'][0]['elected'] == 'A'
+    transfers = first_round['tallyResults'][0]['transfers']
+    surplus = first_round['tally']['A'] - data['results'][1]['tally']['A']
+    assert sum(transfers.values()) == pytest.approx(surplus, abs=1e-9)
+    assert transfers['residual surplus'] > 0
+
+
+def test_batch_elimination_of_zeros():
+    """ Every candidate with no votes is eliminated together """
+    ballots = RankedBallots.from_rankings(
+        [['A'], ['B'], ['C', 'A']], weights=[5, 4, 3], candidates=['A', 'B', 'C', 'D', 'E'])
+    data = stv.StvConverter(1, batch_elimination=stv.ZERO).tabulate(ballots)
+    assert [t['eliminated'] for t in data['results'][0]['tallyResults']] == ['D', 'E']
+    assert data['results'][0]['tallyResults'][0]['transfers'] == {}
+
+    one_at_a_time = stv.StvConverter(1).tabulate(ballots)
+    assert len(one_at_a_time['results']) == len(data['results']) + 1
+
+
+def test_fewer_candidates_than_seats():
+    """ Every candidate is elected at once """
+    ballots = RankedBallots.from_rankings([['A'], ['B', 'A']], weights=[3, 1])
+    data = stv.StvConverter(3).tabulate(ballots)
+    assert len(data['results']) == 1
+    assert _winners(data) == ['A', 'B']
+
+
+def test_nothing_to_count():
+    """ Counts without ballots, or without candidates, say so """
+    with pytest.raises(ValueError, match='no ballots'):
+        stv.StvConverter(2).tabulate(RankedBallots.from_rankings([]))
+    with pytest.raises(ValueError, match='no candidates'):
+        stv.StvConverter(2).tabulate(RankedBallots.from_rankings([[None], []]))
+
+
+def test_fractional_weights():
+    """ Weighted ballots count for their weight, rounded to the precision """
+    ballots = RankedBallots.from_rankings(
+        [['A', 'B'], ['B'], ['C', 'B']], weights=[2.5, 1.25, 1.0001])
+    data = stv.StvConverter(1, precision=3).tabulate(ballots)
+    assert data['results'][0]['tally'] == {'A': 2.5, 'B': 1.25, 'C': 1.0}
+    assert _winners(data) == ['A']
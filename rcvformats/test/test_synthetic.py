@@ -0,0 +1,144 @@
+"""
+Tests that synthetic elections round-trip through every converter
+"""
+
+import copy
+import io
+import json
+import tempfile
+
+from rcvformats.common.synthetic import SyntheticElection, to_dominion_multi_xml
+from rcvformats.conversions import automatic
+from rcvformats.conversions import dominion_multi_converter
+from rcvformats.conversions import dominion_txt
+from rcvformats.conversions import dominion_xlsx
+from rcvformats.conversions import electionbuddy
+from rcvformats.conversions import opavote
+from rcvformats.conversions.ut_without_transfers import UTWithoutTransfersConverter
+from rcvformats.schemas import electionbuddy as electionbuddy_schema
+from rcvformats.schemas import opavote as opavote_schema
+from rcvformats.schemas import universaltabulator
+
+
+def _elections(single_winner_only=False):
+    """ A mix of single- and multi-winner elections, with and without batch eliminations """
+    yield SyntheticElection(seed=1, num_candidates=12)
+    yield SyntheticElection(seed=2, num_candidates=40, num_rounds=6)
+    yield SyntheticElection(seed=3, num_candidates=20, batch_eliminations=True)
+    if single_winner_only:
+        return
+    yield SyntheticElection(seed=4, num_candidates=15, num_seats=3)
+    yield SyntheticElection(seed=5, num_candidates=30, num_seats=4, batch_eliminations=True)
+    yield SyntheticElection(seed=6, num_candidates=10, num_seats=2, surpluses=False)
+
+
+def _results_with_guessed_transfers(ut_data):
+    """
+    Some converters read transfers from the file and others guess at them.
+    Guess them all the same way, so their results can be compared.
+    """
+    converter = UTWithoutTransfersConverter(allow_guessing=True)
+    return converter.fill_in_tally_data(copy.deepcopy(ut_data))['results']
+
+
+def _assert_round_trips(election, converter, file_bytes, inactive_ballots=False):
+    actual = converter.convert_to_ut_and_validate(io.BytesIO(file_bytes))
+    expected = election.to_ut(inactive_ballots=inactive_ballots)
+    assert actual['config']['contest'] == election.title
+    assert _results_with_guessed_transfers(actual) == _results_with_guessed_transfers(expected)
+
+
+def test_same_seed_same_election():
+    """ Generation is deterministic """
+    first = SyntheticElection(seed=7, num_candidates=25, num_seats=2)
+    second = SyntheticElection(seed=7, num_candidates=25, num_seats=2)
+    assert first.to_ut() == second.to_ut()
+    assert first.to_ut() != SyntheticElection(seed=8, num_candidates=25, num_seats=2).to_ut()
+
+
+def test_election_parameters_respected():
+    """ Seats, candidates and rounds match what was asked for """
+    election = SyntheticElection(seed=1, num_candidates=200, num_seats=5, num_rounds=20)
+    assert len(election.candidates) == 200
+    assert len(election.winners) == 5
+    assert len(election.rounds) <= 20
+    assert any(len(r['eliminated']) > 1 for r in election.rounds)
+
+
+def test_universal_tabulator_round_trip():
+    """ UT output is valid and survives the automatic converter unchanged """
+    schema = universaltabulator.SchemaV0()
+    for election in _elections():
+        ut_data = election.to_ut()
+        assert schema.validate(ut_data), schema.last_error()
+
+        converter = automatic.AutomaticConverter()
+        assert converter.convert_to_ut_and_validate(io.BytesIO(json.dumps(ut_data).encode())) \
+            == ut_data
+
+        without_transfers = election.to_ut(with_transfers=False)
+        filled = UTWithoutTransfersConverter().convert_to_ut_and_validate(without_transfers)
+        assert filled['results'] == _results_with_guessed_transfers(ut_data)
+
+
+def test_opavote_round_trip():
+    """ Both OpaVote versions validate and convert to the same results """
+    for election in _elections():
+        for version, schema in (('1.0', opavote_schema.SchemaV1_0()),
+                                ('1.1', opavote_schema.SchemaV1_1())):
+            opavote_data = election.to_opavote(version)
+            assert schema.validate(opavote_data), schema.last_error()
+            _assert_round_trips(election, opavote.OpavoteConverter(),
+                                json.dumps(opavote_data).encode())
+
+
+def test_electionbuddy_round_trip():
+    """ ElectionBuddy CSV validates and converts to the same results """
+    for election in _elections():
+        csv_bytes = election.to_electionbuddy_csv().encode('utf-8')
+        assert electionbuddy_schema.SchemaV0().validate(io.BytesIO(csv_bytes))
+        _assert_round_trips(election, electionbuddy.ElectionBuddyConverter(), csv_bytes)
+
+
+def test_dominion_txt_round_trip():
+    """ Dominion TXT converts to the same results """
+    for election in _elections(single_winner_only=True):
+        _assert_round_trips(election, dominion_txt.DominionTxtConverter(),
+                            election.to_dominion_txt())
+
+
+def test_dominion_xlsx_round_trip():
+    """ Both Dominion XLSX layouts convert to the same results, including inactive ballots """
+    for election in _elections():
+        for v5_17 in (False, True):
+            _assert_round_trips(election, dominion_xlsx.DominionXlsxConverter(),
+                                election.to_dominion_xlsx(v5_17=v5_17), inactive_ballots=True)
+
+
+def test_dominion_multi_xml_round_trip():
+    """ Each contest in the multi-contest XML converts to its first round """
+    elections = [SyntheticElection(seed=i, num_candidates=i + 2) for i in range(6)]
+    xml_bytes = to_dominion_multi_xml(elections)
+    results = dominion_multi_converter.DominionMultiConverter.explode_to_files(
+        io.BytesIO(xml_bytes))
+
+    # The converter skips contests with three or fewer candidates
+    assert sorted(results) == sorted(e.title for e in elections if len(e.candidates) > 3)
+    for election in elections:
+        if election.title not in results:
+            continue
+        with results[election.title] as temp_file:
+            temp_file.seek(0)
+            converted = json.load(temp_file)
+        assert converted['results'][0]['tally'] == election.rounds[0]['tally']
+
+
+def test_write_files():
+    """ Every format is written, and each file can be converted automatically """
+    election = SyntheticElection(seed=1, num_candidates=8)
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = election.write_files(directory)
+        assert len(filenames) == 8
+        for filename in filenames.values():
+            converted = automatic.AutomaticConverter().convert_to_ut_and_validate(filename)
+            assert len(converted['results']) == len(election.rounds)
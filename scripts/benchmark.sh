@@ -0,0 +1,6 @@
+#!/bin/bash
+# Benchmarks every converter and schema. Run from the root directory.
+# Pass -o <filename> to save the JSON report, and -h for more options.
+set -e
+
+PYTHONPATH=. python3 benchmarks/run_benchmarks.py "$@"
@@ -24,12 +24,16 @@ setup(
     author_email="armin.samii@gmail.com",
     packages=find_packages(),
     include_package_data=True,
-    python_requires='>=3',
+    python_requires='>=3.9',
     install_requires=[
         'jsonschema',
         'openpyxl',
         'defusedxml'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+        'orjson': ['orjson'],
+    },
     entry_points={
         'console_scripts': ['rcvformats=rcvformats.bin.cli:main'],
     }